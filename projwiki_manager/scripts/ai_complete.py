@@ -15,6 +15,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
+import perf_trace
+
 try:
     from ai_task_utils import (
         AIFillTask,
@@ -164,7 +166,9 @@ def generate_prompt_file(
                 src_file_path = project_root / src_file_rel
 
                 if src_file_path.exists():
-                    file_info = extract_source_code_info(src_file_path)
+                    with perf_trace.phase("source_info"):
+                        file_info = extract_source_code_info(src_file_path)
+                        perf_trace.count_read(src_file_path)
                     # 合并信息
                     for key in source_info.keys():
                         source_info[key].extend(file_info[key])
@@ -293,7 +297,9 @@ def main():
         help="输出提示文件路径（配合--generate-prompts使用）",
     )
 
+    perf_trace.add_profile_arguments(parser)
     args = parser.parse_args()
+    perf_trace.start_profiling(args, "ai_complete.py")
 
     # 查找项目根目录
     project_root = find_project_root()
@@ -305,7 +311,9 @@ def main():
         return 1
 
     print(f"[INFO] 加载任务文件: {task_file}")
-    tasks = load_tasks_from_json(task_file)
+    with perf_trace.phase("load_tasks"):
+        tasks = load_tasks_from_json(task_file)
+        perf_trace.count_read(task_file)
 
     if not tasks:
         print("[WARN] 没有找到待处理的任务")
@@ -325,7 +333,9 @@ def main():
             )
 
         print(f"[INFO] 生成提示文件: {output_path}")
-        generate_prompt_file(tasks, output_path, project_root)
+        with perf_trace.phase("prompts"):
+            generate_prompt_file(tasks, output_path, project_root)
+            perf_trace.count_written(output_path)
         print(f"[SUCCESS] 提示文件已生成！")
         print(f"\n请将以下文件提供给AI助手:")
         print(f"  {output_path.absolute()}")
@@ -8,6 +8,7 @@
 @attention 用于支持文档AI自动补充功能
 """
 
+import hashlib
 import json
 import re
 from datetime import datetime
@@ -337,6 +338,89 @@ def extract_important_comments(content: str) -> List[str]:
     return comments[:10]  # 限制数量
 
 
+# 被extract_functions误识别为函数的语句关键字(如 "return foo(x);"、"else if (x) {")
+C_STATEMENT_KEYWORDS = {
+    "return", "else", "if", "while", "for", "switch", "case", "do", "goto", "sizeof",
+}
+
+
+def strip_c_comments(content: str) -> str:
+    """删除C源码中的 /* */ 与 // 注释(不处理字符串中的注释符号)"""
+    return re.sub(r"/\*.*?\*/|//[^\n]*", " ", content, flags=re.DOTALL)
+
+
+def extract_symbol_fingerprints(content: str) -> Dict[str, str]:
+    """
+    提取源码中函数签名、结构体、枚举的指纹
+
+    指纹为去除注释并规整空白后的定义文本的sha1(前16位), 只修改注释、
+    空白或函数体时指纹不变. 同名函数的声明与定义合并为一个指纹.
+
+    返回: {"function:名称" / "struct:名称" / "enum:名称": 指纹}
+    """
+    code = strip_c_comments(content)
+    texts: Dict[str, set] = {}
+
+    for func in extract_functions(code):
+        if func["return_type"] in C_STATEMENT_KEYWORDS or func["name"] in C_STATEMENT_KEYWORDS:
+            continue
+        signature = f"{func['return_type']} {func['name']}({func['params']})"
+        texts.setdefault(f"function:{func['name']}", set()).add(" ".join(signature.split()))
+    for kind, items in (("struct", extract_structs(code)), ("enum", extract_enums(code))):
+        for item in items:
+            texts.setdefault(f"{kind}:{item['name']}", set()).add(" ".join(item["body"].split()))
+
+    return {
+        key: hashlib.sha1("\n".join(sorted(values)).encode("utf-8")).hexdigest()[:16]
+        for key, values in texts.items()
+    }
+
+
+def section_symbol_kinds(identifier: str, metadata: Dict[str, Any]) -> set:
+    """
+    AI填空区块负责列举的符号类别(用于尚未被任何区块引用的新增符号)
+
+    枚举/结构体按区块标识判断(enum_definitions、config_struct等), 函数按区块类型判断(function_table等)
+    """
+    kinds = set()
+    if "enum" in identifier:
+        kinds.add("enum")
+    if "struct" in identifier:
+        kinds.add("struct")
+    if metadata.get("Type") in ("function_table", "function_list"):
+        kinds.add("function")
+    return kinds
+
+
+def find_stale_sections(
+    md_content: str, changed_symbols: List[str], file_path: str = ""
+) -> Dict[str, List[str]]:
+    """
+    找出受符号变化影响的AI填空区块
+
+    区块内容中出现了符号名称即视为引用该符号; 没有被任何区块引用的符号
+    (新增的函数、文档中尚未描述的结构体等)归入负责列举该类别符号的区块.
+
+    返回: {区块标识: [变化的符号, ...]}, 无法归入任何区块的符号以空字符串为键
+    """
+    markers = extract_ai_fill_markers(md_content, file_path)
+    words = [set(re.findall(r"\w+", placeholder)) for _, _, _, _, placeholder in markers]
+
+    stale: Dict[str, List[str]] = {}
+    for symbol in changed_symbols:
+        kind, name = symbol.split(":", 1)
+        hits = [markers[i][0] for i in range(len(markers)) if name in words[i]]
+        if not hits:
+            hits = [
+                identifier
+                for identifier, metadata, _, _, _ in markers
+                if kind in section_symbol_kinds(identifier, metadata)
+            ]
+        for identifier in hits or [""]:
+            stale.setdefault(identifier, []).append(symbol)
+    return stale
+
+
 def generate_task_summary(tasks: List[AIFillTask]) -> str:
     """生成任务摘要报告"""
     total = len(tasks)
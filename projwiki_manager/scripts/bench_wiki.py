@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    bench_wiki.py
+@brief   ProjWiki 性能基准工具 - 生成合成文档库并测量构建脚本各环节的开销
+@author  Yarrow
+@date    2025-07-11
+@attention 合成项目生成在临时目录, 测量结束后自动删除(memory / freshness 可用 --keep 保留)
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import posixpath
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import build_wiki
+import check_outdated
+import scaffold_docs
+from ai_task_utils import extract_ai_fill_markers
+from link_graph import build_link_graph
+from search_index import build_search_index
+from source_index import source_index_path
+from wiki_db import export_sqlite
+
+# 合成文档的分类与子目录
+SYNTH_LAYOUT = [
+    ("modules", ["application", "middleware/comm", "middleware/usb/host", "calculation", "bsp/system"]),
+    ("api", ["", "driver"]),
+    ("design", [""]),
+    ("hardware", [""]),
+    ("changelog", [""]),
+]
+
+SYNTH_WORDS_CN = "电机控制磁场定向算法采样中断定时器死区保护电流环速度环初始化配置寄存器通信协议缓冲区状态机"
+SYNTH_WORDS_EN = ["pwm", "adc", "foc", "init", "update", "buffer", "irq", "timer", "dma", "state", "config", "ctrl"]
+
+
+def synth_sentence(rng):
+    """生成一句中英混排的合成文本"""
+    words = []
+    for _ in range(rng.randint(6, 14)):
+        if rng.random() < 0.6:
+            i = rng.randrange(len(SYNTH_WORDS_CN) - 1)
+            words.append(SYNTH_WORDS_CN[i : i + 2])
+        else:
+            words.append(rng.choice(SYNTH_WORDS_EN))
+    return "".join(words) + "。"
+
+
+def synth_ai_fill(rng, ident):
+    """生成一个AI填空块(格式同templates/module_doc_ai.md)"""
+    return [
+        f"<!-- AI_FILL_START:{ident}",
+        f"Type: {rng.choice(['description', 'function_list', 'design_analysis'])}",
+        f"Priority: {rng.choice(['high', 'medium', 'low'])}",
+        f"Requirement: {synth_sentence(rng)}",
+        "Context: source_analysis",
+        "-->",
+        synth_sentence(rng),
+        f"<!-- AI_FILL_END:{ident} -->",
+        "",
+    ]
+
+
+def synth_doc(rng, idx, name, category, ai_fill=False, links=()):
+    """生成一篇合成文档(frontmatter + 标题/段落/代码块/表格/列表)
+
+    @param   ai_fill: 为True时每一节附带AI填空块(模拟--ai-fill生成的模块文档)
+    @param   links: 文首"相关文档"行中的链接目标列表
+    """
+    lines = [
+        "---",
+        f"title: {name} 模块说明",
+        f"category: {category}",
+        f"date: 2025-{idx % 12 + 1:02d}-{idx % 28 + 1:02d}",
+        "author: Bench",
+        f"tags: [{rng.choice(SYNTH_WORDS_EN)}, {rng.choice(SYNTH_WORDS_EN)}]",
+        f"status: {rng.choice(['draft', 'review', 'published'])}",
+        "---",
+        "",
+        f"# {name}",
+        "",
+    ]
+    if links:
+        lines += ["相关文档: " + ", ".join(f"[{posixpath.basename(h)}]({h})" for h in links), ""]
+    for sec in range(rng.randint(3, 6)):
+        lines += [f"## 第{sec + 1}节 {rng.choice(SYNTH_WORDS_EN)}", ""]
+        if ai_fill:
+            lines += synth_ai_fill(rng, f"section_{sec + 1}")
+        for _ in range(rng.randint(1, 3)):
+            lines += [" ".join(synth_sentence(rng) for _ in range(3)), ""]
+        kind = rng.random()
+        if kind < 0.3:
+            lines += ["```c", f"void {name}_{sec}(void)", "{", "    # not a heading", "}", "```", ""]
+        elif kind < 0.5:
+            lines += ["| 参数 | 说明 |", "|---|---|"]
+            lines += [f"| `{rng.choice(SYNTH_WORDS_EN)}` | {synth_sentence(rng)} |" for _ in range(4)]
+            lines.append("")
+        elif kind < 0.7:
+            lines += [f"- **{rng.choice(SYNTH_WORDS_EN)}**: {synth_sentence(rng)}" for _ in range(4)]
+            lines.append("")
+        else:
+            lines += [f"> **WARNING**: {synth_sentence(rng)}", ""]
+    return "\n".join(lines)
+
+
+def make_synthetic_wiki(root, n_docs, seed=1):
+    """在root下生成包含n_docs篇文档的合成项目
+
+    - .zed/.projwiki: 多级子目录下的文档, modules分类下的文档带AI填空块;
+      每篇文档链接到首页和上一篇文档, 每50篇中有一篇带失效链接
+    - src/: 每个模块文档对应的 .c/.h 源文件, 约1/7的模块源码比文档更新(OUTDATED)
+    - build/: 应被源码扫描忽略的构建产物
+    所有文件的修改时间整体提前一小时, 模拟已存在一段时间的项目
+
+    @param   root: 项目根目录Path对象(不存在时创建)
+    @param   n_docs: 文档数量
+    @param   seed: 随机种子, 相同参数生成的项目完全相同
+    @retval  .projwiki目录的Path对象
+    """
+    rng = random.Random(seed)
+    wiki_dir = root / ".zed" / ".projwiki"
+    wiki_dir.mkdir(parents=True, exist_ok=True)
+    (wiki_dir / "index.md").write_text(synth_doc(rng, 0, "index", "root"), encoding="utf-8")
+
+    prev_rel = "index.md"
+    for i in range(1, n_docs):
+        category, subdirs = SYNTH_LAYOUT[i % len(SYNTH_LAYOUT)]
+        sub = subdirs[i % len(subdirs)]
+        name = f"mod_{i}"
+        doc_dir = wiki_dir / category / sub
+        doc_dir.mkdir(parents=True, exist_ok=True)
+        is_module = category == "modules"
+        md_path = doc_dir / f"{name}.md"
+        rel_dir = posixpath.join(category, sub)
+        links = [posixpath.relpath(t, rel_dir) for t in ("index.md", prev_rel)]
+        if i % 50 == 0:
+            links.append("missing.md")
+        md_path.write_text(
+            synth_doc(rng, i, name, category, is_module, links), encoding="utf-8"
+        )
+        prev_rel = posixpath.join(rel_dir, f"{name}.md")
+
+        if is_module:
+            src_dir = root / "src" / sub
+            src_dir.mkdir(parents=True, exist_ok=True)
+            (src_dir / f"{name}.c").write_text(
+                f'#include "{name}.h"\n\nvoid {name}_init(void)\n{{\n}}\n', encoding="utf-8"
+            )
+            (src_dir / f"{name}.h").write_text(
+                f"void {name}_init(void);\n", encoding="utf-8"
+            )
+            # 源码修改时间: 多数早于文档, 每7个模块中有一个晚于文档
+            doc_mtime = md_path.stat().st_mtime
+            offset = 60 if i % 7 == 0 else -60
+            for ext in (".c", ".h"):
+                os.utime(src_dir / f"{name}{ext}", (doc_mtime + offset, doc_mtime + offset))
+
+    build_dir = root / "build" / "obj"
+    build_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(max(1, n_docs // 10)):
+        (build_dir / f"gen_{i}.h").write_text("/* generated */\n", encoding="utf-8")
+
+    # 整体提前一小时(保持文档与源码的先后关系): 刚写入的文件处于racy窗口内,
+    # 增量构建会改为比较内容哈希, 与实际项目的热构建不符
+    for path in root.rglob("*"):
+        if path.is_file():
+            st = path.stat()
+            os.utime(path, (st.st_atime - 3600, st.st_mtime - 3600))
+    return wiki_dir
+
+
+def legacy_parse_frontmatter(content):
+    """旧版build_wiki.parse_frontmatter(对比基准用)"""
+    meta = {}
+    body = content
+    m = re.match(r"^---\s*\n(.*?)\n---\s*\n", content, re.DOTALL)
+    if m:
+        body = content[m.end() :]
+        for line in m.group(1).strip().split("\n"):
+            line = line.strip()
+            if ":" in line:
+                k, _, v = line.partition(":")
+                meta[k.strip()] = build_wiki.parse_meta_value(v.strip())
+    return meta, body
+
+
+def legacy_extract_headings(body):
+    """旧版build_wiki.extract_headings(对比基准用)"""
+    headings = []
+    in_code = False
+    for line in body.split("\n"):
+        s = line.strip()
+        if s.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        m = re.match(r"^(#{1,6})\s+(.+)$", s)
+        if m:
+            level = len(m.group(1))
+            text = m.group(2).strip()
+            anchor = re.sub(r"[^\w\u4e00-\u9fff\s-]", "", text)
+            anchor = re.sub(r"\s+", "-", anchor).lower()
+            headings.append({"level": level, "text": text, "anchor": anchor})
+    return headings
+
+
+def legacy_parse(content, default_title=""):
+    """旧版parse_doc的解析流程: 先正则切出frontmatter, 再逐行提取标题"""
+    meta, body = legacy_parse_frontmatter(content)
+    headings = legacy_extract_headings(body)
+    title = meta.get("title", "") or (headings[0]["text"] if headings else default_title)
+    return {
+        "meta": meta,
+        "headings": headings,
+        "title": title,
+        "body_offset": len(content) - len(body),
+    }
+
+
+def best_of(fn, repeat):
+    """重复执行fn, 返回最快一次的耗时(毫秒)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        ms = (time.perf_counter() - start) * 1000
+        best = ms if best is None else min(best, ms)
+    return best
+
+
+def bench_parse(n_docs, repeat=5):
+    """对比单遍扫描器scan_markdown与旧版parse_frontmatter+extract_headings
+
+    输入为内存中生成的合成文档(n_docs篇常规文档 + 1篇由全部文档拼接成的超长文档),
+    同时校验两者的解析结果一致.
+    """
+    rng = random.Random(2)
+    docs = [synth_doc(rng, i, f"mod_{i}", "modules") for i in range(n_docs)]
+    big = docs[0] + "\n" + "\n".join(d.split("---\n", 2)[2] for d in docs[1:])
+    mb = sum(len(d) for d in docs) / 1024 / 1024
+
+    def scan(content):
+        # 旧版不提取链接, 比较时忽略links字段
+        result = build_wiki.scan_markdown(content)
+        del result["links"]
+        return result
+
+    # 合成文档的标题互不重复且不含~~~围栏, 两种实现的结果应完全一致
+    mismatches = sum(legacy_parse(d) != scan(d) for d in docs)
+
+    print(f"[BENCH] parse: {n_docs} docs ({mb:.1f} MB), best of {repeat}")
+    print(f"        {'input':<14} {'legacy':>10} {'scanner':>10} {'speedup':>8}")
+    result = {"docs": n_docs, "mismatches": mismatches}
+    for label, run_old, run_new in (
+        (
+            f"{n_docs} docs",
+            lambda: [legacy_parse(d) for d in docs],
+            lambda: [build_wiki.scan_markdown(d) for d in docs],
+        ),
+        (
+            "1 large doc",
+            lambda: legacy_parse(big),
+            lambda: build_wiki.scan_markdown(big),
+        ),
+    ):
+        old_ms = best_of(run_old, repeat)
+        new_ms = best_of(run_new, repeat)
+        print(f"        {label:<14} {old_ms:>8.1f}ms {new_ms:>8.1f}ms {old_ms / new_ms:>7.1f}x")
+        result[label] = {"legacy_ms": old_ms, "scanner_ms": new_ms}
+    print(f"        result mismatches: {mismatches}")
+    return result
+
+
+def legacy_record(d):
+    """将WikiDoc转换为旧版scan_wiki的字典结构(正文单独复制一份)"""
+    return {
+        "path": d.path,
+        "title": d.title,
+        "category": d.category,
+        "date": d.date,
+        "author": d.author,
+        "tags": d.tags,
+        "status": d.status,
+        "content": d.content,
+        "body": d.content[d.body_offset :],
+        "headings": d.headings,
+        "hash": d.hash,
+        "modified": d.modified,
+    }
+
+
+def measure_retained(fn):
+    """测量fn返回值常驻的内存(tracemalloc统计, 字节)
+
+    @retval  (fn返回值, 常驻字节数) 元组
+    """
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return result, retained
+
+
+def bench_memory(wiki_dir):
+    """对比WikiDoc记录与旧版字典结构的常驻内存"""
+    docs, compact = measure_retained(lambda: build_wiki.scan_wiki(wiki_dir))
+    content_bytes = sum(sys.getsizeof(d.content) for d in docs)
+    n = len(docs)
+    del docs
+
+    # 与旧版一致: 扫描得到的每篇文档立即转为字典, 记录对象随即释放
+    _, legacy = measure_retained(
+        lambda: [legacy_record(d) for d in build_wiki.scan_wiki(wiki_dir)]
+    )
+
+    mb = 1024 * 1024
+    print(f"[BENCH] memory: {n} docs, raw content {content_bytes / mb:.1f} MB")
+    print(f"        {'layout':<12} {'retained':>10} {'per doc':>10}")
+    for label, size in (("dict", legacy), ("WikiDoc", compact)):
+        print(f"        {label:<12} {size / mb:>8.1f}MB {size / n / 1024:>8.2f}KB")
+    print(f"        saved {(legacy - compact) / mb:.1f} MB ({(1 - compact / legacy) * 100:.0f}%)")
+    return {"docs": n, "dict": legacy, "wikidoc": compact}
+
+
+def make_vendor_tree(root, n_files, seed=3):
+    """在root/vendor下生成约n_files个文件的厂商SDK目录树(模拟大型固件工程中的第三方代码)
+
+    每个目录20个文件, 约一半为 .c/.h (模块名以drv_开头, 不与合成文档重名), 其余为汇编、文档等.
+    """
+    rng = random.Random(seed)
+    exts = [".c", ".h", ".c", ".h", ".s", ".txt", ".ld", ".md"]
+    per_dir = 20
+    for d in range((n_files + per_dir - 1) // per_dir):
+        sub = root / "vendor" / f"sdk_{d % 8}" / f"lib_{d // 8 % 25}" / f"part_{d}"
+        sub.mkdir(parents=True, exist_ok=True)
+        for i in range(min(per_dir, n_files - d * per_dir)):
+            (sub / f"drv_{d}_{i}{rng.choice(exts)}").write_text("/* vendor */\n", encoding="utf-8")
+
+
+def legacy_source_mtime(root_dir, module_name):
+    """旧版check_outdated.get_source_mtime: 每个模块都完整遍历一次项目"""
+    max_mtime = 0
+    c_files = []
+    for root, dirs, files in os.walk(root_dir):
+        for skip in (".git", ".zed", "build", "Firmware"):
+            if skip in dirs:
+                dirs.remove(skip)
+        for file in files:
+            if file == f"{module_name}.c" or file == f"{module_name}.h":
+                p = Path(root) / file
+                max_mtime = max(max_mtime, p.stat().st_mtime)
+                c_files.append(str(p.relative_to(root_dir)).replace(os.sep, "/"))
+    return max_mtime, c_files
+
+
+def bench_freshness(root, wiki_dir, repeat=3):
+    """对比旧版逐模块遍历与基于共享源码索引的新鲜度检查, 并校验结果一致
+
+    - legacy: 每个模块文档一次os.walk, 开销为 O(模块数 × 文件数)
+    - index cold: 无索引文件, 一次完整遍历并建立索引
+    - index warm: 复用索引, 只检查目录修改时间并stat源文件
+    - hash cold / hash warm: --hash 模式, 无索引与基线时计算全部模块源文件的哈希并记录基线 /
+      复用索引中缓存的哈希
+    - git hash: --hash --git 模式, 将合成项目提交到git仓库后由git索引获取文件列表与blob ID,
+      并校验git模式记录的基线哈希与文件模式一致(未安装git时跳过)
+    """
+    docs = check_outdated.scan_docs(wiki_dir)
+    n_files = sum(len(files) for _, _, files in os.walk(root))
+
+    def run_legacy():
+        return {name: legacy_source_mtime(root, name) for name in docs}
+
+    def run_cold():
+        source_index_path(root).unlink(missing_ok=True)
+        return check_outdated.check_freshness(root, wiki_dir)
+
+    def run_warm():
+        return check_outdated.check_freshness(root, wiki_dir)
+
+    jobs = min(8, os.cpu_count() or 1)
+
+    def run_hash_cold():
+        source_index_path(root).unlink(missing_ok=True)
+        (wiki_dir / check_outdated.BASELINE_NAME).unlink(missing_ok=True)
+        return check_outdated.check_freshness(root, wiki_dir, use_hash=True, jobs=jobs)
+
+    def run_hash_warm():
+        return check_outdated.check_freshness(root, wiki_dir, use_hash=True, jobs=jobs)
+
+    # 旧版实现开销大, 只测一次
+    start = time.perf_counter()
+    legacy = run_legacy()
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    rows = run_cold()
+    # 文件列表顺序与遍历顺序有关, 比较时排序
+    mismatches = sum(
+        (legacy[r["module"]][0], sorted(legacy[r["module"]][1]))
+        != (r["src_mtime"], sorted(r["src_files"]))
+        for r in rows
+    ) + abs(len(legacy) - len(rows))
+
+    cold_ms = best_of(run_cold, repeat)
+    run_warm()
+    # 刚生成的目录修改时间过近, 等待其超出不可信窗口后再测量热索引
+    time.sleep(2.1)
+    run_warm()
+    warm_ms = best_of(run_warm, repeat)
+    hash_cold_ms = best_of(run_hash_cold, repeat)
+    hash_rows = run_hash_warm()
+    hash_warm_ms = best_of(run_hash_warm, repeat)
+
+    timings = [
+        ("legacy walk", "legacy_ms", legacy_ms),
+        ("index cold", "cold_ms", cold_ms),
+        ("index warm", "warm_ms", warm_ms),
+        ("hash cold", "hash_cold_ms", hash_cold_ms),
+        ("hash warm", "hash_warm_ms", hash_warm_ms),
+    ]
+    if shutil.which("git"):
+        git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", "-c", "core.autocrlf=false"]
+        for cmd in (["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "bench"]):
+            subprocess.run(git + cmd, cwd=root, check=True)
+
+        def run_git_hash():
+            return check_outdated.check_freshness(
+                root, wiki_dir, use_hash=True, jobs=jobs, use_git=True
+            )
+
+        # 首次运行时文件模式的基线不可比, 按修改时间重新记录为git模式的基线;
+        # 合成文件不涉及换行符转换, 记录的哈希应与文件模式的完全一致
+        file_baselines = check_outdated.load_baselines(wiki_dir)
+        run_git_hash()
+        git_baselines = check_outdated.load_baselines(wiki_dir)
+        mismatches += sum(
+            git_baselines.get(name, {}).get("sources") != base["sources"]
+            for name, base in file_baselines.items()
+        )
+        git_rows = run_git_hash()
+        mismatches += sum(
+            (a["status"], a["changed"]) != (b["status"], b["changed"])
+            for a, b in zip(hash_rows, git_rows)
+        )
+        timings.append(("git hash", "git_hash_ms", best_of(run_git_hash, repeat)))
+
+    print(f"[BENCH] freshness: {len(docs)} module docs, {n_files} files")
+    print(f"        {'method':<14} {'time':>10} {'speedup':>8}")
+    result = {"modules": len(docs), "files": n_files, "mismatches": mismatches}
+    for label, key, ms in timings:
+        print(f"        {label:<14} {ms:>8.1f}ms {legacy_ms / ms:>7.1f}x")
+        result[key] = ms
+    print(f"        result mismatches: {mismatches}")
+    return result
+
+
+# 流水线基准的阶段(按执行顺序)
+SUITE_PHASES = [
+    "scan_wiki",
+    "scan_wiki_warm",
+    "build_tree",
+    "link_graph",
+    "search_index",
+    "sqlite_export",
+    "sqlite_warm",
+    "generate_html",
+    "scan_sources",
+    "check_freshness",
+    "ai_fill_markers",
+]
+
+
+def time_phase(fn, repeat, budget_ms=3000.0):
+    """重复执行fn并返回最快一次的耗时(毫秒)与最后一次的返回值
+
+    累计耗时超过budget_ms后不再重复, 避免大规模下的慢阶段拖长整轮测试.
+    """
+    best = None
+    total = 0.0
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        ms = (time.perf_counter() - start) * 1000
+        best = ms if best is None else min(best, ms)
+        total += ms
+        if total > budget_ms:
+            break
+    return best, result
+
+
+def bench_pipeline(root, n_docs, repeat):
+    """在合成项目上依次测量流水线各阶段的耗时
+
+    @param   root: 合成项目根目录Path对象(应为空目录)
+    @param   n_docs: 文档数量
+    @param   repeat: 每个阶段的最多重复次数
+    @retval  {阶段名: 毫秒} 字典
+    """
+    wiki_dir = make_synthetic_wiki(root, n_docs)
+    timings = {}
+
+    def phase(name, fn):
+        timings[name], result = time_phase(fn, repeat)
+        return result
+
+    def fresh_manifest():
+        return {"version": build_wiki.MANIFEST_VERSION, "docs": {}}
+
+    docs = phase("scan_wiki", lambda: build_wiki.scan_wiki(wiki_dir, fresh_manifest()))
+    manifest = fresh_manifest()
+    build_wiki.scan_wiki(wiki_dir, manifest)
+    phase("scan_wiki_warm", lambda: build_wiki.scan_wiki(wiki_dir, manifest))
+    tree = phase("build_tree", lambda: build_wiki.build_tree(docs))
+    phase("link_graph", lambda: build_link_graph(docs))
+    phase("search_index", lambda: build_search_index(docs))
+
+    db_path = root / "bench.db"
+
+    def export_cold():
+        if db_path.exists():
+            db_path.unlink()
+        return export_sqlite(docs, db_path)
+
+    phase("sqlite_export", export_cold)
+    phase("sqlite_warm", lambda: export_sqlite(docs, db_path))
+
+    def render():
+        with open(os.devnull, "w", encoding="utf-8") as out:
+            build_wiki.write_html(out, docs, tree, root.name)
+
+    phase("generate_html", render)
+    phase("scan_sources", lambda: scaffold_docs.scan_sources(root))
+    phase("check_freshness", lambda: check_outdated.check_freshness(root, wiki_dir))
+    contents = [(d.content, d.path) for d in docs if d.category == "modules"]
+    phase(
+        "ai_fill_markers",
+        lambda: [extract_ai_fill_markers(c, p) for c, p in contents],
+    )
+    return timings
+
+
+def compare_baseline(results, baseline, tolerance, floor_ms):
+    """与基线结果逐项比较
+
+    耗时超过基线的(1 + tolerance)倍且绝对增量超过floor_ms时判定为退化,
+    floor_ms用于过滤毫秒级阶段的计时噪声.
+
+    @retval  退化项列表 [(规模, 阶段, 当前毫秒, 基线毫秒), ...]
+    """
+    regressions = []
+    for size, phases in results.items():
+        base_phases = baseline.get(size, {})
+        for name, ms in phases.items():
+            base = base_phases.get(name)
+            if base is not None and ms > base * (1 + tolerance) and ms - base > floor_ms:
+                regressions.append((size, name, ms, base))
+    return regressions
+
+
+def bench_suite(sizes, repeat, out_path=None, baseline_path=None, tolerance=0.25, floor_ms=5.0):
+    """在多个规模的合成项目上测量流水线各阶段, 可选保存结果并与基线比较
+
+    @retval  退化项数量(0表示通过)
+    """
+    baseline = None
+    if baseline_path:
+        try:
+            baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] Cannot read baseline {baseline_path}: {e}")
+            return 1
+
+    results = {}
+    for n in sizes:
+        root = Path(tempfile.mkdtemp(prefix="projwiki_bench_"))
+        try:
+            start = time.perf_counter()
+            results[str(n)] = bench_pipeline(root, n, repeat)
+            print(f"[INFO] {n} docs done in {time.perf_counter() - start:.1f} s")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    base = baseline or {}
+    header = f"{'phase':<16}" + "".join(f"{n:>12}" for n in results)
+    print(f"[BENCH] pipeline (ms, best of {repeat}" + (", vs baseline)" if baseline else ")"))
+    print("        " + header)
+    for name in SUITE_PHASES:
+        row = f"{name:<16}"
+        for size, phases in results.items():
+            ms = phases[name]
+            ref = base.get(size, {}).get(name)
+            cell = f"{ms:.1f}"
+            if ref:
+                cell += f"({(ms / ref - 1) * 100:+.0f}%)"
+            row += f"{cell:>12}"
+        print("        " + row)
+
+    if out_path:
+        data = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "repeat": repeat,
+            "results": results,
+        }
+        Path(out_path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+        print(f"[OK] Results saved: {out_path}")
+
+    if baseline is None:
+        return 0
+    regressions = compare_baseline(results, baseline, tolerance, floor_ms)
+    if regressions:
+        print(f"[FAIL] {len(regressions)} phase(s) regressed more than {tolerance * 100:.0f}%:")
+        for size, name, ms, ref in regressions:
+            print(f"       {name} @ {size} docs: {ref:.1f} ms -> {ms:.1f} ms")
+    else:
+        print(f"[OK] No phase regressed more than {tolerance * 100:.0f}% against {baseline_path}")
+    return len(regressions)
+
+
+def main():
+    """主入口函数"""
+    parser = argparse.ArgumentParser(description="ProjWiki 性能基准工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("memory", help="对比文档记录(WikiDoc)与旧版字典结构的常驻内存")
+    p.add_argument("--docs", type=int, default=10000, metavar="N", help="合成文档数量 (默认: 10000)")
+    p.add_argument("--dir", type=Path, default=None, help="合成项目目录 (默认: 临时目录)")
+    p.add_argument("--keep", action="store_true", help="保留生成的合成项目")
+
+    p = sub.add_parser("parse", help="对比单遍扫描器与旧版frontmatter/标题解析的耗时")
+    p.add_argument("--docs", type=int, default=2000, metavar="N", help="合成文档数量 (默认: 2000)")
+    p.add_argument("--repeat", type=int, default=5, metavar="N", help="重复次数, 取最快一次 (默认: 5)")
+
+    p = sub.add_parser("freshness", help="对比旧版逐模块遍历与共享源码索引的新鲜度检查耗时")
+    p.add_argument("--docs", type=int, default=500, metavar="N", help="合成文档数量, 其中1/5为模块文档 (默认: 500)")
+    p.add_argument("--files", type=int, default=20000, metavar="N", help="额外生成的厂商SDK文件数量 (默认: 20000)")
+    p.add_argument("--repeat", type=int, default=3, metavar="N", help="重复次数, 取最快一次 (默认: 3)")
+    p.add_argument("--dir", type=Path, default=None, help="合成项目目录 (默认: 临时目录)")
+    p.add_argument("--keep", action="store_true", help="保留生成的合成项目")
+
+    p = sub.add_parser("suite", help="在多个规模的合成项目上测量流水线各阶段, 可与基线比较")
+    p.add_argument(
+        "--sizes", default="100,500,2000", help="合成文档数量列表, 逗号分隔 (默认: 100,500,2000)"
+    )
+    p.add_argument("--repeat", type=int, default=3, metavar="N", help="每阶段重复次数, 取最快一次 (默认: 3)")
+    p.add_argument("--out", default=None, metavar="FILE", help="将结果保存为JSON(可作为后续比较的基线)")
+    p.add_argument("--baseline", default=None, metavar="FILE", help="基线JSON文件, 有阶段退化时返回非0")
+    p.add_argument(
+        "--tolerance", type=float, default=0.25, help="允许的耗时增幅比例 (默认: 0.25, 即25%%)"
+    )
+    p.add_argument(
+        "--floor", type=float, default=5.0, metavar="MS", help="低于该绝对增量(毫秒)的变化不视为退化 (默认: 5)"
+    )
+    args = parser.parse_args()
+
+    if args.command == "parse":
+        bench_parse(args.docs, args.repeat)
+        return 0
+    if args.command == "suite":
+        sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+        failed = bench_suite(
+            sizes, args.repeat, args.out, args.baseline, args.tolerance, args.floor
+        )
+        return 1 if failed else 0
+
+    root = args.dir or Path(tempfile.mkdtemp(prefix="projwiki_bench_"))
+    try:
+        wiki_dir = make_synthetic_wiki(root, args.docs)
+        print(f"[INFO] Synthetic project: {root} ({args.docs} docs)")
+        if args.command == "memory":
+            bench_memory(wiki_dir)
+        elif args.command == "freshness":
+            make_vendor_tree(root, args.files)
+            bench_freshness(root, wiki_dir, args.repeat)
+    finally:
+        if not args.keep and args.dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,12 +8,80 @@
 @attention 生成的HTML为自包含文件, 可直接在浏览器中打开
 """
 
+import argparse
+import base64
+import contextlib
+import filecmp
+import gzip
+import hashlib
+import io
 import json
 import os
 import re
+import sqlite3
 import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import quote
+
+import perf_trace
+from link_graph import build_link_graph
+from md_render import RENDER_VERSION, heading_anchor, render_markdown, unique_anchor
+from preview_server import LIVERELOAD_PATH, start_preview_server
+from search_index import build_search_index
+from wiki_common import RACY_NS, meta_text
+from wiki_db import default_db_path, export_sqlite
+
+# 构建缓存目录(位于.projwiki下), 保存增量构建所需的文档清单
+CACHE_DIRNAME = ".build_cache"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 3
+RENDER_CACHE_NAME = "render_cache.json"
+
+# 扫描时跳过的目录前缀(相对.projwiki)
+SKIP_PREFIXES = ("_site/", ".ai_tasks/", CACHE_DIRNAME + "/")
+
+# frontmatter起止行(结束行之后紧跟的空行一并跳过, 与旧版正则的正文偏移一致)
+RE_FM_OPEN = re.compile(r"---[^\S\n]*\n")
+RE_FM_CLOSE = re.compile(r"^---[^\S\n]*(?:\n\s*\n|\n|\Z)", re.MULTILINE)
+
+# scan_markdown匹配的行: 代码围栏行 或 ATX标题行(行首空白不计)
+# 以换行符开头, 正则引擎可以直接定位到各行行首, 无需逐字符尝试^锚点
+RE_MD_LINE = re.compile(
+    r"\n[^\S\n]*(?:(?P<fence>`{3,}|~{3,})|(?P<hashes>#{1,6})[^\S\n]+(?P<text>\S[^\n]*))"
+)
+
+# 行内链接 [文字](目标), 图片 ![alt](src) 不计; 与md_render的链接规则一致(限单行)
+RE_LINK = re.compile(r"(?<!!)\[[^\]\n]+\]\((?P<target>[^)\n]+)\)")
+
+# 含有链接的文档使用的扫描正则: 在RE_MD_LINE的基础上同时匹配行内链接,
+# 标题、围栏与链接在同一遍中得到(标题行整行被标题分支消耗, 其中的链接另行提取).
+# 链接分支不带后顾断言(否则正则引擎无法按首字符快速跳过), 图片由调用方排除
+RE_MD_SCAN = re.compile(RE_MD_LINE.pattern + r"|\[[^\]\n]+\]\((?P<target>[^)\n]+)\)")
+
+# 分片输出模式下每个分片的目标文档数
+DOCS_PER_SHARD = 32
+
+# 文档数据中内容哈希的长度(十六进制位数), 查看器以此为键在IndexedDB中缓存文档
+CLIENT_HASH_LEN = 16
+
+# HTML模板占位符: 数据占位符写成JS注释形式(模板本身仍是合法JS), 文本占位符直接替换
+RE_PLACEHOLDER = re.compile(
+    r"/\*__(DOCS_DATA|TREE_DATA|VIEWER_CONFIG|SEARCH_INDEX)__\*/"
+    r"|__(BUILD_INFO|DOC_COUNT|PROJECT_NAME)__"
+)
+
+# load_template切分后的模板(进程内缓存)
+_template_parts = None
+
+# 批量模式下查找项目时跳过的目录(隐藏目录一律跳过)
+BATCH_SKIP_DIRS = {"node_modules", "__pycache__", "build", "Build", "output", "venv"}
+
+# 批量构建工作进程中的命令行参数(由init_batch_worker设置)
+_batch_args = None
 
 
 def find_project_root():
@@ -27,138 +95,430 @@ def find_project_root():
     sys.exit(1)
 
 
-def parse_frontmatter(content):
-    """解析Markdown YAML frontmatter元数据
+def parse_meta_value(v):
+    """解析frontmatter中的单个值(数组、引号字符串或原样字符串)"""
+    if v.startswith("[") and v.endswith("]"):
+        return [x.strip().strip("'").strip('"') for x in v[1:-1].split(",") if x.strip()]
+    if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
+        return v[1:-1]
+    return v
+
+
+def scan_markdown(content, default_title=""):
+    """单遍扫描Markdown文档, 同时得到frontmatter元数据、正文偏移、标题结构、链接和文档标题
+
+    标题扫描使用一个预编译的正则, 只命中可能是代码围栏(``` 或 ~~~)或标题的行,
+    其余行由正则引擎直接跳过; 内容中含有 "](" 时改用同时匹配行内链接的正则,
+    链接在同一遍中提取, 位于代码围栏内的链接不计. 围栏只由同种字符且不短于开始标记的行关闭;
+    重名标题的锚点依次追加 -1、-2 后缀, 与查看器/md_render的渲染结果一致.
 
     @param   content: Markdown文件完整内容
-    @retval  (meta_dict, body_string) 元组
+    @param   default_title: 没有title元数据且没有标题时使用的文档标题
+    @retval  字典 {meta, headings: [{level, text, anchor}, ...], links: [[目标, 行号], ...],
+             title, body_offset}
     """
     meta = {}
-    body = content
-    m = re.match(r"^---\s*\n(.*?)\n---\s*\n", content, re.DOTALL)
+    body_offset = 0
+    m = RE_FM_OPEN.match(content)
     if m:
-        body = content[m.end() :]
-        for line in m.group(1).strip().split("\n"):
-            line = line.strip()
-            if ":" in line:
-                k, _, v = line.partition(":")
-                k = k.strip()
-                v = v.strip()
-                # 解析数组
-                if v.startswith("[") and v.endswith("]"):
-                    v = [
-                        x.strip().strip("'").strip('"')
-                        for x in v[1:-1].split(",")
-                        if x.strip()
-                    ]
-                # 解析引号字符串
-                elif (v.startswith('"') and v.endswith('"')) or (
-                    v.startswith("'") and v.endswith("'")
-                ):
-                    v = v[1:-1]
-                meta[k] = v
-    return meta, body
-
-
-def extract_headings(body):
-    """从Markdown正文中提取标题结构(用于目录生成)
-
-    @param   body: 去除frontmatter后的Markdown内容
-    @retval  标题列表 [{level, text, anchor}, ...]
-    """
+        close = RE_FM_CLOSE.search(content, m.end())
+        if close:
+            for line in content[m.end() : close.start()].split("\n"):
+                k, sep, v = line.strip().partition(":")
+                if sep:
+                    meta[k.strip()] = parse_meta_value(v.strip())
+            body_offset = close.end()
+
     headings = []
-    in_code = False
-    for line in body.split("\n"):
-        s = line.strip()
-        if s.startswith("```"):
-            in_code = not in_code
+    used = {}
+    fence = None
+    links = []
+    with_links = "](" in content
+    # 从正文前的换行符开始匹配(正文位于文件开头时补一个换行符, 匹配位置相应偏移1)
+    pattern = RE_MD_SCAN if with_links else RE_MD_LINE
+    if body_offset:
+        text_src = content
+        shift = 0
+    else:
+        text_src = "\n" + content
+        shift = 1
+    # 链接的行号从正文起始行开始, 按相邻两个链接之间的换行符数递增
+    line = content.count("\n", 0, body_offset) + 1 if with_links else 0
+    pos = body_offset
+    search = pattern.search
+    at = body_offset - 1 + shift
+    while True:
+        m = search(text_src, at)
+        if m is None:
+            break
+        at = m.end()
+        kind = m.lastgroup
+        if kind == "target" and text_src[m.start() - 1] == "!":
+            # 图片 ![alt](src) 不计, 从下一个字符继续(alt中可能还有链接)
+            at = m.start() + 1
             continue
-        if in_code:
+        if kind == "fence":
+            run = m.group("fence")
+            if fence is None:
+                fence = run
+            elif run.startswith(fence):
+                fence = None
             continue
-        m = re.match(r"^(#{1,6})\s+(.+)$", s)
-        if m:
-            level = len(m.group(1))
-            text = m.group(2).strip()
-            anchor = re.sub(r"[^\w\u4e00-\u9fff\s-]", "", text)
-            anchor = re.sub(r"\s+", "-", anchor).lower()
-            headings.append({"level": level, "text": text, "anchor": anchor})
-    return headings
+        if fence is not None:
+            continue
+        if kind == "target":
+            found = (m,)
+        else:
+            text = m.group("text").rstrip()
+            headings.append(
+                {
+                    "level": len(m.group("hashes")),
+                    "text": text,
+                    "anchor": unique_anchor(used, heading_anchor(text)),
+                }
+            )
+            if not with_links:
+                continue
+            found = RE_LINK.finditer(text_src, m.start("text"), m.end())
+        for lm in found:
+            off = lm.start() - shift
+            line += content.count("\n", pos, off)
+            pos = off
+            links.append([lm.group("target").strip(), line])
+
+    title = meta.get("title", "")
+    if not title:
+        title = headings[0]["text"] if headings else default_title
+
+    return {
+        "meta": meta,
+        "headings": headings,
+        "links": links,
+        "title": title,
+        "body_offset": body_offset,
+    }
+
 
+def content_hash(content):
+    """计算文档内容哈希(用于增量构建判定)
 
-def scan_wiki(wiki_dir):
+    @param   content: 文档完整内容字符串
+    @retval  sha1十六进制字符串
+    """
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def load_manifest(cache_dir):
+    """加载增量构建清单
+
+    @param   cache_dir: 构建缓存目录Path对象
+    @retval  清单字典 {version, docs: {path: entry}}, 不存在或版本不符时返回空清单
+    """
+    empty = {"version": MANIFEST_VERSION, "docs": {}}
+    path = Path(cache_dir) / MANIFEST_NAME
+    if not path.exists():
+        return empty
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable manifest {path}: {e}")
+        return empty
+    perf_trace.count_read(path)
+    if data.get("version") != MANIFEST_VERSION or not isinstance(data.get("docs"), dict):
+        return empty
+    return data
+
+
+def save_manifest(cache_dir, manifest):
+    """保存增量构建清单
+
+    @param   cache_dir: 构建缓存目录Path对象
+    @param   manifest: scan_wiki更新后的清单字典
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False), encoding="utf-8"
+    )
+    perf_trace.count_written(cache_dir / MANIFEST_NAME)
+
+
+def parse_doc(md_file, content):
+    """解析单个文档, 生成可缓存的清单条目
+
+    @param   md_file: 文档Path对象(用于推断默认标题)
+    @param   content: 文档完整内容
+    @retval  清单条目字典 {meta, headings, links, title, body_offset}
+    """
+    return scan_markdown(content, md_file.stem.replace("_", " ").title())
+
+
+class WikiDoc:
+    """文档记录(scan_wiki的结果项)
+
+    使用__slots__代替字典以减少每篇文档的内存开销; 正文不单独保存,
+    由content与body_offset按需切片得到.
+    """
+
+    __slots__ = (
+        "path",
+        "title",
+        "category",
+        "date",
+        "author",
+        "tags",
+        "status",
+        "content",
+        "body_offset",
+        "headings",
+        "links",
+        "hash",
+        "mtime",
+        "meta",
+        "html",
+        "backlinks",
+    )
+
+    def __init__(
+        self,
+        path,
+        title,
+        category,
+        date,
+        author,
+        tags,
+        status,
+        content,
+        body_offset,
+        headings,
+        links,
+        hash,
+        mtime,
+        meta=None,
+    ):
+        self.path = path
+        # frontmatter的数组写法(如模板中的 title: [API名称])解析为列表, 统一连接为文本
+        self.title = meta_text(title)
+        self.category = meta_text(category)
+        self.date = meta_text(date)
+        self.author = meta_text(author)
+        self.tags = tags if isinstance(tags, list) else []
+        self.status = meta_text(status)
+        self.content = content
+        self.body_offset = body_offset
+        self.headings = headings
+        self.links = links
+        self.hash = hash
+        self.mtime = mtime
+        # frontmatter元数据原文(与清单条目共享, 供module/layer等未单独建字段的属性使用)
+        self.meta = meta if meta is not None else {}
+        # 预渲染的正文HTML(--prerender), None表示由查看器渲染
+        self.html = None
+        # 链接到本文档的文档下标列表(build_site中由链接图填充)
+        self.backlinks = []
+
+    @property
+    def body(self):
+        """去除frontmatter后的正文"""
+        return self.content[self.body_offset :]
+
+    @property
+    def client_body_offset(self):
+        """查看器中的正文偏移(JS字符串按UTF-16码元计数, frontmatter含BMP外字符时与body_offset不同)"""
+        head = self.content[: self.body_offset]
+        return self.body_offset if head.isascii() else len(head.encode("utf-16-le")) // 2
+
+    @property
+    def modified(self):
+        """文件修改时间(显示用)"""
+        return datetime.fromtimestamp(self.mtime).strftime("%Y-%m-%d %H:%M")
+
+
+def load_doc(md_file, rel, entry=None):
+    """读取并解析单个文档(可在线程池中并发调用)
+
+    @param   md_file: 文档Path对象
+    @param   rel: 相对.projwiki的路径(使用/分隔)
+    @param   entry: 该路径在清单中的旧条目, None表示无缓存
+    @retval  (WikiDoc, 新清单条目, 状态) 元组, 状态为 new/changed/reused;
+             读取失败时返回None
+    """
+    # 先stat后读取: 读取期间的修改只会让记录的mtime偏旧, 下次构建时重新比较哈希
+    racy_before = time.time() - RACY_NS / 1e9
+    try:
+        st = md_file.stat()
+        content = md_file.read_text(encoding="utf-8")
+    except Exception as e:
+        print(f"[WARN] Cannot read {md_file}: {e}")
+        return None
+    perf_trace.count(files=1, read=st.st_size)
+
+    # 增量判定: 先比较mtime/size, 再比较内容哈希
+    if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+        state = "reused"
+    else:
+        digest = content_hash(content)
+        if entry and entry["hash"] == digest:
+            state = "reused"
+        else:
+            state = "changed" if entry else "new"
+            entry = dict(parse_doc(md_file, content), hash=digest)
+        # racy规则: mtime距读取时刻过近的文件, 同一时间戳内仍可能被再次修改,
+        # 不记录mtime, 下次构建时重新比较内容哈希
+        mtime = st.st_mtime if st.st_mtime < racy_before else None
+        entry = dict(entry, mtime=mtime, size=st.st_size)
+
+    meta = entry["meta"]
+
+    # 从路径推断分类
+    parts = rel.split("/")
+    cat = parts[0] if len(parts) > 1 else "root"
+
+    doc = WikiDoc(
+        path=rel,
+        title=entry["title"],
+        category=meta.get("category", cat),
+        date=meta.get("date", ""),
+        author=meta.get("author", "Unknown"),
+        tags=meta.get("tags", []),
+        status=meta.get("status", "draft"),
+        content=content,
+        body_offset=entry["body_offset"],
+        headings=entry["headings"],
+        links=entry["links"],
+        hash=entry["hash"],
+        mtime=st.st_mtime,
+        meta=meta,
+    )
+    return doc, entry, state
+
+
+def scan_wiki(wiki_dir, manifest=None, stats=None, jobs=1):
     """扫描.projwiki目录, 收集所有MD文件信息
 
+    传入manifest时启用增量模式: mtime与size未变的文件直接复用缓存的解析结果,
+    内容哈希未变的文件同样复用, 只有新增或内容变化的文件才重新解析.
+    扫描结束后manifest被原地更新为本次扫描结果(已删除文件的条目被移除).
+
+    jobs大于1时文件读取与解析分发到线程池并发执行(适合网络盘等I/O延迟较高的场景),
+    结果仍按路径排序返回, 与串行扫描完全一致.
+
     @param   wiki_dir: .projwiki目录的Path对象
-    @retval  文档信息列表
+    @param   manifest: load_manifest返回的清单字典, None表示全量解析
+    @param   stats: 可选字典, 写入 new/changed/removed/reused 计数
+    @param   jobs: 并发读取/解析的线程数, 1表示串行
+    @retval  WikiDoc列表
     """
     docs = []
+    counts = {"new": 0, "changed": 0, "removed": 0, "reused": 0}
     wp = Path(wiki_dir)
     if not wp.exists():
         print(f"[WARN] Wiki directory not found: {wiki_dir}")
         return docs
 
-    for md_file in sorted(wp.rglob("*.md")):
+    old_entries = manifest["docs"] if manifest is not None else {}
+    new_entries = {}
+
+    # 收集待处理文件, 跳过_site目录、.ai_tasks目录和构建缓存目录下的文件
+    # 按路径分段排序(不依赖Path在各平台上的大小写比较规则), 保证输出顺序稳定
+    files = []
+    for md_file in wp.rglob("*.md"):
         rel = str(md_file.relative_to(wp)).replace("\\", "/")
+        if not rel.startswith(SKIP_PREFIXES):
+            files.append((md_file, rel))
+    files.sort(key=lambda item: item[1].split("/"))
 
-        # 跳过_site目录和.ai_tasks目录下的文件
-        if rel.startswith("_site/") or rel.startswith(".ai_tasks/"):
-            continue
+    def work(item):
+        md_file, rel = item
+        return load_doc(md_file, rel, old_entries.get(rel))
 
-        try:
-            content = md_file.read_text(encoding="utf-8")
-        except Exception as e:
-            print(f"[WARN] Cannot read {md_file}: {e}")
+    if jobs > 1 and len(files) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(work, files))
+    else:
+        results = [work(item) for item in files]
+
+    for result in results:
+        if result is None:
             continue
+        doc, entry, state = result
+        counts[state] += 1
+        new_entries[doc.path] = entry
+        docs.append(doc)
 
-        meta, body = parse_frontmatter(content)
-        headings = extract_headings(body)
+    counts["removed"] = len(set(old_entries) - set(new_entries))
+    if manifest is not None:
+        manifest["docs"] = new_entries
+    if stats is not None:
+        stats.update(counts)
 
-        # 从路径推断分类
-        parts = rel.split("/")
-        cat = parts[0] if len(parts) > 1 else "root"
+    return docs
 
-        # 确定文档标题
-        title = meta.get("title", "")
-        if not title:
-            if headings:
-                title = headings[0]["text"]
-            else:
-                title = md_file.stem.replace("_", " ").title()
-
-        docs.append(
-            {
-                "path": rel,
-                "title": title,
-                "category": meta.get("category", cat),
-                "date": meta.get("date", ""),
-                "author": meta.get("author", "Unknown"),
-                "tags": meta.get("tags", []),
-                "status": meta.get("status", "draft"),
-                "content": content,
-                "body": body,
-                "headings": headings,
-                "modified": datetime.fromtimestamp(md_file.stat().st_mtime).strftime(
-                    "%Y-%m-%d %H:%M"
-                ),
-            }
-        )
 
-    return docs
+def load_render_cache(cache_dir):
+    """加载预渲染缓存
+
+    @param   cache_dir: 构建缓存目录Path对象
+    @retval  {内容哈希: HTML} 字典, 渲染器版本变化时返回空字典
+    """
+    path = Path(cache_dir) / RENDER_CACHE_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable render cache {path}: {e}")
+        return {}
+    perf_trace.count_read(path)
+    if data.get("version") != RENDER_VERSION:
+        return {}
+    return data.get("html", {})
+
+
+def save_render_cache(cache_dir, cache):
+    """保存预渲染缓存
+
+    @param   cache_dir: 构建缓存目录Path对象
+    @param   cache: prerender_docs返回的 {内容哈希: HTML} 字典
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / RENDER_CACHE_NAME).write_text(
+        json.dumps({"version": RENDER_VERSION, "html": cache}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    perf_trace.count_written(cache_dir / RENDER_CACHE_NAME)
+
 
+def prerender_docs(docs, cache):
+    """构建时将文档正文预渲染为HTML, 写入每个文档的html字段
 
-def count_items_recursive(node):
-    """递归计算子目录中的文档总数"""
-    total = len(node.get("items", []))
-    for sub in node.get("subdirs", {}).values():
-        total += count_items_recursive(sub)
-    return total
+    以文档内容哈希为键复用缓存, 未变化的文档不会重复渲染.
+
+    @param   docs: 文档列表
+    @param   cache: load_render_cache返回的旧缓存
+    @retval  (新缓存字典, 实际渲染的文档数) 元组, 新缓存只保留当前文档的条目
+    """
+    new_cache = {}
+    rendered = 0
+    for d in docs:
+        html = cache.get(d.hash)
+        if html is None:
+            html = render_markdown(d.body)
+            rendered += 1
+        d.html = html
+        new_cache[d.hash] = html
+    return new_cache, rendered
 
 
 def build_tree(docs):
     """构建文档分类树结构，支持子文件夹
 
+    每个节点的count为该节点下(含各级子目录)的文档总数, 构建时随文档逐级累加,
+    查看器直接显示而无需遍历子树.
+
     @param   docs: scan_wiki返回的文档列表
-    @retval  分类树字典 {category: {name, items: [...], subdirs: {...}}}
+    @retval  分类树字典 {category: {name, count, items: [...], subdirs: {...}}}
     """
     category_names = {
         "root": "项目总览",
@@ -172,15 +532,17 @@ def build_tree(docs):
     # 首先按分类分组
     tree = {}
     for d in docs:
-        c = d["category"]
+        c = d.category
         if c not in tree:
             tree[c] = {
                 "name": category_names.get(c, c.title()),
+                "count": 0,
                 "items": [],
                 "subdirs": {},
             }
+        tree[c]["count"] += 1
 
-        path_parts = d["path"].split("/")
+        path_parts = d.path.split("/")
 
         # 如果路径有子目录（如 modules/middleware/ethercat/xxx.md）
         if len(path_parts) > 2:
@@ -194,137 +556,1098 @@ def build_tree(docs):
                 if part not in current["subdirs"]:
                     current["subdirs"][part] = {
                         "name": part,
+                        "count": 0,
                         "items": [],
                         "subdirs": {},
                     }
                 current = current["subdirs"][part]
+                current["count"] += 1
 
             # 将文档添加到最深层子目录
             current["items"].append(
                 {
-                    "path": d["path"],
-                    "title": d["title"],
-                    "status": d["status"],
-                    "date": d["date"],
+                    "path": d.path,
+                    "title": d.title,
+                    "status": d.status,
+                    "date": d.date,
                 }
             )
         else:
             # 直接放在分类下
             tree[c]["items"].append(
                 {
-                    "path": d["path"],
-                    "title": d["title"],
-                    "status": d["status"],
-                    "date": d["date"],
+                    "path": d.path,
+                    "title": d.title,
+                    "status": d.status,
+                    "date": d.date,
                 }
             )
 
     return tree
 
 
-def generate_html(docs, tree, project_name):
-    """加载HTML模板并注入文档数据生成完整HTML
+def assign_shards(docs, per_shard=DOCS_PER_SHARD):
+    """为分片输出模式分配每个文档所在的分片编号
+
+    按路径的CRC32取模分桶, 同一文档在分片数不变时始终落在同一分片,
+    单篇文档修改只会影响一个分片文件.
 
+    @param   docs: 文档列表
+    @param   per_shard: 每个分片的目标文档数
+    @retval  {path: 分片编号} 字典
+    """
+    count = max(1, -(-len(docs) // per_shard))
+    return {d.path: zlib.crc32(d.path.encode("utf-8")) % count for d in docs}
+
+
+def temp_path(path):
+    """输出文件在同一目录下的临时文件路径(写完后用os.replace原子替换)"""
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def write_if_changed(path, text):
+    """仅在内容变化时写入文件(经临时文件原子替换)
+
+    @param   path: 输出文件Path对象
+    @param   text: 文件内容
+    @retval  实际写入返回True, 内容相同跳过返回False
+    """
+    data = text.encode("utf-8")
+    try:
+        if path.stat().st_size == len(data):
+            perf_trace.count(read=len(data))
+            if path.read_bytes() == data:
+                return False
+    except OSError:
+        pass
+    tmp = temp_path(path)
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    perf_trace.count(files=1, written=len(data))
+    return True
+
+
+class AtomicOutput:
+    """流式写出文本文件的上下文管理器: 内容先写入同目录下的临时文件,
+    结束时与现有文件逐字节比较, 相同则丢弃临时文件(现有文件及其mtime不变),
+    否则用os.replace整体替换. 写出过程中出错时删除临时文件, 现有文件不受影响.
+
+    用法: with AtomicOutput(path) as out: out.write(...); 结束后由changed判断是否实际写入
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tmp = temp_path(self.path)
+        self.out = None
+        self.changed = False
+
+    def __enter__(self):
+        self.out = open(self.tmp, "w", encoding="utf-8")
+        return self.out
+
+    def __exit__(self, exc_type, exc, tb):
+        self.out.close()
+        if exc_type is not None:
+            self.tmp.unlink(missing_ok=True)
+            return False
+        if self.path.is_file() and filecmp.cmp(self.tmp, self.path, shallow=False):
+            perf_trace.count_read(self.path)
+            self.tmp.unlink()
+        else:
+            os.replace(self.tmp, self.path)
+            self.changed = True
+        return False
+
+
+def write_shards(docs, shard_map, shard_dir):
+    """写出分片文件, 每个分片是一个通过 __pwChunk 回调注册文档内容的JS文件
+
+    使用<script>加载而非fetch, 保证直接以file://打开HTML时同样可用.
+    未变化的分片不会被重写, 不再使用的旧分片会被删除.
+
+    @param   docs: 文档列表
+    @param   shard_map: assign_shards返回的 {path: 分片编号} 字典
+    @param   shard_dir: 分片输出目录Path对象
+    @retval  (分片总数, 实际写入的分片数) 元组
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    buckets = {}
+    for d in docs:
+        # 分片中只放由正文决定的数据(正文及正文偏移、标题列表、预渲染HTML), 查看器可按内容哈希缓存;
+        # 修改时间与反向链接随HTML中的文档元数据输出
+        rec = {
+            "content": d.content,
+            "body_offset": d.client_body_offset,
+            "headings": d.headings,
+            "hash": d.hash[:CLIENT_HASH_LEN],
+        }
+        if d.html is not None:
+            rec["html"] = d.html
+        buckets.setdefault(shard_map[d.path], {})[d.path] = rec
+
+    written = 0
+    names = set()
+    for idx, contents in sorted(buckets.items()):
+        name = f"chunk_{idx}.js"
+        names.add(name)
+        text = f"__pwChunk({idx}, {json.dumps(contents, ensure_ascii=False)});\n"
+        if write_if_changed(shard_dir / name, text):
+            written += 1
+
+    # 清理分片数变化后遗留的旧分片
+    for old in shard_dir.glob("chunk_*.js"):
+        if old.name not in names:
+            old.unlink()
+
+    return len(buckets), written
+
+
+def write_search_index(docs, shard_dir, term_cache=None):
+    """分片模式下将搜索索引写入独立的JS文件, 查看器首次搜索时再加载
+
+    @param   docs: 文档列表
+    @param   shard_dir: 分片输出目录Path对象
+    @param   term_cache: 可选的分词结果缓存(见build_search_index)
+    @retval  实际写入返回True, 内容未变化返回False
+    """
+    index_json = json.dumps(build_search_index(docs, term_cache), ensure_ascii=False)
+    return write_if_changed(
+        shard_dir / "search_index.js", f"__pwSearchIndex({index_json});\n"
+    )
+
+
+def load_template():
+    """读取HTML模板并在所有占位符处切分(只切分一次, 多次构建复用)
+
+    @retval  [文本, 占位符名, 文本, 占位符名, ..., 文本] 列表, 奇数下标为占位符名
+    """
+    global _template_parts
+    if _template_parts is None:
+        tpl_path = Path(__file__).resolve().parent / "viewer_template.html"
+        if not tpl_path.exists():
+            print(f"[ERROR] HTML template not found: {tpl_path}")
+            print(
+                "[HINT] viewer_template.html should be in the same directory as build_wiki.py"
+            )
+            sys.exit(1)
+        text = tpl_path.read_text(encoding="utf-8")
+        parts = []
+        pos = 0
+        for m in RE_PLACEHOLDER.finditer(text):
+            parts.append(text[pos : m.start()])
+            parts.append(m.group(1) or m.group(2))
+            pos = m.end()
+        parts.append(text[pos:])
+        _template_parts = parts
+    return _template_parts
+
+
+class PayloadWriter:
+    """向输出流写入注入HTML的JSON数据
+
+    普通模式下直接写出, 并将 "</" 转义为 "<\\/" 防止正文中的 </script> 提前结束脚本;
+    压缩模式下边写边gzip压缩并base64编码, 输出 {"gz": "..."}, 查看器使用浏览器内置的
+    DecompressionStream解压. 两种模式都不需要在内存中拼出完整的JSON字符串.
+    """
+
+    def __init__(self, out, compress=False, stats=None):
+        """
+        @param   out: 文本输出流
+        @param   compress: 是否压缩
+        @param   stats: 可选字典, 压缩时累加 raw/compressed 字节数与 decode_ms(本地解压校验耗时)
+        """
+        self.out = out
+        self.compress = compress
+        self.stats = stats
+        if compress:
+            # wbits=31 输出gzip格式, 头中时间戳为0, 相同内容的压缩结果保持一致
+            self.comp = zlib.compressobj(9, zlib.DEFLATED, 31)
+            self.decomp = zlib.decompressobj(31)
+            self.pending = b""
+            self.raw = 0
+            self.packed = 0
+            self.decode_ms = 0.0
+            out.write('{"gz": "')
+
+    def write(self, text):
+        if not self.compress:
+            self.out.write(text.replace("</", "<\\/"))
+            return
+        data = text.encode("utf-8")
+        self.raw += len(data)
+        self._emit(self.comp.compress(data))
+
+    def _emit(self, data):
+        if not data:
+            return
+        if self.stats is not None:
+            # 同步解压一遍作为校验, 并给出解码耗时的参考值
+            start = time.perf_counter()
+            self.decomp.decompress(data)
+            self.decode_ms += (time.perf_counter() - start) * 1000
+        # base64按3字节对齐分段编码, 余下的字节留到下一段
+        buf = self.pending + data
+        cut = len(buf) - len(buf) % 3
+        self.pending = buf[cut:]
+        self._write_b64(buf[:cut])
+
+    def _write_b64(self, data):
+        if data:
+            b64 = base64.b64encode(data).decode("ascii")
+            self.packed += len(b64)
+            self.out.write(b64)
+
+    def close(self):
+        if not self.compress:
+            return
+        self._emit(self.comp.flush())
+        self._write_b64(self.pending)
+        self.pending = b""
+        self.out.write('"}')
+        if self.stats is not None:
+            if not self.decomp.eof:
+                raise ValueError("compressed payload failed to decode")
+            self.stats["raw"] = self.stats.get("raw", 0) + self.raw
+            self.stats["compressed"] = self.stats.get("compressed", 0) + self.packed
+            self.stats["decode_ms"] = self.stats.get("decode_ms", 0.0) + self.decode_ms
+
+
+def write_index_json(w, index):
+    """按词项逐条写出搜索索引JSON(格式见build_search_index)"""
+    w.write(f'{{"v": {index["v"]}, "n": {index["n"]}, "terms": {{')
+    first = True
+    for term, postings in index["terms"].items():
+        if not first:
+            w.write(", ")
+        first = False
+        w.write(json.dumps(term, ensure_ascii=False))
+        w.write(": ")
+        w.write(json.dumps(postings, separators=(",", ":")))
+    w.write("}}")
+
+
+def viewer_cache_version():
+    """查看器文档缓存的版本号
+
+    缓存中保存渲染后的HTML, 渲染器(md_render或模板中的renderMarkdown)变化时须整体失效,
+    因此由渲染器版本与模板内容共同决定.
+
+    @retval  形如 "<渲染器版本>.<模板哈希前8位>" 的字符串
+    """
+    digest = hashlib.sha1("\0".join(load_template()).encode("utf-8")).hexdigest()
+    return f"{RENDER_VERSION}.{digest[:8]}"
+
+
+def write_html(
+    out,
+    docs,
+    tree,
+    project_name,
+    shard_map=None,
+    shard_base="",
+    compress=False,
+    stats=None,
+    term_cache=None,
+    livereload="",
+    build_id=None,
+):
+    """将文档数据注入HTML模板, 流式写入输出流
+
+    模板按占位符切分后依次写出, 文档数据逐篇序列化, 峰值内存不随输出体积增长.
+
+    @param   out: 文本输出流
     @param   docs: 文档列表
     @param   tree: 分类树
     @param   project_name: 项目名称
+    @param   shard_map: 分片模式下的 {path: 分片编号} 字典, None表示单文件自包含模式
+    @param   shard_base: 分片目录相对HTML文件的URL前缀(以/结尾)
+    @param   compress: 是否以gzip+base64形式嵌入文档数据与搜索索引
+    @param   stats: 可选字典, 压缩模式下写入压缩统计(见PayloadWriter)
+    @param   term_cache: 可选的分词结果缓存(见build_search_index)
+    @param   livereload: 预览服务器的实时刷新事件流路径, 空字符串表示不启用
+    @param   build_id: 可复现模式下的构建标识(见compute_build_id), 此时输出中不含
+             构建时间与文件修改时间; None表示普通模式
+    """
+
+    def doc_record(d):
+        rec = {
+            "path": d.path,
+            "title": d.title,
+            "category": d.category,
+            "date": d.date,
+            "author": d.author,
+            "tags": d.tags,
+            "status": d.status,
+            "hash": d.hash[:CLIENT_HASH_LEN],
+        }
+        if build_id is None:
+            rec["modified"] = d.modified
+        if d.backlinks:
+            rec["backlinks"] = d.backlinks
+        # 分片模式下正文由查看器按需加载(或直接取自查看器缓存), HTML中只保留分片编号
+        if shard_map is None:
+            rec["headings"] = d.headings
+            rec["content"] = d.content
+            rec["body_offset"] = d.client_body_offset
+            if d.html is not None:
+                rec["html"] = d.html
+        else:
+            rec["chunk"] = shard_map[d.path]
+        return rec
+
+    def write_docs():
+        # 逐篇序列化文档数据(不含body字段, 减小体积)
+        w = PayloadWriter(out, compress, stats)
+        w.write("[")
+        for i, d in enumerate(docs):
+            if i:
+                w.write(", ")
+            w.write(json.dumps(doc_record(d), ensure_ascii=False))
+        w.write("]")
+        w.close()
+
+    def write_index():
+        # 搜索索引: 单文件模式内联到HTML, 分片模式由write_search_index单独输出
+        if shard_map is not None:
+            out.write("null")
+            return
+        with perf_trace.phase("search_index"):
+            index = build_search_index(docs, term_cache)
+        w = PayloadWriter(out, compress, stats)
+        write_index_json(w, index)
+        w.close()
+
+    if shard_map is None:
+        config = {"shardBase": "", "searchIndex": "", "liveReload": livereload}
+    else:
+        config = {
+            "shardBase": shard_base,
+            "searchIndex": shard_base + "search_index.js",
+            "liveReload": livereload,
+        }
+    config["cacheVersion"] = viewer_cache_version()
+
+    values = {
+        "TREE_DATA": json.dumps(tree, ensure_ascii=False).replace("</", "<\\/"),
+        "VIEWER_CONFIG": json.dumps(config, ensure_ascii=False),
+        "BUILD_INFO": (
+            f"构建时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            if build_id is None
+            else f"构建版本: {build_id}"
+        ),
+        "DOC_COUNT": str(len(docs)),
+        "PROJECT_NAME": project_name,
+    }
+    writers = {"DOCS_DATA": write_docs, "SEARCH_INDEX": write_index}
+
+    parts = load_template()
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            out.write(part)
+        elif part in writers:
+            writers[part]()
+        else:
+            out.write(values[part])
+
+
+def generate_html(docs, tree, project_name, **kwargs):
+    """加载HTML模板并注入文档数据生成完整HTML(参数同write_html)
+
     @retval  完整的HTML字符串
     """
-    # 序列化文档数据(去除body字段, 减小体积)
-    docs_json = json.dumps(
-        [
-            {
-                "path": d["path"],
-                "title": d["title"],
-                "category": d["category"],
-                "date": d["date"],
-                "author": d["author"],
-                "tags": d["tags"] if isinstance(d["tags"], list) else [],
-                "status": d["status"],
-                "content": d["content"],
-                "headings": d["headings"],
-                "modified": d["modified"],
-            }
-            for d in docs
-        ],
-        ensure_ascii=False,
-    )
+    buf = io.StringIO()
+    write_html(buf, docs, tree, project_name, **kwargs)
+    return buf.getvalue()
+
+
+def compute_build_id(docs, args):
+    """由输入内容计算构建标识(可复现模式下代替构建时间显示)
+
+    标识只取决于模板、渲染器版本、影响输出的选项以及各文档的路径与内容哈希,
+    输入不变时多次构建得到相同的标识和逐字节相同的输出.
+
+    @param   docs: 文档列表
+    @param   args: 命令行参数
+    @retval  12位十六进制字符串
+    """
+    h = hashlib.sha1()
+    h.update("\0".join(load_template()).encode("utf-8"))
+    options = (RENDER_VERSION, args.prerender, args.shard, args.compress, args.serve is not None)
+    h.update(repr(options).encode("utf-8"))
+    for d in docs:
+        h.update(f"\0{d.path}\0{d.hash}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def build_site(docs, root, args, caches, verbose=True):
+    """由扫描结果生成站点输出(分类树、预渲染、分片、HTML)
+
+    caches在多次构建之间复用(监视模式): 文档结构未变化时直接复用分类树,
+    预渲染结果与分词结果按内容哈希保留在内存中.
+
+    @param   docs: scan_wiki返回的文档列表
+    @param   root: 项目根目录Path对象
+    @param   args: 命令行参数(prerender/shard/compress/serve/reproducible/sqlite)
+    @param   caches: 跨构建复用的缓存字典, 首次构建传入空字典;
+             分片模式下构建后caches["shard_map"]为本次的分片分配,
+             caches["html_written"]表示HTML内容是否变化并被实际写入
+    @param   verbose: 是否输出分类、预渲染、分片等详细信息
+    @retval  输出HTML文件的Path对象
+    """
+    wiki_dir = root / ".zed" / ".projwiki"
+    site_dir = wiki_dir / "_site"
+    cache_dir = wiki_dir / CACHE_DIRNAME
+    site_dir.mkdir(parents=True, exist_ok=True)
+
+    # 构建分类树(文档路径/标题/状态/日期/分类均未变化时复用上次结果)
+    with perf_trace.phase("tree"):
+        tree_key = [(d.path, d.title, d.status, d.date, d.category) for d in docs]
+        if caches.get("tree_key") == tree_key:
+            tree = caches["tree"]
+        else:
+            tree = build_tree(docs)
+            caches["tree_key"] = tree_key
+            caches["tree"] = tree
+    if verbose:
+        cat_names = [f"{k}({v['count']})" for k, v in tree.items()]
+        print(f"[INFO] Categories: {', '.join(cat_names) if cat_names else '(none)'}")
 
-    tree_json = json.dumps(tree, ensure_ascii=False)
-    build_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    doc_count = len(docs)
+    # 链接图: 反向链接随文档数据输出, 失效链接在构建日志中报告
+    with perf_trace.phase("links"):
+        backlinks, broken = build_link_graph(docs)
+        for d, bl in zip(docs, backlinks):
+            d.backlinks = bl
+    caches["backlinks"] = {d.path: d.backlinks for d in docs}
+    caches["broken_links"] = broken
+    if verbose:
+        report_broken_links(broken)
 
-    # 查找HTML模板文件
-    tpl_path = Path(__file__).resolve().parent / "viewer_template.html"
-    if not tpl_path.exists():
-        print(f"[ERROR] HTML template not found: {tpl_path}")
+    # 使用项目根目录名称作为项目名称
+    project_name = root.name or "index"
+
+    # 预渲染Markdown正文(未变化的文档直接复用渲染缓存)
+    if args.prerender:
+        with perf_trace.phase("prerender"):
+            if "render" not in caches:
+                caches["render"] = load_render_cache(cache_dir)
+            caches["render"], rendered = prerender_docs(docs, caches["render"])
+            if rendered:
+                save_render_cache(cache_dir, caches["render"])
+        if verbose:
+            print(
+                f"[INFO] Prerender: {rendered} rendered, {len(docs) - rendered} from cache"
+            )
+
+    term_cache = caches.setdefault("terms", {})
+
+    # 分片模式: 先写出正文分片, HTML中只保留分片编号
+    shard_map = None
+    shard_base = ""
+    if args.shard:
+        shard_dirname = f"{project_name}_docs"
+        shard_map = assign_shards(docs)
+        caches["shard_map"] = shard_map
+        shard_base = quote(shard_dirname) + "/"
+        with perf_trace.phase("shards"):
+            total, written = write_shards(docs, shard_map, site_dir / shard_dirname)
+        with perf_trace.phase("search_index"):
+            write_search_index(docs, site_dir / shard_dirname, term_cache)
+        if verbose:
+            print(
+                f"[INFO] Shards: {total} chunk(s) in {shard_dirname}/, {written} rewritten"
+            )
+
+    # SQLite导出(按内容哈希增量更新, 供wiki_query.py等命令行工具查询)
+    if args.sqlite is not None:
+        db_path = Path(args.sqlite) if args.sqlite else default_db_path(root)
+        with perf_trace.phase("sqlite"):
+            try:
+                db_stats = export_sqlite(docs, db_path)
+            except sqlite3.Error as e:
+                print(f"[WARN] SQLite export to {db_path} failed: {e}")
+                db_stats = None
+            else:
+                perf_trace.count_written(db_path)
+        if db_stats and verbose:
+            print(
+                f"[INFO] SQLite: {db_stats['added']} added, {db_stats['updated']} updated, "
+                f"{db_stats['removed']} removed, {db_stats['unchanged']} unchanged "
+                f"in {db_stats['ms']:.1f} ms -> {db_path}"
+            )
+
+    # 生成HTML(流式写入临时文件, 内容未变化时保留原文件) - 使用项目根目录名称作为HTML文件名
+    build_id = compute_build_id(docs, args) if args.reproducible else None
+    payload_stats = {}
+    out_path = site_dir / f"{project_name}.html"
+    with perf_trace.phase("html"):
+        output = AtomicOutput(out_path)
+        with output as out:
+            write_html(
+                out,
+                docs,
+                tree,
+                project_name,
+                shard_map,
+                shard_base,
+                args.compress,
+                payload_stats,
+                term_cache,
+                LIVERELOAD_PATH if args.serve is not None else "",
+                build_id,
+            )
+        if output.changed:
+            perf_trace.count_written(out_path)
+    caches["html_written"] = output.changed
+    if args.compress and verbose:
+        raw_kb = payload_stats["raw"] / 1024
+        packed_kb = payload_stats["compressed"] / 1024
         print(
-            "[HINT] viewer_template.html should be in the same directory as build_wiki.py"
+            f"[INFO] Payload: {raw_kb:.1f} KB -> {packed_kb:.1f} KB compressed "
+            f"({packed_kb / raw_kb * 100:.0f}%), decode check {payload_stats['decode_ms']:.1f} ms"
         )
-        sys.exit(1)
+    return out_path
 
-    html = tpl_path.read_text(encoding="utf-8")
 
-    # 注入数据到模板占位符
-    html = html.replace("/*__DOCS_DATA__*/", docs_json)
-    html = html.replace("/*__TREE_DATA__*/", tree_json)
-    html = html.replace("__BUILD_TIME__", build_time)
-    html = html.replace("__DOC_COUNT__", str(doc_count))
-    html = html.replace("__PROJECT_NAME__", project_name)
+def report_broken_links(broken, limit=20):
+    """输出失效链接报告
 
-    return html
+    @param   broken: build_link_graph返回的失效链接列表
+    @param   limit: 最多列出的条数
+    """
+    if not broken:
+        return
+    print(f"[WARN] {len(broken)} broken link(s):")
+    for path, line, href, reason in broken[:limit]:
+        print(f"        {path}:{line} -> {href} ({reason})")
+    if len(broken) > limit:
+        print(f"        ... and {len(broken) - limit} more")
 
 
-def main():
-    """主入口函数"""
-    root = find_project_root()
+def snapshot_wiki(wiki_dir):
+    """采集.projwiki下所有MD文件的stat快照(监视模式轮询用)
+
+    @param   wiki_dir: .projwiki目录的Path对象
+    @retval  {相对路径: (mtime_ns, size)} 字典
+    """
+    snap = {}
+    stack = [(str(wiki_dir), "")]
+    while stack:
+        path, prefix = stack.pop()
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            continue
+        for e in entries:
+            rel = prefix + e.name
+            try:
+                if e.is_dir():
+                    if not (rel + "/").startswith(SKIP_PREFIXES):
+                        stack.append((e.path, rel + "/"))
+                elif e.name.endswith(".md"):
+                    st = e.stat()
+                    snap[rel] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+    return snap
+
+
+def doc_meta_key(d):
+    """文档在HTML元数据中的部分(目录树、搜索结果、文档头显示的字段)"""
+    return (
+        d.path,
+        d.title,
+        d.category,
+        d.date,
+        d.author,
+        tuple(d.tags),
+        d.status,
+    )
+
+
+def watch_wiki(
+    root,
+    args,
+    docs,
+    manifest,
+    caches,
+    interval=0.5,
+    debounce=0.3,
+    on_rebuild=None,
+):
+    """监视模式: 轮询stat快照, 去抖后只重新加载变化的文档并重建站点
+
+    @param   root: 项目根目录Path对象
+    @param   args: 命令行参数
+    @param   docs: 首次构建得到的文档列表
+    @param   manifest: 首次构建后的清单字典(随重建原地更新并保存)
+    @param   caches: 首次构建使用的build_site缓存字典
+    @param   interval: 轮询间隔(秒)
+    @param   debounce: 最后一次变化后等待的静默时间(秒), 合并连续保存
+    @param   on_rebuild: 可选回调, 每次重建后以事件字典调用:
+             {"build": 序号, "changed": [路径], "removed": [路径],
+              "reload": 元数据/目录结构是否变化, "chunks": [正文变化的文档所在分片编号],
+              "docs": {路径: {hash, modified, backlinks}}(正文或反向链接变化的文档)}
+    """
     wiki_dir = root / ".zed" / ".projwiki"
-    site_dir = wiki_dir / "_site"
+    cache_dir = wiki_dir / CACHE_DIRNAME
+    by_path = {d.path: d for d in docs}
+    built = snapshot_wiki(wiki_dir)
+    meta_key = [doc_meta_key(d) for d in docs]
+    build_no = 0
 
-    # 确保输出目录存在
-    site_dir.mkdir(parents=True, exist_ok=True)
+    print(f"[WATCH] Watching {wiki_dir} (Ctrl+C to stop)")
+    last_seen = built
+    last_change = None
+    try:
+        while True:
+            time.sleep(interval)
+            snap = snapshot_wiki(wiki_dir)
+            if snap != last_seen:
+                last_seen = snap
+                last_change = time.monotonic()
+                continue
+            if last_change is None or time.monotonic() - last_change < debounce:
+                continue
+            last_change = None
+            if snap == built:
+                continue
 
-    print(f"[INFO] Project root : {root}")
-    print(f"[INFO] Wiki directory: {wiki_dir}")
-    print(f"[INFO] Output dir    : {site_dir}")
-    print()
+            start = time.perf_counter()
+            with perf_trace.phase("scan"):
+                changed = sorted(k for k, v in snap.items() if built.get(k) != v)
+                removed = sorted(k for k in built if k not in snap)
+                for rel in removed:
+                    by_path.pop(rel, None)
+                    manifest["docs"].pop(rel, None)
+                for rel in changed:
+                    result = load_doc(wiki_dir / rel, rel, manifest["docs"].get(rel))
+                    if result is None:
+                        by_path.pop(rel, None)
+                        manifest["docs"].pop(rel, None)
+                        continue
+                    doc, entry, _ = result
+                    by_path[rel] = doc
+                    manifest["docs"][rel] = entry
+            built = snap
+            load_ms = (time.perf_counter() - start) * 1000
+
+            # 与scan_wiki的排序保持一致(按路径分段比较)
+            docs = [by_path[k] for k in sorted(by_path, key=lambda k: k.split("/"))]
+            with perf_trace.phase("manifest"):
+                save_manifest(cache_dir, manifest)
+            old_backlinks = caches.get("backlinks", {})
+            build_site(docs, root, args, caches, verbose=False)
+            build_no += 1
+            if on_rebuild is not None:
+                # 元数据未变化且为分片模式时, 查看器只需重新加载正文变化的文档所在分片,
+                # 内容哈希、修改时间与反向链接随事件下发, 直接更新查看器中的文档元数据
+                new_key = [doc_meta_key(d) for d in docs]
+                shard_map = caches.get("shard_map") if args.shard else None
+                reload = shard_map is None or new_key != meta_key
+                meta_key = new_key
+                chunks = set()
+                patches = {}
+                if not reload:
+                    chunks = {shard_map[rel] for rel in changed if rel in shard_map}
+                    affected = set(changed)
+                    for rel, bl in caches["backlinks"].items():
+                        if old_backlinks.get(rel) != bl:
+                            affected.add(rel)
+                    for rel in sorted(affected):
+                        d = by_path.get(rel)
+                        if d is None:
+                            continue
+                        patch = {"hash": d.hash[:CLIENT_HASH_LEN], "backlinks": d.backlinks}
+                        if not args.reproducible:
+                            patch["modified"] = d.modified
+                        patches[rel] = patch
+                on_rebuild(
+                    {
+                        "build": build_no,
+                        "changed": changed,
+                        "removed": removed,
+                        "reload": reload,
+                        "chunks": sorted(chunks),
+                        "docs": patches,
+                    }
+                )
+            total_ms = (time.perf_counter() - start) * 1000
+            print(
+                f"[WATCH] {time.strftime('%H:%M:%S')} {len(changed)} changed, "
+                f"{len(removed)} removed -> rebuilt {len(docs)} doc(s) in "
+                f"{total_ms:.1f} ms (load {load_ms:.1f} ms)"
+            )
+            for rel in (changed + removed)[:5]:
+                print(f"        {rel}")
+            report_broken_links(caches["broken_links"], limit=5)
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopped")
 
-    # 扫描文档
-    docs = scan_wiki(wiki_dir)
-    print(f"[INFO] Found {len(docs)} document(s)")
 
-    if not docs:
-        print("[WARN] No documents found in .zed/.projwiki/")
+def build_project(root, args, verbose=True):
+    """扫描并构建单个项目的文档站点
+
+    @param   root: 项目根目录Path对象(包含.zed/.projwiki)
+    @param   args: 命令行参数
+    @param   verbose: 是否输出扫描与构建日志
+    @retval  (docs, manifest, caches, summary) 元组, 前三项供监视模式继续使用;
+             summary为本次构建的统计字典 {root, docs, new, changed, removed, reused,
+             scan_ms, total_ms, out_path, size, written, broken}
+    """
+    start = time.perf_counter()
+    wiki_dir = root / ".zed" / ".projwiki"
+    cache_dir = wiki_dir / CACHE_DIRNAME
+
+    if verbose:
+        print(f"[INFO] Project root : {root}")
+        print(f"[INFO] Wiki directory: {wiki_dir}")
+        print(f"[INFO] Output dir    : {wiki_dir / '_site'}")
+        print()
+
+    # 扫描文档(复用清单中未变化文档的解析结果, --no-cache时从空清单开始)
+    with perf_trace.phase("manifest"):
+        if args.no_cache:
+            manifest = {"version": MANIFEST_VERSION, "docs": {}}
+        else:
+            manifest = load_manifest(cache_dir)
+    stats = {}
+    scan_start = time.perf_counter()
+    with perf_trace.phase("scan"):
+        docs = scan_wiki(wiki_dir, manifest, stats, jobs=max(1, args.jobs))
+    scan_ms = (time.perf_counter() - scan_start) * 1000
+    with perf_trace.phase("manifest"):
+        save_manifest(cache_dir, manifest)
+
+    if verbose:
+        print(f"[INFO] Found {len(docs)} document(s) in {scan_ms:.1f} ms (jobs={args.jobs})")
         print(
-            "[HINT] Create .md files in subdirectories: modules/, api/, design/, hardware/, changelog/"
+            f"[INFO] Cache: {stats['new']} new, {stats['changed']} changed, "
+            f"{stats['removed']} removed, {stats['reused']} reused"
         )
+        if not docs:
+            print("[WARN] No documents found in .zed/.projwiki/")
+            print(
+                "[HINT] Create .md files in subdirectories: modules/, api/, design/, hardware/, changelog/"
+            )
 
-    # 构建分类树
-    tree = build_tree(docs)
-    cat_names = []
-    for k, v in tree.items():
-        total = len(v["items"])
-        for sub in v.get("subdirs", {}).values():
-            total += count_items_recursive(sub)
-        cat_names.append(f"{k}({total})")
-    print(f"[INFO] Categories: {', '.join(cat_names) if cat_names else '(none)'}")
+    caches = {}
+    out_path = build_site(docs, root, args, caches, verbose)
 
-    # 使用项目根目录名称作为项目名称
-    project_name = root.name or "index"
+    summary = dict(
+        stats,
+        root=str(root),
+        docs=len(docs),
+        scan_ms=scan_ms,
+        total_ms=(time.perf_counter() - start) * 1000,
+        out_path=str(out_path),
+        size=out_path.stat().st_size,
+        written=caches["html_written"],
+        broken=len(caches["broken_links"]),
+    )
+    return docs, manifest, caches, summary
 
-    # 生成HTML
-    html = generate_html(docs, tree, project_name)
 
-    # 写入输出文件 - 使用项目根目录名称作为HTML文件名
-    out_path = site_dir / f"{project_name}.html"
-    out_path.write_text(html, encoding="utf-8")
+def discover_wiki_roots(base):
+    """查找base目录下所有包含.zed/.projwiki的项目根目录
+
+    隐藏目录(.git、.zed等)和BATCH_SKIP_DIRS中的构建产物目录不会进入;
+    项目根目录下的子目录仍会继续查找(支持嵌套的子项目).
+
+    @param   base: 查找起点目录Path对象
+    @retval  按路径排序的项目根目录Path列表
+    """
+    roots = []
+    for cur, dirs, _ in os.walk(base):
+        if os.path.isdir(os.path.join(cur, ".zed", ".projwiki")):
+            roots.append(Path(cur))
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in BATCH_SKIP_DIRS)
+    return roots
+
+
+def init_batch_worker(template_parts, args):
+    """批量构建工作进程的初始化函数
+
+    直接使用主进程已切分好的模板, 各工作进程无需重复读取和切分模板文件.
+
+    @param   template_parts: 主进程load_template()的结果
+    @param   args: 命令行参数
+    """
+    global _template_parts, _batch_args
+    _template_parts = template_parts
+    _batch_args = args
+
+
+def batch_build_one(root):
+    """在工作进程中构建单个项目(日志输出被捕获, 随结果返回)
+
+    启用剖析时每个项目使用独立的剖析器, 结果随统计字典返回, 由主进程汇总输出.
+
+    @param   root: 项目根目录路径字符串
+    @retval  build_project的统计字典, 另含 log(捕获的输出)、error(失败原因, 成功为None)
+             与 profile(剖析结果, 未启用时为None)
+    """
+    buf = io.StringIO()
+    start = time.perf_counter()
+    args = _batch_args
+    profile = args.profile or args.profile_out
+    try:
+        with contextlib.redirect_stdout(buf):
+            with perf_trace.profiling(root) if profile else contextlib.nullcontext() as prof:
+                summary = build_project(Path(root), args, verbose=False)[3]
+        summary["error"] = None
+        summary["profile"] = prof.to_dict() if profile else None
+    except Exception as e:
+        summary = {
+            "root": root,
+            "total_ms": (time.perf_counter() - start) * 1000,
+            "error": f"{type(e).__name__}: {e}",
+        }
+    summary["log"] = buf.getvalue()
+    return summary
+
+
+def report_batch(results, base, wall_ms):
+    """输出批量构建的汇总报告
+
+    @param   results: batch_build_one返回的统计字典列表
+    @param   base: 批量构建的起点目录(报告中的项目路径相对该目录显示)
+    @param   wall_ms: 批量构建的总墙钟耗时(毫秒)
+    """
+    kb = 1024
+    print()
+    print(
+        f"{'Project':<32} {'Docs':>6} {'Changed':>8} {'Broken':>7} "
+        f"{'Build ms':>10} {'Size KB':>10}  Output"
+    )
+    print("-" * 92)
+    ok = [r for r in results if r["error"] is None]
+    for r in sorted(results, key=lambda r: r["root"]):
+        name = os.path.relpath(r["root"], base)
+        if r["error"] is not None:
+            print(f"{name:<32} {'-':>6} {'-':>8} {'-':>7} {r['total_ms']:>10.1f} {'-':>10}  FAILED")
+            continue
+        changed = r["new"] + r["changed"] + r["removed"]
+        state = "written" if r["written"] else "unchanged"
+        print(
+            f"{name:<32} {r['docs']:>6} {changed:>8} {r['broken']:>7} "
+            f"{r['total_ms']:>10.1f} {r['size'] / kb:>10.1f}  {state}"
+        )
+    print("-" * 92)
+
+    busy_ms = sum(r["total_ms"] for r in results)
+    print(
+        f"{'Total':<32} {sum(r['docs'] for r in ok):>6} "
+        f"{sum(r['new'] + r['changed'] + r['removed'] for r in ok):>8} "
+        f"{sum(r['broken'] for r in ok):>7} {busy_ms:>10.1f} "
+        f"{sum(r['size'] for r in ok) / kb:>10.1f}  "
+        f"{sum(r['written'] for r in ok)} written"
+    )
+    print(
+        f"[BATCH] {len(ok)}/{len(results)} project(s) built in {wall_ms / 1000:.2f} s wall, "
+        f"{busy_ms / 1000:.2f} s summed over projects"
+    )
+
+    for r in results:
+        if r["error"] is not None:
+            print(f"[ERROR] {r['root']}: {r['error']}")
+            for line in r["log"].strip().splitlines()[-10:]:
+                print(f"        {line}")
+
+
+def run_batch(base, args):
+    """批量模式: 查找base下的所有项目并在进程池中并行构建
+
+    @param   base: 查找起点目录Path对象
+    @param   args: 命令行参数(workers为工作进程数, 0表示CPU核数)
+    @retval  进程退出码, 有项目构建失败时返回1
+    """
+    if not base.is_dir():
+        print(f"[ERROR] Batch directory not found: {base}")
+        return 1
+    base = base.resolve()
+    roots = discover_wiki_roots(base)
+    if not roots:
+        print(f"[WARN] No .zed/.projwiki found under {base}")
+        return 1
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(roots)))
+    print(f"[INFO] Batch: {len(roots)} project(s) under {base}, {workers} worker process(es)")
+    start = time.perf_counter()
+    parts = load_template()
+    results = []
+
+    def progress(r):
+        results.append(r)
+        name = os.path.relpath(r["root"], base)
+        state = "FAILED" if r["error"] is not None else f"{r['docs']} doc(s)"
+        print(f"[BATCH] ({len(results)}/{len(roots)}) {name}: {state}, {r['total_ms']:.1f} ms")
+
+    if workers == 1:
+        init_batch_worker(parts, args)
+        for root in roots:
+            progress(batch_build_one(str(root)))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_batch_worker,
+            initargs=(parts, args),
+        ) as pool:
+            futures = {pool.submit(batch_build_one, str(root)): root for root in roots}
+            for fut in as_completed(futures):
+                try:
+                    progress(fut.result())
+                except Exception as e:
+                    # 工作进程异常退出(BrokenProcessPool等)
+                    progress({"root": str(futures[fut]), "total_ms": 0.0, "error": repr(e), "log": ""})
+
+    report_batch(results, base, (time.perf_counter() - start) * 1000)
+    for r in sorted(results, key=lambda r: r["root"]):
+        if r.get("profile"):
+            perf_trace.add_report(r["profile"])
+    return 1 if any(r["error"] is not None for r in results) else 0
+
+
+def main():
+    """主入口函数"""
+    parser = argparse.ArgumentParser(description="ProjWiki HTML站点构建脚本")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="忽略增量构建清单, 重新解析全部文档",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="并发读取/解析文档的线程数 (默认: 1, 串行)",
+    )
+    parser.add_argument(
+        "--prerender",
+        action="store_true",
+        help="构建时将文档正文预渲染为HTML(按内容哈希缓存), 查看器直接注入无需再解析Markdown",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="以gzip+base64压缩形式嵌入文档数据, 查看器加载时解压(适合通过聊天/邮件发送单文件)",
+    )
+    parser.add_argument(
+        "--shard",
+        action="store_true",
+        help="分片输出: HTML只包含目录树和元数据, 文档正文写入<项目名>_docs/下的分片按需加载",
+    )
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help="可复现输出: 以内容派生的构建版本代替构建时间, 不输出文件修改时间, 输入不变时输出逐字节相同",
+    )
+    parser.add_argument(
+        "--sqlite",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="FILE",
+        help="同时导出带FTS5全文索引的SQLite数据库(默认: _site/<项目名>.db), 按内容哈希增量更新, 用 wiki_query.py 查询",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        metavar="DIR",
+        help="批量模式: 查找DIR下所有包含.zed/.projwiki的项目, 用多个进程并行构建并输出汇总报告",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help="批量模式的工作进程数 (默认: CPU核数)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="构建后持续监视.projwiki目录, 文档保存后自动增量重建",
+    )
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        type=int,
+        const=8000,
+        default=None,
+        metavar="PORT",
+        help="启动本地预览服务器(默认端口8000)并进入监视模式, 文档保存后浏览器自动刷新",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        metavar="SEC",
+        help="监视模式的轮询间隔秒数 (默认: 0.5)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.3,
+        metavar="SEC",
+        help="监视模式下最后一次变化后等待的静默秒数, 合并连续保存 (默认: 0.3)",
+    )
+    perf_trace.add_profile_arguments(parser)
+    args = parser.parse_args()
+    if args.batch:
+        if args.watch or args.serve is not None:
+            parser.error("--batch cannot be combined with --watch/--serve")
+        if args.sqlite:
+            parser.error("--batch writes one database per project, use --sqlite without FILE")
+        if args.profile_cprofile:
+            parser.error("--profile-cprofile cannot sample batch worker processes, use --profile")
+    perf_trace.start_profiling(args, "build_wiki.py")
+
+    if args.batch:
+        with perf_trace.phase("batch"):
+            return run_batch(Path(args.batch), args)
+
+    root = find_project_root()
+    docs, manifest, caches, summary = build_project(root, args)
+    out_path = Path(summary["out_path"])
+    site_dir = out_path.parent
 
-    file_size_kb = out_path.stat().st_size / 1024
     print()
-    print(f"[OK] Generated: {out_path}")
-    print(f"[OK] File size: {file_size_kb:.1f} KB")
+    if summary["written"]:
+        print(f"[OK] Generated: {out_path}")
+    else:
+        print(f"[OK] Unchanged: {out_path} (not rewritten)")
+    print(f"[OK] File size: {summary['size'] / 1024:.1f} KB")
     print(f"[OK] Open in browser to view documentation")
 
+    on_rebuild = None
+    if args.serve is not None:
+        try:
+            server, livereload = start_preview_server(site_dir, args.serve)
+        except OSError as e:
+            print(f"[ERROR] Cannot start preview server on port {args.serve}: {e}")
+            return 1
+        on_rebuild = livereload.publish
+        port = server.server_address[1]
+        print(f"[OK] Preview: http://127.0.0.1:{port}/{quote(out_path.name)}")
+
+    if args.watch or args.serve is not None:
+        print()
+        watch_wiki(
+            root,
+            args,
+            docs,
+            manifest,
+            caches,
+            args.interval,
+            args.debounce,
+            on_rebuild,
+        )
+
     return 0
 
 
@@ -5,14 +5,32 @@
 @brief   ProjWiki 文档新鲜度检查工具 - 扫描源码与文档的修改时间，找出需要更新的文档
 @author  Yarrow
 @date    2025-07-11
-@attention 用于辅助"智能更新"流程
+@attention 用于辅助"智能更新"流程; --hash 模式按源码内容哈希基线判断, 不受checkout、克隆改写修改时间的影响
 """
 
+import argparse
+import hashlib
+import json
 import os
 import sys
 from datetime import datetime
 from pathlib import Path
 
+import perf_trace
+from ai_task_utils import extract_symbol_fingerprints, find_stale_sections
+from source_index import (
+    get_source_index,
+    hash_sources,
+    iter_sources,
+    save_source_index,
+    sources_by_stem,
+    stat_sources,
+)
+
+# 内容哈希基线文件(位于.projwiki目录下, 建议随文档一起提交到版本库)
+BASELINE_NAME = ".freshness.json"
+BASELINE_VERSION = 1
+
 
 def find_project_root():
     """从脚本位置向上查找项目根目录(包含.zed或.git目录)"""
@@ -35,33 +53,22 @@ def find_project_root():
     return Path(os.getcwd())
 
 
-def get_source_mtime(root_dir, module_name):
-    """获取模块源文件(.c/.h)的最近修改时间"""
-    max_mtime = 0
-    c_files = []
+def get_source_mtime(root_dir, module_name, by_stem=None):
+    """获取模块源文件(.c/.h)的最近修改时间
 
-    # 简单的递归搜索 (为了更高效，实际应该只扫描一次并缓存，但这足够了)
-    # 这里为了简单直接搜名字匹配的文件
-    for root, dirs, files in os.walk(root_dir):
-        # 忽略 build, .git 等目录
-        if ".git" in dirs:
-            dirs.remove(".git")
-        if ".zed" in dirs:
-            dirs.remove(".zed")
-        if "build" in dirs:
-            dirs.remove("build")
-        if "Firmware" in dirs:
-            dirs.remove("Firmware")
+    @param   root_dir: 项目根目录
+    @param   module_name: 模块名(源文件名去掉扩展名)
+    @param   by_stem: source_index.sources_by_stem()返回的分组, 为None时加载并刷新源码索引
+             (检查多个模块时应只构建一次分组, 每个模块的查找为O(1))
+    @retval  (最近修改时间, 源文件相对路径列表), 没有源文件时修改时间为0
+    """
+    if by_stem is None:
+        index, _ = get_source_index(root_dir)
+        by_stem = sources_by_stem(index)
 
-        for file in files:
-            if file == f"{module_name}.c" or file == f"{module_name}.h":
-                p = Path(root) / file
-                mtime = p.stat().st_mtime
-                if mtime > max_mtime:
-                    max_mtime = mtime
-                c_files.append(str(p.relative_to(root_dir)))
-
-    return max_mtime, c_files
+    entries = by_stem.get(module_name, [])
+    max_mtime = max((mtime for _, _, mtime in entries), default=0)
+    return max_mtime, [path for path, _, _ in entries]
 
 
 def scan_docs(wiki_dir):
@@ -75,10 +82,251 @@ def scan_docs(wiki_dir):
         # 假设文件名就是模块名
         module_name = md_file.stem
         docs[module_name] = {"path": md_file, "mtime": md_file.stat().st_mtime}
+        perf_trace.count(files=1)
     return docs
 
 
+def load_baselines(wiki_dir):
+    """加载内容哈希基线 {模块名: {doc, mode, sources: {相对路径: 哈希}, date}}, 不存在或损坏时返回空字典"""
+    path = Path(wiki_dir) / BASELINE_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        perf_trace.count_read(path)
+    except (OSError, ValueError):
+        print(f"[WARN] Cannot read {path}, baselines will be recorded again")
+        return {}
+    if not isinstance(data, dict) or data.get("version") != BASELINE_VERSION:
+        return {}
+    return data.get("modules", {})
+
+
+def save_baselines(wiki_dir, baselines):
+    """保存内容哈希基线(键排序并缩进, 便于在版本库中比较差异)"""
+    path = Path(wiki_dir) / BASELINE_NAME
+    data = {"version": BASELINE_VERSION, "modules": baselines}
+    path.write_text(
+        json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+    perf_trace.count_written(path)
+
+
+def doc_hash(path):
+    """文档文件内容的sha1"""
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def module_symbols(root, src_files):
+    """模块源文件中函数签名、结构体、枚举的指纹(头文件声明与源文件定义合并)"""
+    contents = []
+    for path in sorted(src_files):
+        full = Path(root) / path
+        try:
+            contents.append(full.read_text(encoding="utf-8", errors="ignore"))
+            perf_trace.count_read(full)
+        except OSError:
+            continue
+    return extract_symbol_fingerprints("\n".join(contents))
+
+
+def check_freshness(
+    root,
+    wiki_dir,
+    use_hash=False,
+    jobs=1,
+    record=None,
+    stats=None,
+    use_git=False,
+    use_symbols=False,
+):
+    """比较每个模块文档与其源文件, 判断文档是否过期
+
+    默认按修改时间比较: 任一源文件比文档新即为过期.
+
+    use_hash为True时按内容哈希基线比较. 基线记录了文档某一版本对应的源文件内容哈希:
+    - 文档内容与基线记录的一致时, 源文件集合或任一文件内容与基线不同才判为过期,
+      checkout、切换分支、CI克隆只改写修改时间, 不会误报
+    - 没有基线或文档在基线之后被修改过(即文档已更新)时, 按修改时间判断,
+      结果为Fresh则以当前源码记录新的基线
+    源文件的哈希缓存在源码索引中, 只有大小或修改时间变化的文件才重新计算.
+
+    use_git为True时源文件列表与哈希取自本地git仓库的索引, 只有工作区中已修改或未跟踪的
+    文件需要由git hash-object计算; 只stat有模块文档的源文件. git的哈希经过clean过滤器与
+    换行符转换, 与文件系统模式按原始内容计算的哈希不一定相同, 因此基线记录了哈希模式
+    (mode: file / git), 另一种模式记录的基线按没有基线处理.
+
+    基线同时记录模块中函数签名、结构体、枚举的指纹. use_symbols为True时, 源文件内容
+    有变化的模块再按符号比较: 只改了注释、空白或函数体的模块仍为Fresh, 并以当前源码
+    更新基线; 否则列出引用了变化符号的AI填空区块(见ai_task_utils.find_stale_sections),
+    只需重新生成这些区块.
+
+    @param   root: 项目根目录Path对象
+    @param   wiki_dir: .projwiki目录的Path对象
+    @param   use_hash: 是否按内容哈希基线比较
+    @param   jobs: 并发计算哈希的线程数
+    @param   record: 强制以当前源码重新记录基线的模块名集合, True表示全部模块(隐含use_hash)
+    @param   stats: 可选字典, 返回时填入 {hashed, sources, recorded, git}
+    @param   use_git: 由本地git仓库的索引获取源文件, git不可用时回退到文件系统扫描
+    @param   use_symbols: 按符号指纹判断并定位受影响的AI填空区块(隐含use_hash)
+    @retval  行列表 [{module, doc_path, doc_mtime, src_mtime, src_files, status, changed,
+             symbols, sections}, ...], status为 Fresh / OUTDATED / Missing Src;
+             changed为哈希模式下与基线不同的源文件, symbols为变化的符号("function:名称"等),
+             sections为 {区块标识: [变化的符号]} (无法归入区块的符号以空字符串为键);
+             基线中没有符号指纹时symbols与sections为None, 表示需要整篇更新
+    """
+    rows = []
+    counts = {"hashed": 0, "sources": 0, "recorded": 0, "git": False, "unaffected": 0}
+    use_hash = use_hash or use_symbols or bool(record)
+    with perf_trace.phase("scan_docs"):
+        docs = scan_docs(wiki_dir)
+    # 源码只遍历一次(增量刷新共享索引), 之后按模块名查表, 总开销与文件数成线性关系
+    with perf_trace.phase("source_index"):
+        index, index_stats = get_source_index(root, use_git=use_git)
+        counts["git"] = index_stats["git"]
+        if counts["git"]:
+            # git索引中没有修改时间, 只stat有模块文档的源文件
+            stat_sources(root, index, [p for p, stem, _, _ in iter_sources(index) if stem in docs])
+        by_stem = sources_by_stem(index)
+
+    hash_mode = "git" if counts["git"] else "file"
+    hashes = {}
+    baselines = {}
+    if use_hash:
+        with perf_trace.phase("hash"):
+            baselines = load_baselines(wiki_dir)
+            paths = [path for name in docs for path, _, _ in by_stem.get(name, [])]
+            hashes, counts["hashed"] = hash_sources(root, index, paths, jobs)
+            counts["sources"] = len(paths)
+            # git模式下的索引不持久化
+            if counts["hashed"] and not counts["git"]:
+                try:
+                    save_source_index(root, index)
+                except OSError as e:
+                    print(f"[WARN] Cannot save source index: {e}")
+
+    for module_name, info in docs.items():
+        doc_mtime = info["mtime"]
+        src_mtime, src_files = get_source_mtime(root, module_name, by_stem)
+
+        if src_mtime == 0:
+            status = "Missing Src"
+        elif src_mtime > doc_mtime:
+            status = "OUTDATED"
+        else:
+            status = "Fresh"
+
+        changed = []
+        symbols = []
+        sections = {}
+        if use_hash and status != "Missing Src":
+            current = {path: hashes[path] for path in src_files if path in hashes}
+            dhash = doc_hash(info["path"])
+            base = baselines.get(module_name)
+            if base and base.get("mode", "file") != hash_mode:
+                # 另一种模式记录的基线不可比(git模式的哈希经过过滤与换行符转换), 视为没有基线
+                base = None
+            forced = record is True or (record and module_name in record)
+            if not forced and base and base.get("doc") == dhash:
+                old = base.get("sources", {})
+                changed = sorted(p for p in current.keys() | old.keys() if current.get(p) != old.get(p))
+                status = "OUTDATED" if changed else "Fresh"
+                if changed and use_symbols:
+                    with perf_trace.phase("symbols"):
+                        old_symbols = base.get("symbols")
+                        if old_symbols is None:
+                            symbols = sections = None
+                        else:
+                            new_symbols = module_symbols(root, src_files)
+                            symbols = sorted(
+                                k
+                                for k in new_symbols.keys() | old_symbols.keys()
+                                if new_symbols.get(k) != old_symbols.get(k)
+                            )
+                            if symbols:
+                                md_content = info["path"].read_text(encoding="utf-8")
+                                sections = find_stale_sections(md_content, symbols)
+                            else:
+                                status = "Fresh"
+                                counts["unaffected"] += 1
+                                # 变化不影响文档: 以当前源码更新基线, 之后不再重复比较这些变化
+                                baselines[module_name] = dict(
+                                    base,
+                                    mode=hash_mode,
+                                    sources=current,
+                                    symbols=new_symbols,
+                                    date=datetime.now().strftime("%Y-%m-%d"),
+                                )
+                                counts["recorded"] += 1
+            elif forced or status == "Fresh":
+                with perf_trace.phase("symbols"):
+                    baselines[module_name] = {
+                        "doc": dhash,
+                        "mode": hash_mode,
+                        "sources": current,
+                        "symbols": module_symbols(root, src_files),
+                        "date": datetime.now().strftime("%Y-%m-%d"),
+                    }
+                status = "Fresh"
+                counts["recorded"] += 1
+
+        rows.append(
+            {
+                "module": module_name,
+                "doc_path": info["path"],
+                "doc_mtime": doc_mtime,
+                "src_mtime": src_mtime,
+                "src_files": src_files,
+                "status": status,
+                "changed": changed,
+                "symbols": symbols,
+                "sections": sections,
+            }
+        )
+
+    if counts["recorded"]:
+        save_baselines(wiki_dir, baselines)
+    if stats is not None:
+        stats.update(counts)
+    return rows
+
+
 def main():
+    parser = argparse.ArgumentParser(description="ProjWiki文档新鲜度检查工具")
+    parser.add_argument(
+        "--hash",
+        action="store_true",
+        help="按源码内容哈希基线判断(不受checkout/克隆改写修改时间的影响), 没有基线的模块先按修改时间判断并记录基线",
+    )
+    parser.add_argument(
+        "--record",
+        nargs="*",
+        metavar="MODULE",
+        help="以当前源码为指定模块(不指定则为全部模块)重新记录哈希基线, 隐含--hash",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        metavar="N",
+        help="并发计算哈希的线程数 (默认: CPU核数, 最多8)",
+    )
+    parser.add_argument(
+        "--git",
+        action="store_true",
+        help="由本地git仓库的索引获取源文件与哈希(遵守.gitignore, 只读取已修改的文件), git不可用时回退到文件系统扫描",
+    )
+    parser.add_argument(
+        "--symbols",
+        action="store_true",
+        help="按函数签名/结构体/枚举指纹判断, 只列出需要重新生成的AI填空区块(隐含--hash)",
+    )
+    perf_trace.add_profile_arguments(parser)
+    args = parser.parse_args()
+    perf_trace.start_profiling(args, "check_outdated.py")
+
     root = find_project_root()
     wiki_dir = root / ".zed" / ".projwiki"
 
@@ -88,8 +336,26 @@ def main():
 
     print(f"[INFO] Checking documentation freshness in {root}...")
 
-    docs = scan_docs(wiki_dir)
-    if not docs:
+    record = None
+    if args.record is not None:
+        record = set(args.record) or True
+    stats = {}
+    rows = check_freshness(
+        root, wiki_dir, args.hash, max(1, args.jobs), record, stats, args.git, args.symbols
+    )
+    if stats["git"]:
+        print("[INFO] Source files listed from the git index")
+    if args.hash or args.symbols or record:
+        print(
+            f"[INFO] Hashed {stats['hashed']} of {stats['sources']} source file(s), "
+            f"recorded {stats['recorded']} baseline(s) in {BASELINE_NAME}"
+        )
+    if stats["unaffected"]:
+        print(
+            f"[INFO] {stats['unaffected']} module(s) changed only in comments or function bodies, "
+            "no section affected, baseline updated"
+        )
+    if not rows:
         print("[WARN] No module documentation found.")
         return 0
 
@@ -100,32 +366,29 @@ def main():
     )
     print("-" * 75)
 
-    for module_name, info in docs.items():
-        doc_mtime = info["mtime"]
-        src_mtime, src_files = get_source_mtime(root, module_name)
-
-        doc_time_str = datetime.fromtimestamp(doc_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    for row in rows:
+        module_name = row["module"]
+        status = row["status"]
+        doc_time_str = datetime.fromtimestamp(row["doc_mtime"]).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
 
-        if src_mtime == 0:
-            status = "Missing Src"
+        if status == "Missing Src":
             src_time_str = "N/A"
-        elif src_mtime > doc_mtime:
-            status = "OUTDATED"
-            src_time_str = datetime.fromtimestamp(src_mtime).strftime(
+        else:
+            src_time_str = datetime.fromtimestamp(row["src_mtime"]).strftime(
                 "%Y-%m-%d %H:%M:%S"
             )
+        if status == "OUTDATED":
             outdated.append(
                 {
                     "module": module_name,
-                    "doc_path": str(info["path"].relative_to(root)),
-                    "diff_sec": src_mtime - doc_mtime,
+                    "doc_path": str(row["doc_path"].relative_to(root)),
+                    "diff_sec": row["src_mtime"] - row["doc_mtime"],
+                    "changed": row["changed"],
+                    "sections": row["sections"],
                 }
             )
-        else:
-            status = "Fresh"
-            src_time_str = datetime.fromtimestamp(src_mtime).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
 
         print(
             f"{module_name:<20} | {status:<10} | {doc_time_str:<19} | {src_time_str:<19}"
@@ -139,6 +402,15 @@ def main():
         print("-" * 65)
         for item in outdated:
             print(f"{item['module']:<20} | {item['doc_path']:<40}")
+            if args.symbols and item["sections"] is None:
+                print(f"{'':<20} |   no symbol baseline, update the whole document")
+            elif item["sections"]:
+                for identifier, symbols in item["sections"].items():
+                    label = f"section: {identifier}" if identifier else "not in any section"
+                    print(f"{'':<20} |   {label} <- {', '.join(symbols)}")
+            else:
+                for path in item["changed"]:
+                    print(f"{'':<20} |   changed: {path}")
 
         # Output strictly structured JSON-like line for parsing if needed
         # print(f"__OUTDATED_LIST__={json.dumps([x['module'] for x in outdated])}")
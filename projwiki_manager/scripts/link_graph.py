@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    link_graph.py
+@brief   ProjWiki 链接图工具库 - 解析文档间链接, 生成反向链接索引并检查失效链接
+@author  Yarrow
+@date    2025-07-11
+@attention 链接解析规则必须与 viewer_template.html 中的 resolveLink() 保持一致
+"""
+
+import re
+from urllib.parse import unquote
+
+# 带协议(http:, mailto: 等)或协议相对(//host)的链接不属于wiki内部链接
+RE_EXTERNAL = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.-]*:|//)")
+
+
+def resolve_link(src_path, href):
+    """将文档中的链接目标解析为wiki内的文档路径与锚点
+
+    - "#锚点" 指向当前文档
+    - 以 .md 结尾的相对路径相对当前文档所在目录解析, 以 / 开头时相对.projwiki根目录
+    - 外部链接、非 .md 文件以及超出.projwiki目录的路径不属于wiki内部链接
+
+    @param   src_path: 链接所在文档的路径(相对.projwiki, 使用/分隔)
+    @param   href: 链接目标原文
+    @retval  (文档路径, 锚点) 元组, 锚点可为空字符串; 非wiki内部链接返回None
+    """
+    if RE_EXTERNAL.match(href):
+        return None
+    target, _, anchor = href.partition("#")
+    target = target.split("?", 1)[0]
+    anchor = unquote(anchor)
+    if not target:
+        return (src_path, anchor) if anchor else None
+    if not target.lower().endswith(".md"):
+        return None
+
+    parts = [] if target.startswith("/") else src_path.split("/")[:-1]
+    for seg in unquote(target).split("/"):
+        if not seg or seg == ".":
+            continue
+        if seg == "..":
+            if not parts:
+                return None
+            parts.pop()
+        else:
+            parts.append(seg)
+    return "/".join(parts), anchor
+
+
+def build_link_graph(docs):
+    """由各文档的链接列表构建链接图
+
+    链接列表来自scan_markdown(随清单缓存, 未变化的文档无需重新提取),
+    这里只做路径解析与字典查找; 锚点集合仅在被链接时才为目标文档生成.
+
+    @param   docs: 文档列表(需含 path/links/headings 属性)
+    @retval  (backlinks, broken) 元组:
+             backlinks - 与docs等长的列表, 每项为链接到该文档的文档下标列表(升序, 不含自身);
+             broken - 失效链接列表 [(文档路径, 行号, 链接原文, 原因), ...],
+             原因为 "missing doc" 或 "missing anchor"
+    """
+    index = {d.path: i for i, d in enumerate(docs)}
+    anchors = {}
+    backlinks = [[] for _ in docs]
+    broken = []
+
+    for i, d in enumerate(docs):
+        seen = set()
+        for href, line in d.links:
+            target = resolve_link(d.path, href)
+            if target is None:
+                continue
+            path, anchor = target
+            j = index.get(path)
+            if j is None:
+                broken.append((d.path, line, href, "missing doc"))
+                continue
+            if anchor:
+                known = anchors.get(j)
+                if known is None:
+                    known = anchors[j] = {h["anchor"] for h in docs[j].headings}
+                if anchor not in known:
+                    broken.append((d.path, line, href, "missing anchor"))
+            if j != i and j not in seen:
+                seen.add(j)
+                backlinks[j].append(i)
+
+    return backlinks, broken
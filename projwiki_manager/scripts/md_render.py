@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    md_render.py
+@brief   ProjWiki Markdown渲染器 - 构建时将文档正文预渲染为HTML
+@author  Yarrow
+@date    2025-07-11
+@attention 逐行移植自 viewer_template.html 中的 renderMarkdown()/inlineRender(),
+           两边的渲染规则必须保持一致; 修改渲染规则时同步递增 RENDER_VERSION
+"""
+
+import re
+
+# 渲染器版本, 写入渲染缓存; 版本变化时旧缓存整体失效
+RENDER_VERSION = 2
+
+RE_FENCE = re.compile(r"^(`{3,}|~{3,})(.*)$")
+RE_HEADING = re.compile(r"^(#{1,6})\s+(.+)$")
+RE_HR = re.compile(r"^(-{3,}|_{3,}|\*{3,})$")
+RE_UL = re.compile(r"^[-*+]\s+(.+)$")
+RE_OL = re.compile(r"^\d+\.\s+(.+)$")
+RE_BQ_PREFIX = re.compile(r"^>\s?")
+RE_WARNING = re.compile(r"\*\*WARNING\*\*|WARNING:", re.IGNORECASE)
+# JS中\w仅匹配ASCII字符, 这里显式写出字符集以保持锚点一致
+RE_ANCHOR_STRIP = re.compile(r"[^A-Za-z0-9_\u4e00-\u9fff\s-]")
+RE_SPACES = re.compile(r"\s+")
+
+# inlineRender的替换规则, 顺序与查看器一致
+INLINE_RULES = [
+    (re.compile(r"!\[([^\]]*)\]\(([^)]+)\)"), r'<img src="\2" alt="\1">'),
+    (re.compile(r"\[([^\]]+)\]\(([^)]+)\)"), r'<a href="\2">\1</a>'),
+    (re.compile(r"\*\*\*(.+?)\*\*\*"), r"<strong><em>\1</em></strong>"),
+    (re.compile(r"\*\*(.+?)\*\*"), r"<strong>\1</strong>"),
+    (re.compile(r"__(.+?)__"), r"<strong>\1</strong>"),
+    (re.compile(r"\*(.+?)\*"), r"<em>\1</em>"),
+    (re.compile(r"_(.+?)_"), r"<em>\1</em>"),
+    (re.compile(r"~~(.+?)~~"), r"<del>\1</del>"),
+    (re.compile(r"`([^`]+)`"), r"<code>\1</code>"),
+    (re.compile(r"  $", re.MULTILINE), "<br>"),
+]
+
+
+def esc(s):
+    """等价于查看器的esc(): 经DOM textContent转义, 引号保持原样"""
+    if not s:
+        return ""
+    return (
+        s.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace("\xa0", "&nbsp;")
+    )
+
+
+def esc_code(s):
+    """等价于查看器的escCode()"""
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def heading_anchor(text):
+    """按查看器规则由标题文本生成锚点id"""
+    return RE_SPACES.sub("-", RE_ANCHOR_STRIP.sub("", text)).lower()
+
+
+def unique_anchor(used, anchor):
+    """为重名标题生成不重复的锚点(依次追加 -1、-2 ...)
+
+    @param   used: 同一文档内已使用锚点的计数字典(原地更新)
+    @param   anchor: heading_anchor生成的原始锚点
+    @retval  文档内唯一的锚点
+    """
+    if anchor not in used:
+        used[anchor] = 0
+        return anchor
+    n = used[anchor]
+    while True:
+        n += 1
+        cand = anchor + "-" + str(n)
+        if cand not in used:
+            break
+    used[anchor] = n
+    used[cand] = 0
+    return cand
+
+
+def inline_render(text):
+    """行内元素渲染(图片、链接、强调、删除线、行内代码、换行)
+
+    @param   text: 行内Markdown文本
+    @retval  HTML字符串
+    """
+    for pattern, repl in INLINE_RULES:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def parse_table_row(row):
+    """拆分表格行为单元格列表"""
+    if row.startswith("|"):
+        row = row[1:]
+    if row.endswith("|"):
+        row = row[:-1]
+    return [c.strip() for c in row.split("|")]
+
+
+def render_markdown(md):
+    """将Markdown正文渲染为HTML, 输出与查看器renderMarkdown()一致
+
+    @param   md: 去除frontmatter后的Markdown正文
+    @retval  HTML字符串
+    """
+    out = []
+    lines = md.split("\n")
+    state = {
+        "code": False,
+        "fence": "",
+        "lang": "",
+        "code_lines": [],
+        "list": False,
+        "list_type": "",
+        "list_items": [],
+        "bq": False,
+        "bq_lines": [],
+        "table": False,
+        "table_rows": [],
+        "para": [],
+    }
+    used = {}
+
+    def flush_paragraph():
+        if state["para"]:
+            out.append("<p>" + inline_render("\n".join(state["para"])) + "</p>")
+            state["para"] = []
+
+    def flush_list():
+        if not state["list"]:
+            return
+        tag = "ol" if state["list_type"] == "ol" else "ul"
+        out.append("<" + tag + ">")
+        for li in state["list_items"]:
+            out.append("<li>" + inline_render(li) + "</li>")
+        out.append("</" + tag + ">")
+        state["list"] = False
+        state["list_items"] = []
+
+    def flush_blockquote():
+        if not state["bq"]:
+            return
+        content = "\n".join(state["bq_lines"])
+        cls = "bqw" if RE_WARNING.search(content) else ""
+        out.append(
+            '<blockquote class="' + cls + '">' + render_markdown(content) + "</blockquote>"
+        )
+        state["bq"] = False
+        state["bq_lines"] = []
+
+    def flush_table():
+        if not state["table"]:
+            return
+        rows = state["table_rows"]
+        state["table"] = False
+        state["table_rows"] = []
+        if len(rows) < 2:
+            return
+        out.append('<div class="twrap"><table><thead><tr>')
+        for h in parse_table_row(rows[0]):
+            out.append("<th>" + inline_render(h) + "</th>")
+        out.append("</tr></thead><tbody>")
+        for row in rows[2:]:
+            out.append("<tr>")
+            for c in parse_table_row(row):
+                out.append("<td>" + inline_render(c) + "</td>")
+            out.append("</tr>")
+        out.append("</tbody></table></div>")
+
+    def flush_code():
+        label = (
+            '<span class="plbl">' + esc(state["lang"]) + "</span>" if state["lang"] else ""
+        )
+        out.append(
+            "<pre>"
+            + label
+            + "<code>"
+            + esc_code("\n".join(state["code_lines"]))
+            + "</code></pre>"
+        )
+
+    for line in lines:
+        trimmed = line.strip()
+
+        # 代码块(``` 或 ~~~, 只由同种字符且不短于开始标记的行关闭)
+        if state["code"]:
+            if trimmed.startswith(state["fence"]):
+                flush_code()
+                state["code"] = False
+                state["lang"] = ""
+                state["code_lines"] = []
+                continue
+            state["code_lines"].append(line)
+            continue
+        m = RE_FENCE.match(trimmed)
+        if m:
+            flush_paragraph()
+            flush_list()
+            flush_blockquote()
+            flush_table()
+            state["code"] = True
+            state["fence"] = m.group(1)
+            state["lang"] = m.group(2).strip()
+            state["code_lines"] = []
+            continue
+
+        # 空行
+        if trimmed == "":
+            flush_paragraph()
+            flush_list()
+            flush_blockquote()
+            flush_table()
+            continue
+
+        # 标题
+        m = RE_HEADING.match(trimmed)
+        if m:
+            flush_paragraph()
+            flush_list()
+            flush_blockquote()
+            flush_table()
+            lvl = str(len(m.group(1)))
+            text = m.group(2)
+            anchor = unique_anchor(used, heading_anchor(text))
+            out.append(
+                "<h" + lvl + ' id="' + esc(anchor) + '">'
+                + inline_render(text) + "</h" + lvl + ">"
+            )
+            continue
+
+        # 水平线
+        if RE_HR.match(trimmed):
+            flush_paragraph()
+            flush_list()
+            flush_blockquote()
+            flush_table()
+            out.append("<hr>")
+            continue
+
+        # 引用块
+        if trimmed.startswith(">"):
+            flush_paragraph()
+            flush_list()
+            flush_table()
+            state["bq"] = True
+            state["bq_lines"].append(RE_BQ_PREFIX.sub("", trimmed, count=1))
+            continue
+        if state["bq"]:
+            flush_blockquote()
+
+        # 表格
+        if trimmed.startswith("|") and trimmed.endswith("|"):
+            if not state["table"]:
+                flush_paragraph()
+                flush_list()
+                flush_blockquote()
+                state["table"] = True
+                state["table_rows"] = []
+            state["table_rows"].append(trimmed)
+            continue
+        if state["table"]:
+            flush_table()
+
+        # 无序列表
+        m = RE_UL.match(trimmed)
+        if m:
+            flush_paragraph()
+            flush_blockquote()
+            flush_table()
+            if not state["list"] or state["list_type"] != "ul":
+                flush_list()
+                state["list"] = True
+                state["list_type"] = "ul"
+            state["list_items"].append(m.group(1))
+            continue
+
+        # 有序列表
+        m = RE_OL.match(trimmed)
+        if m:
+            flush_paragraph()
+            flush_blockquote()
+            flush_table()
+            if not state["list"] or state["list_type"] != "ol":
+                flush_list()
+                state["list"] = True
+                state["list_type"] = "ol"
+            state["list_items"].append(m.group(1))
+            continue
+
+        # 普通段落
+        if state["list"]:
+            flush_list()
+        state["para"].append(trimmed)
+
+    # 收尾
+    if state["code"]:
+        flush_code()
+    flush_paragraph()
+    flush_list()
+    flush_blockquote()
+    flush_table()
+
+    return "".join(out)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    perf_trace.py
+@brief   ProjWiki 性能剖析工具库 - 按阶段统计耗时、文件数、读写字节与内存峰值
+@author  Yarrow
+@date    2025-07-11
+@attention 各脚本通过 --profile 系列参数启用; 未启用时phase()/count()均为空操作
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+# 当前生效的剖析器, None表示未启用
+_profiler = None
+
+_NULL = nullcontext()
+
+
+class PhaseStats:
+    """单个阶段的累计统计"""
+
+    __slots__ = (
+        "name",
+        "depth",
+        "calls",
+        "wall_ms",
+        "files",
+        "bytes_read",
+        "bytes_written",
+        "peak",
+    )
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.calls = 0
+        self.wall_ms = 0.0
+        self.files = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "calls": self.calls,
+            "wall_ms": round(self.wall_ms, 3),
+            "files": self.files,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_bytes": self.peak,
+        }
+
+
+class Profiler:
+    """阶段剖析器
+
+    阶段可以嵌套, 计数累加到当前最内层的阶段; 同名阶段多次进入时累计.
+    内存峰值为阶段内tracemalloc峰值减去进入阶段时的占用(即该阶段额外占用的峰值).
+    启用cProfile时只对最外层阶段分别采样, 结束后导出耗时最长的那个阶段.
+    """
+
+    def __init__(self, script, track_memory=True, cprofile=False):
+        self.script = script
+        self.track_memory = track_memory
+        self.cprofile = cprofile
+        self.phases = {}
+        self.stack = []
+        self.samplers = {}
+        self.reports = []
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        depth = len(self.stack)
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(name, depth)
+        stats.calls += 1
+
+        mem_start = 0
+        if self.track_memory:
+            mem_start, peak = tracemalloc.get_traced_memory()
+            # 进入子阶段前先把外层阶段目前的峰值记下来, 再重置峰值
+            if self.stack:
+                outer, outer_start = self.stack[-1]
+                outer.peak = max(outer.peak, peak - outer_start)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+
+        sampler = None
+        if self.cprofile and depth == 0:
+            sampler = self.samplers.setdefault(name, cProfile.Profile())
+            sampler.enable()
+
+        self.stack.append((stats, mem_start))
+        t0 = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_ms += (time.perf_counter() - t0) * 1000
+            self.stack.pop()
+            if sampler is not None:
+                sampler.disable()
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                stats.peak = max(stats.peak, peak - mem_start)
+                if self.stack:
+                    outer, outer_start = self.stack[-1]
+                    outer.peak = max(outer.peak, peak - outer_start)
+
+    def count(self, files=0, read=0, written=0):
+        if not self.stack:
+            return
+        stats = self.stack[-1][0]
+        with self.lock:
+            stats.files += files
+            stats.bytes_read += read
+            stats.bytes_written += written
+
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def hottest_phase(self):
+        """耗时最长的最外层阶段名(仅统计已采样的阶段)"""
+        top = [s for s in self.phases.values() if s.depth == 0 and s.name in self.samplers]
+        if not top:
+            return None
+        return max(top, key=lambda s: s.wall_ms).name
+
+    def print_summary(self):
+        print_report(self.to_dict())
+        for data in self.reports:
+            print_report(data)
+
+    def to_dict(self):
+        data = {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "started": self.started_at,
+            "total_ms": round(self.total_ms(), 3),
+            "track_memory": self.track_memory,
+            "peak_bytes": tracemalloc.get_traced_memory()[1] if self.track_memory else None,
+            "phases": [s.to_dict() for s in self.phases.values()],
+        }
+        if self.reports:
+            data["reports"] = self.reports
+        return data
+
+
+def print_report(data):
+    """按Profiler.to_dict()格式的剖析结果打印汇总表"""
+    total = data["total_ms"]
+    kb = 1024
+    mb = 1024 * 1024
+    print()
+    print(f"[PROFILE] {data['script']}: total {total:.1f} ms")
+    print(
+        f"{'Phase':<24} {'Calls':>5} {'Wall ms':>10} {'%':>6} {'Files':>7} "
+        f"{'Read KB':>10} {'Write KB':>10} {'Peak MB':>8}"
+    )
+    print("-" * 87)
+    for s in data["phases"]:
+        name = "  " * s["depth"] + s["name"]
+        pct = s["wall_ms"] / total * 100 if total else 0
+        mem = f"{s['peak_bytes'] / mb:.1f}" if data["track_memory"] else "-"
+        print(
+            f"{name:<24} {s['calls']:>5} {s['wall_ms']:>10.1f} {pct:>6.1f} {s['files']:>7} "
+            f"{s['bytes_read'] / kb:>10.1f} {s['bytes_written'] / kb:>10.1f} {mem:>8}"
+        )
+    print("-" * 87)
+    if data["track_memory"]:
+        print(f"[PROFILE] Peak traced memory {data['peak_bytes'] / mb:.1f} MB (tracemalloc slows the run down)")
+
+
+def enabled():
+    """是否已启用剖析"""
+    return _profiler is not None
+
+
+def phase(name):
+    """阶段上下文: with perf_trace.phase("scan"): ...  未启用时为空操作"""
+    if _profiler is None:
+        return _NULL
+    return _profiler.phase(name)
+
+
+def count(files=0, read=0, written=0):
+    """累加当前阶段的文件数与读写字节数"""
+    if _profiler is not None:
+        _profiler.count(files, read, written)
+
+
+def count_read(path):
+    """按文件大小记录一次文件读取(未启用时不访问文件系统)"""
+    if _profiler is not None:
+        try:
+            _profiler.count(1, os.path.getsize(path), 0)
+        except OSError:
+            pass
+
+
+def count_written(path):
+    """按文件大小记录一次文件写入(未启用时不访问文件系统)"""
+    if _profiler is not None:
+        try:
+            _profiler.count(1, 0, os.path.getsize(path))
+        except OSError:
+            pass
+
+
+@contextmanager
+def profiling(script):
+    """在独立的剖析器下执行一段代码(如批量构建中的单个项目), 结束后恢复原剖析器
+
+    用法: with perf_trace.profiling(name) as prof: ...  结束后由prof.to_dict()取得结果
+
+    @param   script: 剖析结果的标题
+    """
+    global _profiler
+    outer = _profiler
+    _profiler = Profiler(script, track_memory=True)
+    try:
+        yield _profiler
+    finally:
+        _profiler = outer
+
+
+def add_report(data):
+    """附加另一剖析器的结果(Profiler.to_dict()格式), 随汇总表一并打印并写入JSON"""
+    if _profiler is not None:
+        _profiler.reports.append(data)
+
+
+def add_profile_arguments(parser):
+    """为argparse解析器添加剖析相关参数"""
+    group = parser.add_argument_group("性能剖析")
+    group.add_argument(
+        "--profile",
+        action="store_true",
+        help="按阶段统计耗时、文件数、读写字节与内存峰值, 结束时打印汇总表",
+    )
+    group.add_argument(
+        "--profile-out",
+        default=None,
+        metavar="FILE",
+        help="将剖析结果写入JSON文件(隐含--profile)",
+    )
+    group.add_argument(
+        "--profile-cprofile",
+        default=None,
+        metavar="FILE",
+        help="对各最外层阶段运行cProfile, 导出耗时最长阶段的统计(隐含--profile, 可用 python -m pstats FILE 查看)",
+    )
+
+
+def start_profiling(args, script):
+    """根据命令行参数启用剖析, 进程退出时自动输出汇总
+
+    @param   args: 含 profile/profile_out/profile_cprofile 属性的参数对象
+    @param   script: 脚本名(用于汇总标题)
+    @retval  启用时返回Profiler对象, 否则返回None
+    """
+    global _profiler
+    if not (args.profile or args.profile_out or args.profile_cprofile):
+        return None
+    _profiler = Profiler(script, track_memory=True, cprofile=bool(args.profile_cprofile))
+    atexit.register(finish_profiling, args.profile_out, args.profile_cprofile)
+    return _profiler
+
+
+def finish_profiling(trace_path=None, cprofile_path=None):
+    """打印汇总表, 并按需写出JSON结果与cProfile统计"""
+    global _profiler
+    prof = _profiler
+    if prof is None:
+        return
+    _profiler = None
+
+    prof.print_summary()
+    data = prof.to_dict()
+
+    if cprofile_path:
+        hottest = prof.hottest_phase()
+        if hottest:
+            prof.samplers[hottest].dump_stats(cprofile_path)
+            data["cprofile"] = {"phase": hottest, "file": str(cprofile_path)}
+            print(f"[PROFILE] cProfile of hottest phase '{hottest}': {cprofile_path}")
+
+    if trace_path:
+        Path(trace_path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+        print(f"[PROFILE] Trace written: {trace_path}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    preview_server.py
+@brief   ProjWiki 本地预览服务器 - 为_site目录提供HTTP服务, 支持条件缓存与实时刷新
+@author  Yarrow
+@date    2025-07-11
+@attention 仅使用标准库; 默认只监听127.0.0.1, 不要暴露到公网
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# 实时刷新事件流路径(Server-Sent Events)
+LIVERELOAD_PATH = "/__livereload"
+
+# 无事件时的心跳间隔(秒), 防止代理或浏览器断开空闲连接
+KEEPALIVE_SEC = 15
+
+# 保留的最近事件数: 连接落后超过此数目时改为推送整页刷新
+LIVERELOAD_LOG = 32
+
+
+class LiveReload:
+    """实时刷新事件广播器: 构建线程发布事件, 各SSE连接线程等待并推送
+
+    最近的事件按序号保存在有界日志中, 连接在推送期间错过的事件(各自带有变化的分片列表)
+    会依次补发; 落后超出日志范围时补发一个整页刷新事件.
+    """
+
+    def __init__(self, log_size=LIVERELOAD_LOG):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.log = deque(maxlen=log_size)
+
+    def publish(self, event):
+        """发布一次重建事件(唤醒所有等待中的连接)
+
+        @param   event: 可json序列化的事件字典
+        """
+        with self.cond:
+            self.seq += 1
+            self.log.append((self.seq, event))
+            self.cond.notify_all()
+
+    def wait(self, seq, timeout):
+        """等待序号大于seq的事件
+
+        @param   seq: 调用方已推送过的最新序号
+        @param   timeout: 最长等待秒数
+        @retval  (最新序号, 事件列表) 元组, 按发布顺序排列; 超时返回空列表,
+                 错过的事件已不在日志中时返回 [{"reload": True}]
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > seq, timeout)
+            if self.seq <= seq:
+                return seq, []
+            if self.log[0][0] > seq + 1:
+                return self.seq, [{"reload": True}]
+            return self.seq, [event for n, event in self.log if n > seq]
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """静态文件处理器: 增加ETag/304协商缓存和实时刷新事件流
+
+    Last-Modified与If-Modified-Since由SimpleHTTPRequestHandler原生处理;
+    这里补充基于(mtime, size)的弱ETag, 并统一要求浏览器每次重新验证,
+    未变化的分片只会得到一个304响应.
+    """
+
+    def __init__(self, *args, livereload=None, **kwargs):
+        self.livereload = livereload
+        self.etag = None
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] == LIVERELOAD_PATH and self.livereload:
+            self.serve_events()
+            return
+        super().do_GET()
+
+    def send_head(self):
+        self.etag = None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            self.etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+            inm = self.headers.get("If-None-Match")
+            if inm and self.etag in [t.strip() for t in inm.split(",")]:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header("ETag", self.etag)
+            self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def serve_events(self):
+        """推送实时刷新事件(SSE), 连接保持到客户端断开"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seq = self.livereload.seq
+        try:
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while True:
+                seq, events = self.livereload.wait(seq, KEEPALIVE_SEC)
+                if not events:
+                    self.wfile.write(b": ping\n\n")
+                for event in events:
+                    data = json.dumps(event, ensure_ascii=False)
+                    self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+
+    def log_message(self, format, *args):
+        # 静默普通访问日志, 只保留错误
+        pass
+
+    def log_error(self, format, *args):
+        super().log_message(format, *args)
+
+
+def start_preview_server(site_dir, port=8000, host="127.0.0.1"):
+    """在后台线程中启动预览服务器
+
+    @param   site_dir: 站点输出目录(_site)
+    @param   port: 监听端口, 0表示随机可用端口
+    @param   host: 监听地址
+    @retval  (服务器对象, LiveReload广播器) 元组
+    """
+    livereload = LiveReload()
+    handler = partial(PreviewHandler, directory=str(site_dir), livereload=livereload)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, livereload
@@ -14,6 +14,9 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import perf_trace
+from source_index import get_source_index, iter_sources
+
 # 导入AI任务工具
 try:
     from ai_task_utils import (
@@ -80,41 +83,33 @@ def find_template(use_ai_template=False):
     return tpl_path
 
 
-def scan_sources(root_dir):
-    """扫描项目源码，识别模块"""
-    modules = {}
+def scan_sources(root_dir, use_git=False):
+    """扫描项目源码，识别模块
 
-    # 定义需要忽略的目录
-    ignore_dirs = {
-        ".git",
-        ".zed",
-        ".vscode",
-        ".idea",
-        "build",
-        "dist",
-        "node_modules",
-        "venv",
-        "__pycache__",
-        "Firmware",
-    }
+    源文件列表来自共享的源码索引(source_index.py), 只重新列举上次扫描后有变化的目录,
+    这里只需要文件列表, 不重新stat已知的源文件.
+
+    @param   root_dir: 项目根目录
+    @param   use_git: 由本地git仓库的索引列出源文件(遵守.gitignore), git不可用时回退到文件系统扫描
+    @retval  {模块名: {"c": [.c绝对路径], "h": [.h绝对路径]}}
+    """
+    modules = {}
 
     print(f"[INFO] Scanning sources in {root_dir}...")
+    index, stats = get_source_index(root_dir, stat_files=False, use_git=use_git)
+    if stats["git"]:
+        print(f"[INFO] Source index: {stats['files']} files from git")
+    else:
+        print(
+            f"[INFO] Source index: {stats['files']} files in {stats['dirs']} dirs "
+            f"({stats['listed']} dirs re-listed)"
+        )
 
-    for root, dirs, files in os.walk(root_dir):
-        # 过滤忽略目录
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-
-        for file in files:
-            if file.endswith(".c"):
-                name = file[:-2]  # remove .c
-                if name not in modules:
-                    modules[name] = {"c": [], "h": []}
-                modules[name]["c"].append(os.path.join(root, file))
-            elif file.endswith(".h"):
-                name = file[:-2]  # remove .h
-                if name not in modules:
-                    modules[name] = {"c": [], "h": []}
-                modules[name]["h"].append(os.path.join(root, file))
+    for path, name, _, _ in iter_sources(index):
+        if name not in modules:
+            modules[name] = {"c": [], "h": []}
+        kind = "c" if path.endswith(".c") else "h"
+        modules[name][kind].append(os.path.join(root_dir, path))
 
     return modules
 
@@ -181,6 +176,7 @@ def generate_doc(
     # 写入文件
     try:
         md_path.write_text(content, encoding="utf-8")
+        perf_trace.count_written(md_path)
 
         # 如果启用AI任务收集，提取任务
         if collect_tasks and AI_TASK_SUPPORT:
@@ -207,7 +203,14 @@ def main():
     parser.add_argument(
         "--ai-fill", action="store_true", help="使用AI填空模板并生成待补充任务"
     )
+    parser.add_argument(
+        "--git",
+        action="store_true",
+        help="由本地git仓库的索引列出源文件(遵守.gitignore, 无需遍历目录), git不可用时回退到文件系统扫描",
+    )
+    perf_trace.add_profile_arguments(parser)
     args = parser.parse_args()
+    perf_trace.start_profiling(args, "scaffold_docs.py")
 
     try:
         root = find_project_root()
@@ -227,7 +230,9 @@ def main():
     # 加载模板
     tpl_path = find_template(use_ai_template=args.ai_fill)
     try:
-        tpl_content = tpl_path.read_text(encoding="utf-8")
+        with perf_trace.phase("template"):
+            tpl_content = tpl_path.read_text(encoding="utf-8")
+            perf_trace.count_read(tpl_path)
     except Exception as e:
         print(f"[ERROR] Could not read template: {e}")
         return 1
@@ -237,7 +242,8 @@ def main():
         print("[INFO] AI填空模式已启用")
 
     # 扫描源码
-    modules = scan_sources(root)
+    with perf_trace.phase("scan_sources"):
+        modules = scan_sources(root, use_git=args.git)
     print(f"[INFO] Found {len(modules)} potential modules.")
 
     created_count = 0
@@ -249,9 +255,10 @@ def main():
         if not info["c"] and len(info["h"]) == 1:
             continue
 
-        result = generate_doc(
-            name, info, tpl_content, wiki_modules_dir, root, collect_tasks=args.ai_fill
-        )
+        with perf_trace.phase("generate"):
+            result = generate_doc(
+                name, info, tpl_content, wiki_modules_dir, root, collect_tasks=args.ai_fill
+            )
 
         if result is None:
             # 跳过已存在的文档
@@ -273,7 +280,9 @@ def main():
             ai_tasks_dir
             / f"pending_tasks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         )
-        save_tasks_to_json(all_tasks, task_file)
+        with perf_trace.phase("save_tasks"):
+            save_tasks_to_json(all_tasks, task_file)
+            perf_trace.count_written(task_file)
         print(f"\n[AI TASKS] 生成了 {len(all_tasks)} 个待补充任务")
         print(f"[AI TASKS] 任务文件: {task_file}")
         print("\n" + generate_task_summary(all_tasks))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    search_index.py
+@brief   ProjWiki 搜索索引工具库 - 构建时生成倒排索引供HTML查看器检索
+@author  Yarrow
+@date    2025-07-11
+@attention 分词规则必须与 viewer_template.html 中的 tokenize() 保持一致
+"""
+
+import re
+from bisect import bisect_left
+
+# 英文/数字标识符 或 连续的CJK汉字
+TOKEN_RE = re.compile(r"[A-Za-z0-9_]+|[\u4e00-\u9fff]+")
+
+# 基本平面(BMP)外的字符, 在JS字符串中占两个UTF-16码元
+ASTRAL_RE = re.compile("[\U00010000-\U0010ffff]")
+
+# 字段标记位(倒排记录中的第4项)
+FIELD_TITLE = 1
+FIELD_TAGS = 2
+
+INDEX_VERSION = 1
+
+
+def tokenize(text):
+    """对文本分词, 生成 (词项, 字符偏移) 序列
+
+    - 英文/数字: 小写化; 含下划线的标识符同时拆分出各组成部分(如 mod_pwm_init
+      生成 mod_pwm_init、mod、pwm、init), 单字符片段忽略
+    - 中文: 连续汉字按二元组(bigram)切分, 单个汉字保留为一元词项
+
+    @param   text: 待分词文本
+    @retval  (term, offset) 生成器, offset为词项在text中的起始位置
+    """
+    for m in TOKEN_RE.finditer(text):
+        run = m.group()
+        pos = m.start()
+        if run[0] >= "\u4e00":
+            if len(run) == 1:
+                yield run, pos
+            else:
+                for i in range(len(run) - 1):
+                    yield run[i : i + 2], pos + i
+            continue
+
+        run = run.lower()
+        if len(run) >= 2:
+            yield run, pos
+        if "_" in run:
+            off = pos
+            for part in run.split("_"):
+                if len(part) >= 2 and part != run:
+                    yield part, off
+                off += len(part) + 1
+
+
+def doc_terms(d):
+    """统计单个文档的词项信息
+
+    偏移供查看器截取JS字符串, 按UTF-16码元计数: 正文中位于词项之前的每个BMP外字符
+    (如emoji)多占一个码元.
+
+    @param   d: 文档记录(WikiDoc)
+    @retval  {term: [tf, offset, fields]} 字典
+    """
+    stats = {}
+    base = d.client_body_offset
+    body = d.body
+    astral = [] if body.isascii() else [m.start() for m in ASTRAL_RE.finditer(body)]
+    for term, off in tokenize(body):
+        st = stats.get(term)
+        if st is None:
+            stats[term] = [1, base + off + bisect_left(astral, off), 0]
+        else:
+            st[0] += 1
+
+    for field, text in ((FIELD_TITLE, d.title), (FIELD_TAGS, " ".join(d.tags))):
+        for term, _ in tokenize(text):
+            st = stats.get(term)
+            if st is None:
+                stats[term] = [0, -1, field]
+            else:
+                st[2] |= field
+    return stats
+
+
+def build_search_index(docs, term_cache=None):
+    """为文档列表构建倒排索引
+
+    索引格式: {"v": 版本, "n": 文档数, "terms": {term: [doc, tf, offset, fields, ...]}}
+    每个词项的倒排记录为扁平数组, 每4项一组:
+    doc为文档在docs中的下标, tf为正文词频, offset为首次出现位置(相对完整content的
+    UTF-16码元偏移, 供查看器截取摘要), fields为标题/标签命中标记位.
+
+    @param   docs: scan_wiki返回的文档列表
+    @param   term_cache: 可选字典 {内容哈希: doc_terms结果}, 命中时跳过分词;
+             调用后只保留当前文档的条目(用于监视模式下的连续构建)
+    @retval  索引字典(可直接json序列化)
+    """
+    postings = {}
+    live = {}
+    for idx, d in enumerate(docs):
+        key = d.hash
+        stats = term_cache.get(key) if term_cache is not None else None
+        if stats is None:
+            stats = doc_terms(d)
+        live[key] = stats
+
+        for term, (tf, off, fields) in stats.items():
+            postings.setdefault(term, []).extend((idx, tf, off, fields))
+
+    if term_cache is not None:
+        term_cache.clear()
+        term_cache.update(live)
+
+    return {
+        "v": INDEX_VERSION,
+        "n": len(docs),
+        "terms": {t: postings[t] for t in sorted(postings)},
+    }
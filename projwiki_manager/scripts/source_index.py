@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    source_index.py
+@brief   ProjWiki 源码索引工具库 - 一次遍历收集项目中的 .c/.h 文件并持久化, 后续运行按目录修改时间增量刷新
+@author  Yarrow
+@date    2025-07-11
+@attention 目录的修改时间只在其中增删、重命名条目时变化, 因此未变化的目录沿用上次的列表而不重新列举;
+           文件内容的修改不改变目录修改时间, 需要最新修改时间的调用方(check_outdated)仍须逐个stat源文件
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import perf_trace
+from wiki_common import RACY_NS
+
+SOURCE_INDEX_NAME = "source_index.json"
+# 索引格式版本, 变化时(或忽略目录变化时)整体重新扫描
+SOURCE_INDEX_VERSION = 2
+
+# 收集的源文件扩展名
+SOURCE_EXTS = (".c", ".h")
+
+# 扫描时忽略的目录(scaffold_docs 与 check_outdated 共用)
+IGNORE_DIRS = frozenset(
+    {
+        ".git",
+        ".zed",
+        ".vscode",
+        ".idea",
+        "build",
+        "dist",
+        "node_modules",
+        "venv",
+        "__pycache__",
+        "Firmware",
+    }
+)
+
+
+def source_index_path(root):
+    """项目的源码索引文件路径: .zed/.projwiki/.build_cache/source_index.json"""
+    return Path(root) / ".zed" / ".projwiki" / ".build_cache" / SOURCE_INDEX_NAME
+
+
+def empty_index():
+    """空索引
+
+    dirs:  {相对目录: {"mtime": 纳秒, "dirs": [子目录名], "files": [源文件名]}}, 根目录为""
+    files: {相对路径: [模块名, 大小, 修改时间, 内容哈希]}, 路径以/分隔;
+           内容哈希在需要时由hash_sources计算, 大小或修改时间变化后清空(None)
+    """
+    return {
+        "version": SOURCE_INDEX_VERSION,
+        "ignore": sorted(IGNORE_DIRS),
+        "time": 0,
+        "dirs": {},
+        "files": {},
+    }
+
+
+def load_source_index(root):
+    """加载持久化的源码索引, 不存在、损坏或版本不一致时返回空索引"""
+    path = source_index_path(root)
+    if not path.exists():
+        return empty_index()
+    try:
+        index = json.loads(path.read_text(encoding="utf-8"))
+        perf_trace.count_read(path)
+    except (OSError, ValueError):
+        return empty_index()
+    if (
+        not isinstance(index, dict)
+        or index.get("version") != SOURCE_INDEX_VERSION
+        or index.get("ignore") != sorted(IGNORE_DIRS)
+    ):
+        return empty_index()
+    return index
+
+
+def save_source_index(root, index):
+    """保存源码索引(先写临时文件再替换, 并发运行的脚本不会读到写了一半的文件)"""
+    path = source_index_path(root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    perf_trace.count_written(path)
+
+
+def list_dir(path):
+    """列举目录: 返回 (子目录名列表, 源文件名列表), 均已排序
+
+    忽略IGNORE_DIRS中的目录, 不进入符号链接指向的目录(与os.walk默认行为一致).
+    """
+    subdirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    if entry.name not in IGNORE_DIRS and not entry.is_symlink():
+                        subdirs.append(entry.name)
+                elif entry.name.endswith(SOURCE_EXTS):
+                    files.append(entry.name)
+            except OSError:
+                continue
+    subdirs.sort()
+    files.sort()
+    return subdirs, files
+
+
+def refresh_source_index(root, index, stat_files=True):
+    """按文件系统现状刷新索引(原地修改)
+
+    从根目录开始遍历: 修改时间与索引记录一致的目录直接沿用记录的子目录与源文件列表,
+    其余目录重新列举. 已不存在的目录与文件从索引中移除.
+
+    @param   root: 项目根目录
+    @param   index: load_source_index返回的索引
+    @param   stat_files: 是否重新stat所有源文件; 为False时只stat新出现的文件,
+             已有文件沿用索引中的大小与修改时间(只需要文件列表时使用)
+    @retval  统计字典 {dirs, listed, files, changed}
+             (目录数 / 重新列举的目录数 / 源文件数 / 新增、修改或删除的源文件数)
+    """
+    root = str(root)
+    old_dirs = index["dirs"]
+    old_files = index["files"]
+    # 修改时间距上次扫描过近的目录不可信, 本次重新列举
+    trusted_before = index.get("time", 0) - RACY_NS
+    dirs = {}
+    files = {}
+    stats = {"dirs": 0, "listed": 0, "files": 0, "changed": 0}
+
+    scan_time = time.time_ns()
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        path = os.path.join(root, rel) if rel else root
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+
+        old = old_dirs.get(rel)
+        if old and old["mtime"] == mtime_ns and mtime_ns < trusted_before:
+            subdirs, names = old["dirs"], old["files"]
+        else:
+            try:
+                subdirs, names = list_dir(path)
+            except OSError:
+                continue
+            stats["listed"] += 1
+        dirs[rel] = {"mtime": mtime_ns, "dirs": subdirs, "files": names}
+        stats["dirs"] += 1
+
+        prefix = rel + "/" if rel else ""
+        for name in names:
+            file_rel = prefix + name
+            old_entry = old_files.get(file_rel)
+            if not stat_files and old_entry:
+                files[file_rel] = old_entry
+                continue
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+            if old_entry and old_entry[1] == st.st_size and old_entry[2] == st.st_mtime:
+                # 未变化的文件保留已计算的内容哈希
+                files[file_rel] = old_entry
+                continue
+            files[file_rel] = [name[:-2], st.st_size, st.st_mtime, None]
+            stats["changed"] += 1
+        perf_trace.count(files=len(names))
+
+        # 逆序入栈, 使遍历按目录名顺序进行
+        stack.extend(prefix + d for d in reversed(subdirs))
+
+    stats["changed"] += sum(1 for p in old_files if p not in files)
+    stats["files"] = len(files)
+    index["dirs"] = dirs
+    index["files"] = files
+    index["time"] = scan_time
+    return stats
+
+
+def run_git(root, *args, stdin=None):
+    """在root下执行git命令(-z输出), 返回按NUL分隔的字段列表
+
+    @param   stdin: 可选, 写入命令标准输入的文本
+    @retval  字段列表, git未安装、root不在git仓库中或命令失败时返回None
+    """
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(root), *args],
+            input=None if stdin is None else stdin.encode("utf-8", "surrogateescape"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return [f for f in proc.stdout.decode("utf-8", "surrogateescape").split("\0") if f]
+
+
+def is_ignored_path(path):
+    """相对路径是否位于IGNORE_DIRS中的目录下"""
+    return "/" in path and not IGNORE_DIRS.isdisjoint(path.split("/")[:-1])
+
+
+def git_source_index(root, with_hashes=True):
+    """由本地git仓库的索引构建源码索引(不访问网络, 不由Python遍历、stat文件系统)
+
+    - 已跟踪的源文件取自 git ls-files -s, 内容哈希直接使用索引中的blob ID
+    - 工作区中已修改的文件与未跟踪的文件取自 git status(遵守.gitignore),
+      其内容哈希留空, 需要时由hash_sources从文件计算; 工作区中已删除的文件被排除
+    - 与文件系统扫描一致, 同样排除IGNORE_DIRS中的目录; 子模块中的文件不包含在内
+    大小与修改时间为0, 需要修改时间的调用方应对关心的文件调用stat_sources.
+    返回的索引带有 "git": True 标记, hash_sources据此改用git计算工作区文件的哈希.
+
+    with_hashes为False时只用一次 git ls-files 列出已跟踪与未跟踪(未被忽略)的文件,
+    不检查工作区状态, 内容哈希均为空; 已删除但尚未提交删除的文件仍会列出.
+
+    @param   root: 项目根目录(可以是git仓库的子目录)
+    @param   with_hashes: 是否获取内容哈希(只需要文件列表时为False)
+    @retval  索引字典(格式同load_source_index, 不持久化), git不可用或root不在git仓库中时返回None
+    """
+    pathspec = ["--", "*.c", "*.h"]
+    if not with_hashes:
+        listed = run_git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard", *pathspec)
+        if listed is None:
+            return None
+        files = {}
+        for path in listed:
+            if not is_ignored_path(path):
+                files[path] = [path.rsplit("/", 1)[-1][:-2], 0, 0.0, None]
+        perf_trace.count(files=len(files))
+        index = empty_index()
+        index["git"] = True
+        index["files"] = files
+        return index
+
+    prefix = run_git(root, "rev-parse", "--show-prefix")
+    if prefix is None:
+        return None
+    # --show-prefix以换行结尾(不受-z影响), 根目录为空
+    prefix = "".join(prefix).strip()
+
+    staged = run_git(root, "ls-files", "-s", "-z", *pathspec)
+    # git status会刷新索引中的stat信息, 只改写了修改时间的文件不会被列为已修改
+    status = run_git(
+        root, "status", "--porcelain=v1", "-z", "--untracked-files=all", "--no-renames", *pathspec
+    )
+    if staged is None or status is None:
+        return None
+
+    files = {}
+    for line in staged:
+        info, path = line.split("\t", 1)
+        mode, blob, stage = info.split()
+        if mode == "160000" or is_ignored_path(path):
+            continue
+        name = path.rsplit("/", 1)[-1]
+        # 合并冲突中的文件处于非0暂存阶段, 不使用索引中的blob ID
+        files[path] = [name[:-2], 0, 0.0, blob if stage == "0" else None]
+
+    for line in status:
+        code, path = line[:2], line[3:]
+        if not path.startswith(prefix):
+            continue
+        path = path[len(prefix) :]
+        if not path.endswith(SOURCE_EXTS) or is_ignored_path(path):
+            continue
+        if code[1] == "D":
+            files.pop(path, None)
+        elif code == "??" or code[1] != " ":
+            name = path.rsplit("/", 1)[-1]
+            files[path] = [name[:-2], 0, 0.0, None]
+
+    perf_trace.count(files=len(files))
+    index = empty_index()
+    index["git"] = True
+    index["files"] = dict(sorted(files.items()))
+    return index
+
+
+def stat_sources(root, index, paths):
+    """为索引中的指定源文件填入当前的大小与修改时间(用于git_source_index构建的索引), 已不存在的文件被移除"""
+    files = index["files"]
+    for path in paths:
+        entry = files.get(path)
+        if entry is None:
+            continue
+        try:
+            st = os.stat(os.path.join(root, path))
+        except OSError:
+            del files[path]
+            continue
+        entry[1] = st.st_size
+        entry[2] = st.st_mtime
+
+
+def get_source_index(root, stat_files=True, persist=True, use_git=False):
+    """加载并刷新项目的源码索引
+
+    @param   root: 项目根目录
+    @param   stat_files: 是否重新stat所有源文件, 见refresh_source_index
+    @param   persist: 刷新后是否写回索引文件(内容无变化时不写)
+    @param   use_git: 优先由本地git仓库的索引构建(见git_source_index, stat_files为False时不获取内容哈希),
+             不可用时回退到文件系统扫描; git模式下的索引不持久化, 文件的大小与修改时间为0
+    @retval  (索引字典, 统计字典), 统计字典见refresh_source_index, 另含git(是否来自git仓库)
+    """
+    if use_git:
+        index = git_source_index(root, with_hashes=stat_files)
+        if index is not None:
+            n = len(index["files"])
+            return index, {"dirs": 0, "listed": 0, "files": n, "changed": 0, "git": True}
+        print("[WARN] git is not available or not a git repository, falling back to filesystem scan")
+
+    index = load_source_index(root)
+    before = index["dirs"]
+    stats = refresh_source_index(root, index, stat_files)
+    if persist and (stats["listed"] or stats["changed"] or index["dirs"] != before):
+        try:
+            save_source_index(root, index)
+        except OSError as e:
+            print(f"[WARN] Cannot save source index: {e}")
+    stats["git"] = False
+    return index, stats
+
+
+def iter_sources(index):
+    """遍历索引中的源文件
+
+    @retval  迭代器, 元素为 (相对路径, 模块名, 大小, 修改时间)
+    """
+    for path, (stem, size, mtime, _) in index["files"].items():
+        yield path, stem, size, mtime
+
+
+def sources_by_stem(index):
+    """按模块名分组源文件
+
+    @retval  {模块名: [(相对路径, 大小, 修改时间), ...]}, 组内按路径顺序
+    """
+    groups = {}
+    for path, stem, size, mtime in iter_sources(index):
+        groups.setdefault(stem, []).append((path, size, mtime))
+    return groups
+
+
+def blob_hash(path):
+    """计算文件内容哈希, 与git的blob对象ID相同(sha1("blob <大小>\\0" + 内容))"""
+    data = Path(path).read_bytes()
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def git_hash_objects(root, paths):
+    """用 git hash-object 计算工作区文件的blob ID
+
+    与git add相同, 内容先经过clean过滤器与换行符转换(core.autocrlf、.gitattributes),
+    结果可与git索引中的blob ID直接比较.
+
+    @retval  与paths一一对应的哈希列表, git执行失败(如文件已被删除)时返回None
+    """
+    out = run_git(root, "hash-object", "--stdin-paths", stdin="".join(p + "\n" for p in paths))
+    digests = "".join(out).split() if out is not None else []
+    return digests if len(digests) == len(paths) else None
+
+
+def hash_sources(root, index, paths, jobs=1):
+    """获取源文件的内容哈希, 只计算索引中没有缓存哈希(新文件或大小、修改时间变化)的文件
+
+    计算结果写回索引条目(调用方负责保存索引). 修改时间距现在过近的文件不缓存哈希,
+    避免同一时间戳内的后续修改被误认为未变化.
+
+    由git_source_index构建的索引中, 已跟踪文件的哈希为git索引中的blob ID, 其余文件
+    改用git_hash_objects计算, 使同一索引中的哈希都经过git的过滤与换行符转换;
+    文件系统索引中的哈希为原始文件内容的blob_hash, 两者在有过滤规则时可能不同.
+
+    @param   root: 项目根目录
+    @param   index: 已刷新的源码索引(get_source_index)
+    @param   paths: 源文件相对路径列表, 不在索引中的路径被忽略
+    @param   jobs: 并发计算哈希的线程数(sha1与文件读取均释放GIL), 1表示串行
+    @retval  ({相对路径: 哈希}, 实际计算哈希的文件数), 读取失败的文件不在结果中
+    """
+    files = index["files"]
+    result = {}
+    todo = []
+    for path in paths:
+        entry = files.get(path)
+        if entry is None:
+            continue
+        if entry[3]:
+            result[path] = entry[3]
+        else:
+            todo.append(path)
+
+    def work(path):
+        full = os.path.join(root, path)
+        try:
+            digest = blob_hash(full)
+        except OSError:
+            return path, None
+        perf_trace.count_read(full)
+        return path, digest
+
+    if index.get("git"):
+        digests = git_hash_objects(root, todo) if todo else []
+        for path in todo if digests else ():
+            perf_trace.count_read(os.path.join(root, path))
+        hashed = list(zip(todo, digests or [None] * len(todo)))
+    elif jobs > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            hashed = list(pool.map(work, todo))
+    else:
+        hashed = [work(path) for path in todo]
+
+    racy_before = time.time() - RACY_NS / 1e9
+    for path, digest in hashed:
+        if digest is None:
+            continue
+        result[path] = digest
+        entry = files[path]
+        if entry[2] < racy_before:
+            entry[3] = digest
+    return result, len(todo)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    wiki_common.py
+@brief   ProjWiki 公共工具库 - 各脚本共用的常量与小型辅助函数
+@author  Yarrow
+@date    2025-07-11
+@attention 只依赖标准库, 不导入其他脚本模块, 任何脚本都可以安全地导入
+"""
+
+# 修改时间距记录时刻过近的文件或目录不可信: 文件系统时间戳精度有限,
+# 同一时刻内的后续修改无法由修改时间分辨, 此时应改为比较内容(纳秒)
+RACY_NS = 2_000_000_000
+
+
+def meta_text(value):
+    """frontmatter值转为文本(数组值以逗号连接)"""
+    if isinstance(value, list):
+        return ", ".join(value)
+    return value or ""
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    wiki_db.py
+@brief   ProjWiki SQLite导出工具库 - 将扫描结果写入带FTS5全文索引的数据库, 按内容哈希增量更新
+@author  Yarrow
+@date    2025-07-11
+@attention 全文表索引按 search_index.tokenize() 切分后的词项(中文为二元组), 查询时必须使用同一分词规则
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+from search_index import INDEX_VERSION, tokenize
+from wiki_common import meta_text
+
+# 表结构版本, 变化时(或分词规则版本变化时)数据库整体重建
+DB_VERSION = 1
+
+# 全文检索各列权重: 标题 / 标签 / 正文 (与查看器中标题、标签命中的加分对应)
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+SCHEMA = f"""
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    title TEXT,
+    category TEXT COLLATE NOCASE,
+    module TEXT COLLATE NOCASE,
+    layer TEXT COLLATE NOCASE,
+    status TEXT COLLATE NOCASE,
+    author TEXT COLLATE NOCASE,
+    date TEXT,
+    tags TEXT,
+    hash TEXT NOT NULL,
+    mtime REAL,
+    body TEXT
+);
+CREATE INDEX docs_category ON docs(category);
+CREATE INDEX docs_module ON docs(module);
+CREATE INDEX docs_status ON docs(status);
+CREATE INDEX docs_author ON docs(author);
+CREATE TABLE tags (
+    doc_id INTEGER NOT NULL,
+    tag TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX tags_tag ON tags(tag, doc_id);
+CREATE INDEX tags_doc ON tags(doc_id);
+CREATE VIRTUAL TABLE docs_fts USING fts5(
+    title, tags, body,
+    content = '',
+    tokenize = "unicode61 tokenchars '_'",
+    prefix = '2 3'
+);
+INSERT INTO docs_fts(docs_fts, rank) VALUES ('rank', 'bm25({", ".join(map(str, FTS_WEIGHTS))})');
+"""
+
+
+def default_db_path(root):
+    """项目默认的数据库路径: .zed/.projwiki/_site/<项目名>.db (与HTML同名)"""
+    root = Path(root)
+    return root / ".zed" / ".projwiki" / "_site" / f"{root.name or 'index'}.db"
+
+
+def schema_key():
+    """表结构与分词规则的组合版本号"""
+    return f"{DB_VERSION}.{INDEX_VERSION}"
+
+
+def fts_text(text):
+    """将文本转换为写入全文表的词项序列(空格分隔)"""
+    return " ".join(term for term, _ in tokenize(text))
+
+
+def fts_delete(conn, doc_id):
+    """从全文表中删除文档
+
+    全文表不保存原文(content=''), FTS5要求删除时提供与写入时相同的列值,
+    这里由docs表中的旧记录重新分词得到(分词规则变化时数据库整体重建, 结果必然一致).
+    """
+    title, tags, body = conn.execute(
+        "SELECT title, tags, body FROM docs WHERE id = ?", (doc_id,)
+    ).fetchone()
+    conn.execute(
+        "INSERT INTO docs_fts(docs_fts, rowid, title, tags, body) VALUES ('delete', ?, ?, ?, ?)",
+        (doc_id, fts_text(title), fts_text(tags), fts_text(body)),
+    )
+
+
+def doc_module(d):
+    """文档所属模块: frontmatter的module字段, modules/下的文档缺省为文件名"""
+    module = meta_text(d.meta.get("module"))
+    if not module and d.path.startswith("modules/"):
+        module = d.path.rsplit("/", 1)[-1][:-3]
+    return module
+
+
+def open_db(db_path, readonly=False):
+    """打开数据库
+
+    @param   db_path: 数据库文件路径
+    @param   readonly: 只读打开(文件不存在时抛出sqlite3.OperationalError)
+    @retval  sqlite3.Connection
+    """
+    if readonly:
+        return sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    return sqlite3.connect(str(db_path))
+
+
+def ensure_schema(conn):
+    """检查表结构版本, 不存在或版本不一致时清空重建
+
+    @retval  True表示数据库为新建(需要全量写入)
+    """
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row and row[0] == schema_key():
+        return False
+
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('meta', 'docs', 'tags', 'docs_fts')"
+    ).fetchall()
+    for (name,) in tables:
+        conn.execute(f"DROP TABLE {name}")
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO meta(key, value) VALUES ('schema', ?)", (schema_key(),))
+    conn.commit()
+    return True
+
+
+def export_sqlite(docs, db_path):
+    """将文档写入SQLite数据库(增量)
+
+    数据库中已有的文档按内容哈希比较: 哈希未变化的文档不做任何写入,
+    变化的文档更新元数据、标签与全文索引, 已删除的文档连同索引一并移除.
+    全部修改在同一事务中提交, 查询方不会看到写了一半的数据.
+
+    @param   docs: scan_wiki返回的文档列表
+    @param   db_path: 数据库文件路径
+    @retval  统计字典 {added, updated, removed, unchanged, ms}
+    """
+    start = time.perf_counter()
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    conn = open_db(db_path)
+    try:
+        created = ensure_schema(conn)
+        with conn:
+            existing = {
+                path: (doc_id, digest)
+                for doc_id, path, digest in conn.execute("SELECT id, path, hash FROM docs")
+            }
+
+            for d in docs:
+                old = existing.pop(d.path, None)
+                if old and old[1] == d.hash:
+                    stats["unchanged"] += 1
+                    continue
+
+                # 元数据统一转为文本再绑定(frontmatter数组写法会解析为列表)
+                title = meta_text(d.title)
+                row = (
+                    title,
+                    meta_text(d.category),
+                    doc_module(d),
+                    meta_text(d.meta.get("layer")),
+                    meta_text(d.status),
+                    meta_text(d.author),
+                    meta_text(d.date),
+                    "\n".join(d.tags),
+                    d.hash,
+                    d.mtime,
+                    d.body,
+                )
+                if old:
+                    doc_id = old[0]
+                    fts_delete(conn, doc_id)
+                    conn.execute(
+                        "UPDATE docs SET title = ?, category = ?, module = ?, layer = ?, status = ?, "
+                        "author = ?, date = ?, tags = ?, hash = ?, mtime = ?, body = ? WHERE id = ?",
+                        row + (doc_id,),
+                    )
+                    conn.execute("DELETE FROM tags WHERE doc_id = ?", (doc_id,))
+                    stats["updated"] += 1
+                else:
+                    doc_id = conn.execute(
+                        "INSERT INTO docs(title, category, module, layer, status, author, date, "
+                        "tags, hash, mtime, body, path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row + (d.path,),
+                    ).lastrowid
+                    stats["added"] += 1
+
+                conn.execute(
+                    "INSERT INTO docs_fts(rowid, title, tags, body) VALUES (?, ?, ?, ?)",
+                    (doc_id, fts_text(title), fts_text(" ".join(d.tags)), fts_text(d.body)),
+                )
+                conn.executemany(
+                    "INSERT INTO tags(doc_id, tag) VALUES (?, ?)",
+                    [(doc_id, tag) for tag in dict.fromkeys(d.tags)],
+                )
+
+            # 剩余的旧条目对应已删除的文档
+            gone = [(doc_id,) for doc_id, _ in existing.values()]
+            if gone:
+                for (doc_id,) in gone:
+                    fts_delete(conn, doc_id)
+                conn.executemany("DELETE FROM docs WHERE id = ?", gone)
+                conn.executemany("DELETE FROM tags WHERE doc_id = ?", gone)
+                stats["removed"] = len(gone)
+
+            # 全量写入后合并全文索引的段, 之后的增量修改由FTS5自动合并
+            if created and stats["added"]:
+                conn.execute("INSERT INTO docs_fts(docs_fts) VALUES ('optimize')")
+    finally:
+        conn.close()
+
+    stats["ms"] = (time.perf_counter() - start) * 1000
+    return stats
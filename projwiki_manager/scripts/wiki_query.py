@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@file    wiki_query.py
+@brief   ProjWiki 命令行查询工具 - 按标签、状态、作者、模块或全文检索 build_wiki.py --sqlite 导出的数据库
+@author  Yarrow
+@date    2025-07-11
+@attention 全文检索使用与查看器相同的分词规则, 所有词项都须命中, 结果按BM25(标题/标签加权)排序
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import perf_trace
+from search_index import tokenize
+from wiki_db import default_db_path, open_db, schema_key
+
+# 可直接按列等值过滤的字段(大小写不敏感)
+FILTER_FIELDS = ("category", "module", "status", "author")
+
+
+def find_project_root():
+    """从脚本位置向上查找项目根目录(包含.zed目录), 找不到时使用当前目录"""
+    cur = Path(__file__).resolve().parent
+    for _ in range(10):
+        if (cur / ".zed").is_dir():
+            return cur
+        if cur.parent == cur:
+            break
+        cur = cur.parent
+    return Path(os.getcwd())
+
+
+def match_expr(query):
+    """将查询文本转换为FTS5 MATCH表达式
+
+    与查看器一致: 查询按tokenize()切分, 各词项之间为AND关系, 每个词项按前缀匹配
+    (部分标识符、单个汉字). 词项只含字母数字下划线或汉字, 无需转义.
+
+    @retval  MATCH表达式, 查询中没有可检索的词项时返回None
+    """
+    terms = dict.fromkeys(term for term, _ in tokenize(query))
+    if not terms:
+        return None
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+
+def make_snippet(body, query, width=100):
+    """截取正文中第一个命中词项附近的片段"""
+    lower = body.lower()
+    pos = -1
+    for term, _ in tokenize(query):
+        pos = lower.find(term)
+        if pos >= 0:
+            break
+    if pos < 0:
+        return ""
+    start = max(0, pos - width * 2 // 5)
+    return "..." + " ".join(body[start : pos + width * 3 // 5].split()) + "..."
+
+
+def query_docs(conn, query="", tags=(), limit=20, **filters):
+    """查询文档
+
+    @param   conn: 数据库连接
+    @param   query: 全文检索文本, 为空时只按条件过滤并按路径排序
+    @param   tags: 必须全部包含的标签列表
+    @param   limit: 最多返回的条数
+    @param   filters: 按字段等值过滤, 可用字段见FILTER_FIELDS
+    @retval  结果字典列表 [{path, title, category, module, status, author, date, tags, score, snippet}, ...]
+    """
+    where = []
+    params = []
+    expr = match_expr(query) if query else None
+    if query and expr is None:
+        return []
+    if expr:
+        sql = (
+            "SELECT d.id, d.path, d.title, d.category, d.module, d.status, d.author, d.date, d.tags, "
+            "docs_fts.rank FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid"
+        )
+        where.append("docs_fts MATCH ?")
+        params.append(expr)
+        order = "docs_fts.rank"
+    else:
+        sql = (
+            "SELECT d.id, d.path, d.title, d.category, d.module, d.status, d.author, d.date, d.tags, "
+            "0 FROM docs d"
+        )
+        order = "d.path"
+
+    for field in FILTER_FIELDS:
+        value = filters.get(field)
+        if value:
+            where.append(f"d.{field} = ?")
+            params.append(value)
+    for tag in tags:
+        where.append("d.id IN (SELECT doc_id FROM tags WHERE tag = ?)")
+        params.append(tag)
+
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+    params.append(limit)
+
+    results = []
+    for doc_id, path, title, category, module, status, author, date, tag_text, rank in conn.execute(
+        sql, params
+    ):
+        snippet = ""
+        if expr:
+            # 正文只为最终返回的行读取
+            (body,) = conn.execute("SELECT body FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            snippet = make_snippet(body, query)
+        results.append(
+            {
+                "path": path,
+                "title": title,
+                "category": category,
+                "module": module,
+                "status": status,
+                "author": author,
+                "date": date,
+                "tags": tag_text.split("\n") if tag_text else [],
+                # bm25()越小越相关, 取负值使分数越大越相关
+                "score": round(-rank, 4) if expr else 0,
+                "snippet": snippet,
+            }
+        )
+    return results
+
+
+def print_results(results):
+    """以文本形式输出查询结果"""
+    for i, r in enumerate(results, 1):
+        print(f"{i:>3}. {r['title']}  ({r['path']})")
+        info = [r["status"], r["author"], r["date"]]
+        if r["module"]:
+            info.append(f"module={r['module']}")
+        if r["tags"]:
+            info.append("tags=" + ",".join(r["tags"]))
+        print("     " + " | ".join(x for x in info if x))
+        if r["snippet"]:
+            print(f"     {r['snippet']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ProjWiki命令行查询工具(查询 build_wiki.py --sqlite 导出的数据库)"
+    )
+    parser.add_argument("query", nargs="*", help="全文检索关键词(可省略, 只按条件过滤)")
+    parser.add_argument("--tag", "-t", action="append", default=[], help="按标签过滤, 可重复指定(须全部包含)")
+    parser.add_argument("--status", "-s", help="按状态过滤 (如 draft / published)")
+    parser.add_argument("--author", "-a", help="按作者过滤")
+    parser.add_argument("--module", "-m", help="按模块过滤(frontmatter的module字段, modules/下的文档为文件名)")
+    parser.add_argument("--category", "-c", help="按分类过滤")
+    parser.add_argument("--limit", "-n", type=int, default=20, metavar="N", help="最多返回的条数 (默认: 20)")
+    parser.add_argument("--db", default=None, metavar="FILE", help="数据库文件 (默认: _site/<项目名>.db)")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    perf_trace.add_profile_arguments(parser)
+    args = parser.parse_args()
+    perf_trace.start_profiling(args, "wiki_query.py")
+
+    db_path = Path(args.db) if args.db else default_db_path(find_project_root())
+    if not db_path.exists():
+        print(f"[ERROR] Database not found: {db_path}")
+        print("[HINT] Run build_wiki.py --sqlite first")
+        return 1
+
+    query = " ".join(args.query)
+    start = time.perf_counter()
+    try:
+        with perf_trace.phase("query"):
+            conn = open_db(db_path, readonly=True)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+                if not row or row[0] != schema_key():
+                    print(f"[ERROR] Database {db_path} was built by another version, rebuild with --sqlite")
+                    return 1
+                results = query_docs(
+                    conn,
+                    query,
+                    args.tag,
+                    max(1, args.limit),
+                    category=args.category,
+                    module=args.module,
+                    status=args.status,
+                    author=args.author,
+                )
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Cannot query {db_path}: {e}")
+        return 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+
+    print_results(results)
+    if results:
+        print()
+    print(f"[OK] {len(results)} match(es) in {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
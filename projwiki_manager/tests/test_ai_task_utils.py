@@ -0,0 +1,98 @@
+"""
+ai_task_utils 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from ai_task_utils import extract_symbol_fingerprints, find_stale_sections  # noqa: E402
+
+SOURCE = """
+/* PWM driver */
+typedef struct {
+    int period;
+    int duty;
+} pwm_config_t;
+
+int pwm_init(pwm_config_t *cfg)
+{
+    if (cfg == 0) {
+        return -1;
+    }
+    return 0;
+}
+
+void pwm_stop(void)
+{
+}
+"""
+
+DOC = """# mod_pwm
+
+<!-- AI_FILL_START:function_table
+Type: function_table
+-->
+| pwm_init | 初始化 |
+<!-- AI_FILL_END:function_table -->
+
+<!-- AI_FILL_START:config_struct
+Type: code_block
+-->
+pwm_config_t
+<!-- AI_FILL_END:config_struct -->
+
+<!-- AI_FILL_START:overview_description
+Type: paragraph
+-->
+TODO
+<!-- AI_FILL_END:overview_description -->
+"""
+
+
+class SymbolFingerprintTest(unittest.TestCase):
+    """符号指纹只随签名与定义变化"""
+
+    def test_symbols(self):
+        prints = extract_symbol_fingerprints(SOURCE)
+        self.assertIn("function:pwm_init", prints)
+        self.assertIn("function:pwm_stop", prints)
+        self.assertFalse(any(k.split(":")[1] in ("if", "return") for k in prints))
+
+    def test_comment_and_body_edits_ignored(self):
+        edited = SOURCE.replace("/* PWM driver */", "// PWM driver v2").replace(
+            "return -1;", "return -2;  /* invalid */"
+        )
+        self.assertEqual(extract_symbol_fingerprints(edited), extract_symbol_fingerprints(SOURCE))
+
+    def test_signature_change(self):
+        old = extract_symbol_fingerprints(SOURCE)
+        changed = SOURCE.replace("*cfg)", "*cfg, int ch)")
+        new = extract_symbol_fingerprints(changed)
+        self.assertEqual([k for k in old if old[k] != new.get(k)], ["function:pwm_init"])
+
+
+class StaleSectionTest(unittest.TestCase):
+    """变化的符号映射到引用它的AI填空区块"""
+
+    def test_mapping(self):
+        stale = find_stale_sections(
+            DOC, ["function:pwm_init", "function:pwm_start", "struct:pwm_config_t", "enum:pwm_mode"]
+        )
+        self.assertEqual(
+            stale,
+            {
+                "function_table": ["function:pwm_init", "function:pwm_start"],
+                "config_struct": ["struct:pwm_config_t"],
+                "": ["enum:pwm_mode"],
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+bench_wiki 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from bench_wiki import (  # noqa: E402
+    SUITE_PHASES,
+    bench_pipeline,
+    compare_baseline,
+    make_synthetic_wiki,
+)
+
+
+def tree_snapshot(root):
+    return {
+        str(p.relative_to(root)): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()
+    }
+
+
+class SyntheticWikiTest(unittest.TestCase):
+    """合成项目可复现, 且修改时间位于racy窗口之外"""
+
+    def test_deterministic_and_backdated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Path(tmp) / "a"
+            b = Path(tmp) / "b"
+            wiki_dir = make_synthetic_wiki(a, 30)
+            make_synthetic_wiki(b, 30)
+            self.assertEqual(tree_snapshot(a), tree_snapshot(b))
+            self.assertEqual(len(list(wiki_dir.rglob("*.md"))), 30)
+            newest = max(p.stat().st_mtime for p in a.rglob("*") if p.is_file())
+            self.assertLess(newest, time.time() - 3000)
+
+    def test_pipeline_phases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            timings = bench_pipeline(Path(tmp), 20, 1)
+        self.assertEqual(set(timings), set(SUITE_PHASES))
+
+
+class BaselineTest(unittest.TestCase):
+    """基线比较: 相对退化与绝对噪声门限同时满足才算退化"""
+
+    def test_compare(self):
+        baseline = {"100": {"scan": 10.0, "html": 100.0}}
+        results = {"100": {"scan": 14.0, "html": 140.0, "new_phase": 1.0}}
+        self.assertEqual(
+            compare_baseline(results, baseline, 0.25, 5.0), [("100", "html", 140.0, 100.0)]
+        )
+        self.assertEqual(compare_baseline(results, baseline, 0.5, 5.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
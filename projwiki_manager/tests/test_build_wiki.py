@@ -0,0 +1,654 @@
+"""
+build_wiki 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import base64
+import contextlib
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+import build_wiki  # noqa: E402
+import perf_trace  # noqa: E402
+from build_wiki import (  # noqa: E402
+    CLIENT_HASH_LEN,
+    MANIFEST_VERSION,
+    AtomicOutput,
+    WikiDoc,
+    assign_shards,
+    build_site,
+    build_tree,
+    discover_wiki_roots,
+    generate_html,
+    load_render_cache,
+    prerender_docs,
+    run_batch,
+    save_render_cache,
+    scan_markdown,
+    scan_wiki,
+    snapshot_wiki,
+    watch_wiki,
+    write_html,
+    write_if_changed,
+    write_shards,
+)
+from search_index import build_search_index  # noqa: E402
+
+# 早于racy窗口的固定修改时间(秒)
+OLD_MTIME = 1_000_000_000
+
+LIST_META_DOC = """---
+title: [API名称]
+category: [api]
+date: [2024-01-01]
+author: [Yarrow, Cai]
+tags: [层级, 模块名]
+status: [draft]
+---
+
+# 接口文档
+
+正文内容
+"""
+
+
+def empty_manifest():
+    return {"version": MANIFEST_VERSION, "docs": {}}
+
+
+def build_args(**kwargs):
+    """build_site使用的命令行参数(默认值与build_wiki.py的参数默认值一致)"""
+    args = dict(
+        prerender=False,
+        shard=False,
+        compress=False,
+        serve=None,
+        reproducible=False,
+        no_cache=False,
+        jobs=1,
+        workers=0,
+        sqlite=None,
+        profile=False,
+        profile_out=None,
+    )
+    args.update(kwargs)
+    return SimpleNamespace(**args)
+
+
+class ManifestTest(unittest.TestCase):
+    """增量构建清单的复用与失效"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wiki_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, text, mtime=OLD_MTIME):
+        path = self.wiki_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def scan(self, manifest):
+        stats = {}
+        docs = scan_wiki(self.wiki_dir, manifest, stats)
+        return docs, stats
+
+    def test_unchanged_reused(self):
+        self.write("a.md", "# Alpha\n")
+        self.write("modules/b.md", "# Bravo\n")
+        manifest = empty_manifest()
+        _, stats = self.scan(manifest)
+        self.assertEqual(stats["new"], 2)
+        docs, stats = self.scan(manifest)
+        self.assertEqual(stats["reused"], 2)
+        self.assertEqual(sorted(d.title for d in docs), ["Alpha", "Bravo"])
+
+    def test_touch_only_reused_by_hash(self):
+        self.write("a.md", "# Alpha\n")
+        manifest = empty_manifest()
+        self.scan(manifest)
+        self.write("a.md", "# Alpha\n", mtime=OLD_MTIME + 60)
+        _, stats = self.scan(manifest)
+        self.assertEqual((stats["reused"], stats["changed"]), (1, 0))
+        self.assertEqual(manifest["docs"]["a.md"]["mtime"], OLD_MTIME + 60)
+
+    def test_changed_and_removed(self):
+        self.write("a.md", "# Alpha\n")
+        self.write("b.md", "# Bravo\n")
+        manifest = empty_manifest()
+        self.scan(manifest)
+        self.write("a.md", "# Alpha 2\n", mtime=OLD_MTIME + 60)
+        (self.wiki_dir / "b.md").unlink()
+        docs, stats = self.scan(manifest)
+        self.assertEqual((stats["changed"], stats["removed"]), (1, 1))
+        self.assertEqual([d.title for d in docs], ["Alpha 2"])
+        self.assertEqual(list(manifest["docs"]), ["a.md"])
+
+    def test_same_stat_rewrite_detected(self):
+        # 刚写入的文件处于racy窗口内, 清单中不记录mtime
+        md = self.wiki_dir / "doc.md"
+        md.write_text("# Alpha\n", encoding="utf-8")
+        st = md.stat()
+        manifest = empty_manifest()
+        self.assertEqual(self.scan(manifest)[0][0].title, "Alpha")
+        self.assertIsNone(manifest["docs"]["doc.md"]["mtime"])
+
+        # 同一时间戳内改写为等长内容: mtime与size均不变
+        md.write_text("# Bravo\n", encoding="utf-8")
+        os.utime(md, ns=(st.st_atime_ns, st.st_mtime_ns))
+        docs, stats = self.scan(manifest)
+        self.assertEqual(docs[0].title, "Bravo")
+        self.assertEqual(stats["changed"], 1)
+
+    def test_old_file_reused_by_stat(self):
+        self.write("doc.md", "# Alpha\n")
+        manifest = empty_manifest()
+        self.scan(manifest)
+        self.assertEqual(manifest["docs"]["doc.md"]["mtime"], OLD_MTIME)
+
+
+class ParallelScanTest(unittest.TestCase):
+    """并发扫描与串行扫描结果一致"""
+
+    def test_jobs_match_serial(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            for i in range(12):
+                sub = wiki_dir / ("modules" if i % 2 else "api") / f"sub{i % 3}"
+                sub.mkdir(parents=True, exist_ok=True)
+                (sub / f"doc_{i}.md").write_text(f"# Doc {i}\n\n## Part\n", encoding="utf-8")
+            serial = scan_wiki(wiki_dir, jobs=1)
+            parallel = scan_wiki(wiki_dir, jobs=4)
+            self.assertEqual(len(serial), 12)
+            self.assertEqual(
+                [(d.path, d.title, d.headings) for d in parallel],
+                [(d.path, d.title, d.headings) for d in serial],
+            )
+
+
+class ShardTest(unittest.TestCase):
+    """分片输出: 分片分配稳定, 只重写内容变化的分片"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wiki_dir = Path(self.tmp.name) / "wiki"
+        self.shard_dir = Path(self.tmp.name) / "site" / "demo_docs"
+        for i in range(70):
+            path = self.wiki_dir / "modules" / f"mod_{i}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# Module {i}\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_assignment_stable(self):
+        docs = scan_wiki(self.wiki_dir)
+        shard_map = assign_shards(docs)
+        self.assertEqual(len(set(shard_map.values())), 3)
+        self.assertEqual(assign_shards(list(reversed(docs))), shard_map)
+
+    def test_only_changed_shard_rewritten(self):
+        docs = scan_wiki(self.wiki_dir)
+        shard_map = assign_shards(docs)
+        self.assertEqual(write_shards(docs, shard_map, self.shard_dir), (3, 3))
+        self.assertEqual(write_shards(docs, shard_map, self.shard_dir), (3, 0))
+
+        (self.wiki_dir / "modules" / "mod_5.md").write_text("# Module five\n", encoding="utf-8")
+        docs = scan_wiki(self.wiki_dir)
+        self.assertEqual(write_shards(docs, shard_map, self.shard_dir), (3, 1))
+
+        stale = self.shard_dir / "chunk_9.js"
+        stale.write_text("", encoding="utf-8")
+        write_shards(docs, shard_map, self.shard_dir)
+        self.assertFalse(stale.exists())
+
+    def test_html_omits_sharded_content(self):
+        docs = scan_wiki(self.wiki_dir)
+        shard_map = assign_shards(docs)
+        html = generate_html(
+            docs, build_tree(docs), "demo", shard_map=shard_map, shard_base="demo_docs/"
+        )
+        self.assertNotIn("# Module 5\\n", html)
+        self.assertIn('"chunk": %d' % shard_map["modules/mod_5.md"], html)
+        self.assertIn("# Module 5\\n", generate_html(docs, build_tree(docs), "demo"))
+
+    def test_shards_keyed_by_content(self):
+        docs = scan_wiki(self.wiki_dir)
+        shard_map = assign_shards(docs)
+        write_shards(docs, shard_map, self.shard_dir)
+        # 只修改时间变化: 分片内容(查看器缓存键)不变, 无需重写
+        os.utime(self.wiki_dir / "modules" / "mod_5.md", (OLD_MTIME, OLD_MTIME))
+        docs = scan_wiki(self.wiki_dir)
+        self.assertEqual(write_shards(docs, shard_map, self.shard_dir), (3, 0))
+
+        chunk = (self.shard_dir / f"chunk_{shard_map['modules/mod_5.md']}.js").read_text(encoding="utf-8")
+        rec = json.loads(chunk[chunk.index(", ") + 2 : chunk.rindex(");")])["modules/mod_5.md"]
+        doc = next(d for d in docs if d.path == "modules/mod_5.md")
+        self.assertEqual(rec["hash"], doc.hash[:CLIENT_HASH_LEN])
+        self.assertEqual(rec["body_offset"], 0)
+        self.assertNotIn("modified", rec)
+        html = generate_html(
+            docs, build_tree(docs), "demo", shard_map=shard_map, shard_base="demo_docs/"
+        )
+        self.assertIn('"hash": "%s"' % rec["hash"], html)
+
+
+class ScanMarkdownTest(unittest.TestCase):
+    """单遍扫描: frontmatter、正文偏移、标题与代码围栏"""
+
+    def test_headings_and_fences(self):
+        content = (
+            "---\ntitle: T\n---\n\n# A\n```\n# no\n~~~\n# no2\n```\n"
+            "## A\n   ### B  \n#nope\n~~~~\n# no3\n~~~\n~~~~\n# C\n"
+        )
+        r = scan_markdown(content)
+        self.assertEqual(r["meta"], {"title": "T"})
+        self.assertEqual(r["title"], "T")
+        self.assertEqual(content[r["body_offset"] :][:4], "# A\n")
+        self.assertEqual(
+            [(h["level"], h["text"], h["anchor"]) for h in r["headings"]],
+            [(1, "A", "a"), (2, "A", "a-1"), (3, "B", "b"), (1, "C", "c")],
+        )
+
+    def test_title_fallback(self):
+        self.assertEqual(scan_markdown("# only\n", "Dflt")["title"], "only")
+        self.assertEqual(scan_markdown("text", "Dflt")["title"], "Dflt")
+        # 结束行位于文件末尾时同样识别frontmatter
+        content = "---\ntags: [a, b]\n---"
+        r = scan_markdown(content)
+        self.assertEqual((r["meta"], r["body_offset"]), ({"tags": ["a", "b"]}, len(content)))
+
+    def test_links(self):
+        content = (
+            "---\ntitle: T\n---\n"
+            "[a](a.md) ![img](i.png)\n"
+            "## See [b](b.md#x)\n"
+            "```\n[in fence](f.md)\n``` [after](c.md)\n"
+            "![alt [d](d.md)](pic.png)\n"
+        )
+        self.assertEqual(
+            scan_markdown(content)["links"],
+            [["a.md", 4], ["b.md#x", 5], ["c.md", 8], ["d.md", 9]],
+        )
+        self.assertEqual(scan_markdown("[x](x.md)")["links"], [["x.md", 1]])
+
+    def test_client_body_offset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            (wiki_dir / "doc.md").write_text(
+                "---\ntitle: 火箭 \U0001F680\n---\n# Body\n", encoding="utf-8"
+            )
+            docs = scan_wiki(wiki_dir)
+        d = docs[0]
+        self.assertEqual(d.body, "# Body\n")
+        # JS字符串按UTF-16码元计数: BMP外字符占两个码元
+        self.assertEqual(d.client_body_offset, d.body_offset + 1)
+        html = generate_html(docs, build_tree(docs), "demo")
+        self.assertIn('"body_offset": %d' % d.client_body_offset, html)
+
+
+class WikiDocTest(unittest.TestCase):
+    """紧凑文档记录: 正文由content与body_offset切片得到"""
+
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            (wiki_dir / "doc.md").write_text(
+                "---\ntitle: Doc\ntags: [a, b]\n---\n\n# Heading\n", encoding="utf-8"
+            )
+            d = scan_wiki(wiki_dir)[0]
+        self.assertIsInstance(d, WikiDoc)
+        self.assertFalse(hasattr(d, "__dict__"))
+        self.assertEqual(d.body, "# Heading\n")
+        self.assertEqual(d.content[d.body_offset :], d.body)
+        self.assertEqual((d.title, d.tags, d.category), ("Doc", ["a", "b"], "root"))
+        self.assertRegex(d.modified, r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$")
+
+
+class TreeTest(unittest.TestCase):
+    """分类树: 各节点的count为该节点下(含子目录)的文档总数"""
+
+    def test_counts(self):
+        paths = (
+            "index.md",
+            "modules/a.md",
+            "modules/hal/b.md",
+            "modules/hal/gpio/c.md",
+            "modules/hal/gpio/d.md",
+        )
+        docs = [
+            SimpleNamespace(
+                path=p,
+                category=p.split("/")[0] if "/" in p else "root",
+                title=p,
+                status="draft",
+                date="",
+            )
+            for p in paths
+        ]
+        tree = build_tree(docs)
+        self.assertEqual(tree["root"]["count"], 1)
+        modules = tree["modules"]
+        self.assertEqual(modules["count"], 4)
+        self.assertEqual([i["path"] for i in modules["items"]], ["modules/a.md"])
+        hal = modules["subdirs"]["hal"]
+        self.assertEqual((hal["count"], hal["subdirs"]["gpio"]["count"]), (3, 2))
+        self.assertEqual(len(hal["subdirs"]["gpio"]["items"]), 2)
+
+
+class ListMetaTest(unittest.TestCase):
+    """frontmatter字段使用数组写法时的构建"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wiki_dir = Path(self.tmp.name) / ".zed" / ".projwiki"
+        (self.wiki_dir / "api").mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_list_meta_normalized(self):
+        (self.wiki_dir / "api" / "list_meta.md").write_text(LIST_META_DOC, encoding="utf-8")
+        docs = scan_wiki(self.wiki_dir)
+        self.assertEqual(len(docs), 1)
+        d = docs[0]
+        self.assertEqual(d.title, "API名称")
+        self.assertEqual(d.category, "api")
+        self.assertEqual(d.date, "2024-01-01")
+        self.assertEqual(d.author, "Yarrow, Cai")
+        self.assertEqual(d.status, "draft")
+        self.assertEqual(d.tags, ["层级", "模块名"])
+
+        index = build_search_index(docs)
+        self.assertIn("api", index["terms"])
+
+    def test_templates_build(self):
+        for tpl in sorted((PKG_DIR / "templates").glob("*.md")):
+            shutil.copy(tpl, self.wiki_dir / "api" / tpl.name)
+        docs = scan_wiki(self.wiki_dir)
+        self.assertTrue(docs)
+        for d in docs:
+            for value in (d.title, d.category, d.date, d.author, d.status):
+                self.assertIsInstance(value, str, d.path)
+        build_search_index(docs)
+
+
+class PrerenderTest(unittest.TestCase):
+    """预渲染按内容哈希复用缓存"""
+
+    def test_cache_reuse(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp) / "wiki"
+            cache_dir = Path(tmp) / "cache"
+            wiki_dir.mkdir()
+            (wiki_dir / "a.md").write_text("# Alpha\n\ntext\n", encoding="utf-8")
+            (wiki_dir / "b.md").write_text("# Bravo\n", encoding="utf-8")
+
+            docs = scan_wiki(wiki_dir)
+            cache, rendered = prerender_docs(docs, load_render_cache(cache_dir))
+            self.assertEqual(rendered, 2)
+            self.assertIn("<p>text</p>", docs[0].html)
+            save_render_cache(cache_dir, cache)
+
+            (wiki_dir / "b.md").write_text("# Bravo 2\n", encoding="utf-8")
+            docs = scan_wiki(wiki_dir)
+            cache, rendered = prerender_docs(docs, load_render_cache(cache_dir))
+            self.assertEqual(rendered, 1)
+            self.assertEqual(len(cache), 2)
+            self.assertIn("Bravo 2", docs[1].html)
+
+
+class CompressTest(unittest.TestCase):
+    """压缩模式嵌入的数据解压后与普通模式一致"""
+
+    def test_payload_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            for i in range(5):
+                (wiki_dir / f"doc_{i}.md").write_text(
+                    f"# Doc {i}\n\n</script> 电机控制 {i}\n", encoding="utf-8"
+                )
+            docs = scan_wiki(wiki_dir)
+            stats = {}
+            html = generate_html(docs, build_tree(docs), "demo", compress=True, stats=stats)
+
+        blobs = re.findall(r'\{"gz": "([A-Za-z0-9+/=]*)"\}', html)
+        self.assertEqual(len(blobs), 2)
+        records = json.loads(gzip.decompress(base64.b64decode(blobs[0])).decode("utf-8"))
+        self.assertEqual([r["path"] for r in records], [f"doc_{i}.md" for i in range(5)])
+        self.assertIn("</script> 电机控制 3", records[3]["content"])
+        index = json.loads(gzip.decompress(base64.b64decode(blobs[1])).decode("utf-8"))
+        self.assertIn("电机", index["terms"])
+        self.assertLess(stats["compressed"], stats["raw"])
+
+
+class StreamHtmlTest(unittest.TestCase):
+    """流式写出HTML: 占位符只在模板中替换, 正文中的同名文本保持原样"""
+
+    def test_placeholders_not_expanded_in_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            (wiki_dir / "doc.md").write_text(
+                "# Doc\n\n__DOC_COUNT__ __PROJECT_NAME__ /*__TREE_DATA__*/ </script>\n",
+                encoding="utf-8",
+            )
+            docs = scan_wiki(wiki_dir)
+        tree = build_tree(docs)
+        buf = io.StringIO()
+        write_html(buf, docs, tree, "demo")
+        html = buf.getvalue()
+        self.assertEqual(html, generate_html(docs, tree, "demo"))
+        self.assertIn("__DOC_COUNT__ __PROJECT_NAME__ /*__TREE_DATA__*/ <\\/script>", html)
+        self.assertNotIn("__BUILD_", html)
+        self.assertEqual(html.count("</script>"), html.count("<script"))
+
+
+class AtomicWriteTest(unittest.TestCase):
+    """内容未变化时不改写输出, 写出失败时不留下临时文件"""
+
+    def test_write_if_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "out.js"
+            self.assertTrue(write_if_changed(path, "a"))
+            os.utime(path, (OLD_MTIME, OLD_MTIME))
+            self.assertFalse(write_if_changed(path, "a"))
+            self.assertEqual(path.stat().st_mtime, OLD_MTIME)
+            self.assertTrue(write_if_changed(path, "b"))
+            self.assertEqual(os.listdir(tmp), ["out.js"])
+
+            with mock.patch("os.replace", side_effect=OSError("boom")):
+                with self.assertRaises(OSError):
+                    write_if_changed(path, "c")
+            self.assertEqual(path.read_text(encoding="utf-8"), "b")
+            self.assertEqual(os.listdir(tmp), ["out.js"])
+
+    def test_atomic_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "out.html"
+            path.write_text("old", encoding="utf-8")
+            with self.assertRaises(RuntimeError):
+                with AtomicOutput(path) as out:
+                    out.write("partial")
+                    raise RuntimeError("boom")
+            self.assertEqual(path.read_text(encoding="utf-8"), "old")
+            self.assertEqual(os.listdir(tmp), ["out.html"])
+
+            output = AtomicOutput(path)
+            with output as out:
+                out.write("old")
+            self.assertFalse(output.changed)
+            output = AtomicOutput(path)
+            with output as out:
+                out.write("new")
+            self.assertTrue(output.changed)
+            self.assertEqual(path.read_text(encoding="utf-8"), "new")
+
+
+class ReproducibleTest(unittest.TestCase):
+    """可复现模式: 输入不变时输出逐字节相同, 只改变修改时间不触发重写"""
+
+    def test_identical_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "demo"
+            wiki_dir = root / ".zed" / ".projwiki"
+            (wiki_dir / "modules").mkdir(parents=True)
+            doc = wiki_dir / "modules" / "a.md"
+            doc.write_text("# Alpha\n\n[b](b.md)\n", encoding="utf-8")
+            (wiki_dir / "modules" / "b.md").write_text("# Bravo\n", encoding="utf-8")
+
+            for shard in (False, True):
+                args = build_args(reproducible=True, shard=shard)
+                outputs = []
+                for mtime in (OLD_MTIME, OLD_MTIME + 3600):
+                    os.utime(doc, (mtime, mtime))
+                    caches = {}
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        out_path = build_site(scan_wiki(wiki_dir), root, args, caches)
+                    site = {
+                        p.relative_to(out_path.parent): p.read_bytes()
+                        for p in out_path.parent.rglob("*")
+                        if p.is_file()
+                    }
+                    outputs.append((site, caches["html_written"]))
+                self.assertEqual(outputs[0][0], outputs[1][0])
+                self.assertFalse(outputs[1][1])
+                html = outputs[0][0][Path("demo.html")].decode("utf-8")
+                self.assertIn("构建版本: ", html)
+                self.assertNotIn("构建时间", html)
+
+
+class BatchTest(unittest.TestCase):
+    """批量模式: 查找项目并在进程池中构建"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        # build/ 与隐藏目录下的项目不参与批量构建
+        for rel in ("app", "libs/core", "libs/core/sub", "build/gen", ".hidden/x"):
+            wiki_dir = self.base / rel / ".zed" / ".projwiki"
+            wiki_dir.mkdir(parents=True)
+            (wiki_dir / "index.md").write_text(f"# {rel}\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover(self):
+        roots = [str(p.relative_to(self.base)) for p in discover_wiki_roots(self.base)]
+        self.assertEqual(roots, ["app", "libs/core", "libs/core/sub"])
+
+    def test_run_batch(self):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            code = run_batch(self.base, build_args(workers=2))
+        self.assertEqual(code, 0)
+        self.assertIn("[BATCH] 3/3 project(s) built", log.getvalue())
+        for rel in ("app", "libs/core", "libs/core/sub"):
+            name = rel.rsplit("/", 1)[-1]
+            site = self.base / rel / ".zed" / ".projwiki" / "_site" / f"{name}.html"
+            self.assertTrue(site.is_file(), rel)
+
+    def test_profile(self):
+        # 工作进程各自剖析, 结果附加到主进程的剖析汇总
+        prof = perf_trace.Profiler("test", track_memory=False)
+        perf_trace._profiler = prof
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_batch(self.base, build_args(workers=2, profile=True))
+        finally:
+            perf_trace._profiler = None
+            tracemalloc.stop()
+        reports = prof.to_dict()["reports"]
+        roots = [os.path.relpath(r["script"], self.base) for r in reports]
+        self.assertEqual(roots, ["app", "libs/core", "libs/core/sub"])
+        for r in reports:
+            self.assertIn("scan", [p["name"] for p in r["phases"]])
+
+
+class WatchTest(unittest.TestCase):
+    """监视模式: 快照比较与增量重建"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "demo"
+        self.wiki_dir = self.root / ".zed" / ".projwiki"
+        (self.wiki_dir / "modules").mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_skips_outputs(self):
+        (self.wiki_dir / "modules" / "a.md").write_text("# A\n", encoding="utf-8")
+        for skipped in ("_site", ".build_cache", ".ai_tasks"):
+            (self.wiki_dir / skipped).mkdir()
+            (self.wiki_dir / skipped / "x.md").write_text("x", encoding="utf-8")
+        snap = snapshot_wiki(self.wiki_dir)
+        self.assertEqual(list(snap), ["modules/a.md"])
+
+    def run_watch(self, args, text):
+        """首次构建后启动监视, 将a.md改写为text, 等一次重建完成后停止
+
+        @retval  (输出HTML路径, 清单, 监视日志, on_rebuild收到的事件列表)
+        """
+        doc = self.wiki_dir / "modules" / "a.md"
+        doc.write_text("# Alpha\n\nold body\n", encoding="utf-8")
+        manifest = empty_manifest()
+        docs = scan_wiki(self.wiki_dir, manifest)
+        caches = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            out_path = build_site(docs, self.root, args, caches)
+
+        # 用脚本化的sleep驱动轮询: 第1次轮询前修改文档, 第3次轮询时结束监视
+        polls = []
+        events = []
+
+        def fake_sleep(_):
+            polls.append(None)
+            if len(polls) == 1:
+                doc.write_text(text, encoding="utf-8")
+            elif len(polls) == 3:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(build_wiki.time, "sleep", fake_sleep):
+            with contextlib.redirect_stdout(io.StringIO()) as log:
+                watch_wiki(self.root, args, docs, manifest, caches, 0, 0, events.append)
+        return out_path, manifest, log.getvalue(), events
+
+    def test_rebuild_on_change(self):
+        out_path, manifest, log, events = self.run_watch(build_args(), "# Alpha changed\n")
+        self.assertIn("1 changed, 0 removed", log)
+        self.assertIn("Alpha changed", out_path.read_text(encoding="utf-8"))
+        self.assertEqual(manifest["docs"]["modules/a.md"]["title"], "Alpha changed")
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0]["reload"])
+
+    def test_body_change_reloads_chunk_only(self):
+        args = build_args(shard=True)
+        _, _, _, events = self.run_watch(args, "# Alpha\n\nnew body text\n")
+        self.assertEqual(events[0]["changed"], ["modules/a.md"])
+        self.assertFalse(events[0]["reload"])
+        self.assertEqual(events[0]["chunks"], [0])
+
+        _, _, _, events = self.run_watch(args, "# Alpha renamed\n\nold body\n")
+        self.assertTrue(events[0]["reload"])
+
+
+if __name__ == "__main__":
+    unittest.main()
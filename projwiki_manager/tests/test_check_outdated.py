@@ -0,0 +1,131 @@
+"""
+check_outdated 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from check_outdated import check_freshness, get_source_mtime, load_baselines  # noqa: E402
+
+DOC_MTIME = 1_000_000_000
+
+
+class FreshnessTest(unittest.TestCase):
+    """按修改时间比较模块文档与源文件"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.wiki_dir = self.root / ".zed" / ".projwiki"
+        for name in ("mod_pwm", "mod_adc", "mod_gone"):
+            self.write(f".zed/.projwiki/modules/{name}.md", f"# {name}\n", DOC_MTIME)
+        self.write("src/mod_pwm.c", "int pwm;\n", DOC_MTIME - 60)
+        self.write("src/mod_adc.c", "int adc;\n", DOC_MTIME - 60)
+        self.write("src/inc/mod_adc.h", "int adc;\n", DOC_MTIME + 60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, text, mtime):
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    def statuses(self, **kwargs):
+        rows = check_freshness(self.root, self.wiki_dir, **kwargs)
+        return {row["module"]: row["status"] for row in rows}
+
+    def test_status(self):
+        self.assertEqual(
+            self.statuses(),
+            {"mod_pwm": "Fresh", "mod_adc": "OUTDATED", "mod_gone": "Missing Src"},
+        )
+
+    def test_source_mtime(self):
+        mtime, files = get_source_mtime(self.root, "mod_adc")
+        self.assertEqual(mtime, DOC_MTIME + 60)
+        self.assertEqual(sorted(files), ["src/inc/mod_adc.h", "src/mod_adc.c"])
+        self.assertEqual(get_source_mtime(self.root, "mod_gone"), (0, []))
+
+    def test_hash_baseline(self):
+        stats = {}
+        self.assertEqual(self.statuses(use_hash=True, stats=stats)["mod_pwm"], "Fresh")
+        # 没有基线时按修改时间判断, 只有Fresh的模块记录基线
+        self.assertEqual(stats["recorded"], 1)
+        self.assertEqual(self.statuses(use_hash=True)["mod_adc"], "OUTDATED")
+
+        # 只改写修改时间(checkout、克隆): 内容与基线一致, 不误报
+        self.write("src/mod_pwm.c", "int pwm;\n", DOC_MTIME + 60)
+        self.assertEqual(self.statuses()["mod_pwm"], "OUTDATED")
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "Fresh")
+
+        self.write("src/mod_pwm.c", "int pwm2;\n", DOC_MTIME + 60)
+        rows = check_freshness(self.root, self.wiki_dir, use_hash=True)
+        row = next(r for r in rows if r["module"] == "mod_pwm")
+        self.assertEqual((row["status"], row["changed"]), ("OUTDATED", ["src/mod_pwm.c"]))
+
+        # 文档更新后按修改时间判断并重新记录基线
+        self.write(".zed/.projwiki/modules/mod_pwm.md", "# mod_pwm v2\n", DOC_MTIME + 120)
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "Fresh")
+        self.write(".zed/.projwiki/modules/mod_pwm.md", "# mod_pwm v2\n", DOC_MTIME)
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "Fresh")
+
+    def test_record(self):
+        stats = {}
+        statuses = self.statuses(record={"mod_adc"}, stats=stats)
+        self.assertEqual(statuses["mod_adc"], "Fresh")
+        self.assertEqual(stats["recorded"], 2)
+        self.assertEqual(self.statuses(use_hash=True)["mod_adc"], "Fresh")
+
+    def test_symbols(self):
+        self.write("src/mod_pwm.c", "int pwm_init(void)\n{\n    return 0;\n}\n", DOC_MTIME - 60)
+        self.statuses(use_hash=True)
+
+        # 只改函数体: 源文件内容变化, 但没有受影响的区块
+        self.write("src/mod_pwm.c", "int pwm_init(void)\n{\n    return 1;\n}\n", DOC_MTIME + 60)
+        stats = {}
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "OUTDATED")
+        self.assertEqual(self.statuses(use_symbols=True, stats=stats)["mod_pwm"], "Fresh")
+        self.assertEqual(stats["unaffected"], 1)
+        # 基线随之更新: 之后按哈希比较也是Fresh
+        self.assertEqual(stats["recorded"], 1)
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "Fresh")
+
+        self.write("src/mod_pwm.c", "int pwm_init(int ch)\n{\n    return 1;\n}\n", DOC_MTIME + 60)
+        rows = check_freshness(self.root, self.wiki_dir, use_symbols=True)
+        row = next(r for r in rows if r["module"] == "mod_pwm")
+        self.assertEqual(row["status"], "OUTDATED")
+        self.assertEqual(row["symbols"], ["function:pwm_init"])
+        self.assertEqual(row["sections"], {"": ["function:pwm_init"]})
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_baseline_mode(self):
+        git = ["git", "-C", str(self.root), "-c", "user.name=t", "-c", "user.email=t@t"]
+        for cmd in (["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "init"]):
+            subprocess.run(git + cmd, check=True, stdout=subprocess.DEVNULL)
+        self.statuses(use_hash=True)
+        self.assertEqual(load_baselines(self.wiki_dir)["mod_pwm"]["mode"], "file")
+
+        # 文件模式的基线不用于git模式: 源码内容变化但修改时间较旧时按修改时间判断
+        self.write("src/mod_pwm.c", "int pwm2;\n", DOC_MTIME - 60)
+        self.assertEqual(self.statuses(use_hash=True)["mod_pwm"], "OUTDATED")
+        stats = {}
+        self.assertEqual(self.statuses(use_hash=True, use_git=True, stats=stats)["mod_pwm"], "Fresh")
+        self.assertTrue(stats["git"])
+        self.assertEqual(load_baselines(self.wiki_dir)["mod_pwm"]["mode"], "git")
+        self.assertEqual(self.statuses(use_hash=True, use_git=True)["mod_pwm"], "Fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
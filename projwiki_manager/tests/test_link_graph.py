@@ -0,0 +1,71 @@
+"""
+link_graph 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from build_wiki import scan_wiki  # noqa: E402
+from link_graph import build_link_graph, resolve_link  # noqa: E402
+
+DOCS = {
+    "index.md": (
+        "---\ntitle: Home\n---\n"
+        "# Home\n\n"
+        "[PWM](modules/pwm.md) and [init](modules/pwm.md#init)\n"
+        "[gone](modules/gone.md) [bad anchor](modules/pwm.md#nope)\n"
+        "```\n[in fence](modules/fenced.md)\n```\n"
+        "![img](modules/pic.md) [web](https://example.com/a.md)\n"
+    ),
+    "modules/pwm.md": "# PWM\n\n## Init\n\n[home](../index.md) [self](#init) [up](../../out.md)\n",
+}
+
+
+class ResolveLinkTest(unittest.TestCase):
+    """链接目标解析(须与查看器中的resolveLink()一致)"""
+
+    def test_resolve(self):
+        self.assertEqual(resolve_link("a/b.md", "c.md#x"), ("a/c.md", "x"))
+        self.assertEqual(resolve_link("a/b.md", "../c.md"), ("c.md", ""))
+        self.assertEqual(resolve_link("a/b.md", "/d/e.md"), ("d/e.md", ""))
+        self.assertEqual(resolve_link("a/b.md", "#%E6%A6%82%E8%BF%B0"), ("a/b.md", "概述"))
+        self.assertEqual(resolve_link("a/b.md", "sp%20ace.md"), ("a/sp ace.md", ""))
+        self.assertIsNone(resolve_link("a/b.md", "../../c.md"))
+        self.assertIsNone(resolve_link("a/b.md", "mailto:x@y"))
+        self.assertIsNone(resolve_link("a/b.md", "//host/c.md"))
+        self.assertIsNone(resolve_link("a/b.md", "pic.png"))
+
+
+class LinkGraphTest(unittest.TestCase):
+    """反向链接与失效链接(代码围栏内的链接与图片不计)"""
+
+    def test_graph(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wiki_dir = Path(tmp)
+            for rel, text in DOCS.items():
+                path = wiki_dir / rel
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(text, encoding="utf-8")
+            docs = scan_wiki(wiki_dir)
+
+        self.assertEqual([d.path for d in docs], ["index.md", "modules/pwm.md"])
+        backlinks, broken = build_link_graph(docs)
+        self.assertEqual(backlinks, [[1], [0]])
+        self.assertEqual(
+            broken,
+            [
+                ("index.md", 7, "modules/gone.md", "missing doc"),
+                ("index.md", 7, "modules/pwm.md#nope", "missing anchor"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
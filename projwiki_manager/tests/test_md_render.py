@@ -0,0 +1,44 @@
+"""
+md_render 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from md_render import render_markdown  # noqa: E402
+
+
+class RenderTest(unittest.TestCase):
+    """构建时渲染结果(与查看器renderMarkdown()的输出一致)"""
+
+    def test_blocks(self):
+        html = render_markdown("# Title\n\nText **b** and `c`\n\n- a\n- b\n")
+        self.assertIn('<h1 id="title">Title</h1>', html)
+        self.assertIn("<p>Text <strong>b</strong> and <code>c</code></p>", html)
+        self.assertIn("<ul><li>a</li><li>b</li></ul>", html)
+
+    def test_code_escaped(self):
+        html = render_markdown("```c\nint <x>;\n# not a heading\n```\n")
+        self.assertIn('<span class="plbl">c</span><code>int &lt;x&gt;;', html)
+        self.assertNotIn("<h1", html)
+
+    def test_table(self):
+        html = render_markdown("| h | k |\n|---|---|\n| 1 | 2 |\n")
+        self.assertIn("<thead><tr><th>h</th><th>k</th></tr></thead>", html)
+        self.assertIn("<tbody><tr><td>1</td><td>2</td></tr></tbody>", html)
+
+    def test_fences_and_duplicate_anchors(self):
+        html = render_markdown("# A\n\n~~~~\n```\n# no\n~~~~\n\n## A\n")
+        self.assertIn('<h1 id="a">A</h1>', html)
+        self.assertIn('<h2 id="a-1">A</h2>', html)
+        self.assertIn("<code>```\n# no</code>", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
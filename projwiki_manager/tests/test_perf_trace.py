@@ -0,0 +1,68 @@
+"""
+perf_trace 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+import perf_trace  # noqa: E402
+
+
+class ProfilerTest(unittest.TestCase):
+    """阶段统计: 嵌套、累计与未启用时的空操作"""
+
+    def tearDown(self):
+        perf_trace._profiler = None
+        tracemalloc.stop()
+
+    def test_disabled_is_noop(self):
+        self.assertFalse(perf_trace.enabled())
+        with perf_trace.phase("scan"):
+            perf_trace.count(files=1, read=10)
+        self.assertIsNone(perf_trace._profiler)
+
+    def test_nested_phases(self):
+        prof = perf_trace.Profiler("test", track_memory=False)
+        perf_trace._profiler = prof
+        for _ in range(2):
+            with perf_trace.phase("build"):
+                perf_trace.count(files=1)
+                with perf_trace.phase("scan"):
+                    perf_trace.count(files=2, read=100)
+                    perf_trace.count(written=7)
+        phases = {p["name"]: p for p in prof.to_dict()["phases"]}
+        self.assertEqual((phases["build"]["depth"], phases["scan"]["depth"]), (0, 1))
+        self.assertEqual((phases["build"]["calls"], phases["build"]["files"]), (2, 2))
+        scan = phases["scan"]
+        self.assertEqual((scan["files"], scan["bytes_read"], scan["bytes_written"]), (4, 200, 14))
+
+    def test_trace_file(self):
+        args = SimpleNamespace(profile=True, profile_out=None, profile_cprofile=None)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "trace.json"
+            perf_trace.start_profiling(args, "test")
+            with perf_trace.phase("html"):
+                sum(range(1000))
+            with contextlib.redirect_stdout(io.StringIO()) as log:
+                perf_trace.finish_profiling(out)
+            data = json.loads(out.read_text(encoding="utf-8"))
+        self.assertIn("[PROFILE] test", log.getvalue())
+        self.assertEqual([p["name"] for p in data["phases"]], ["html"])
+        self.assertIsInstance(data["peak_bytes"], int)
+        self.assertFalse(perf_trace.enabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
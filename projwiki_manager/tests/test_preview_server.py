@@ -0,0 +1,93 @@
+"""
+preview_server 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import http.client
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from preview_server import LIVERELOAD_PATH, LiveReload, start_preview_server  # noqa: E402
+
+
+class LiveReloadTest(unittest.TestCase):
+    """连接落后时的事件补发"""
+
+    def test_missed_events_replayed(self):
+        lr = LiveReload(log_size=3)
+        self.assertEqual(lr.wait(0, 0), (0, []))
+        lr.publish({"chunks": [1]})
+        lr.publish({"chunks": [2]})
+        self.assertEqual(lr.wait(0, 0), (2, [{"chunks": [1]}, {"chunks": [2]}]))
+        self.assertEqual(lr.wait(1, 0), (2, [{"chunks": [2]}]))
+        self.assertEqual(lr.wait(2, 0), (2, []))
+
+    def test_gap_beyond_log_reloads(self):
+        lr = LiveReload(log_size=3)
+        for i in range(5):
+            lr.publish({"chunks": [i]})
+        self.assertEqual(lr.wait(1, 0), (5, [{"reload": True}]))
+        self.assertEqual(lr.wait(2, 0), (5, [{"chunks": [2]}, {"chunks": [3]}, {"chunks": [4]}]))
+
+
+class PreviewServerTest(unittest.TestCase):
+    """ETag协商缓存与实时刷新事件流"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site = Path(self.tmp.name)
+        (self.site / "chunk_0.js").write_text("__pwChunk(0, {});\n", encoding="utf-8")
+        self.server, self.livereload = start_preview_server(self.site, 0)
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def get(self, path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            resp = conn.getresponse()
+            return resp.status, dict(resp.getheaders()), resp.read()
+        finally:
+            conn.close()
+
+    def test_etag_revalidation(self):
+        status, headers, body = self.get("/chunk_0.js")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+        etag = headers["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        status, _, body = self.get("/chunk_0.js", {"If-None-Match": etag})
+        self.assertEqual((status, body), (304, b""))
+
+        (self.site / "chunk_0.js").write_text("__pwChunk(0, {\"a\": 1});\n", encoding="utf-8")
+        status, headers, _ = self.get("/chunk_0.js", {"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+
+    def test_event_stream(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            conn.request("GET", LIVERELOAD_PATH)
+            resp = conn.getresponse()
+            self.assertEqual(resp.getheader("Content-Type"), "text/event-stream; charset=utf-8")
+            self.assertEqual(resp.fp.readline(), b"retry: 1000\n")
+            resp.fp.readline()
+            self.livereload.publish({"build": 1, "chunks": [0]})
+            self.assertEqual(resp.fp.readline(), b'data: {"build": 1, "chunks": [0]}\n')
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+search_index 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from search_index import FIELD_TAGS, FIELD_TITLE, build_search_index, tokenize  # noqa: E402
+
+
+def make_doc(title, body, tags=(), front="", hash=None):
+    """与WikiDoc字段相同的文档记录"""
+    return SimpleNamespace(
+        title=title,
+        tags=list(tags),
+        content=front + body,
+        body_offset=len(front),
+        client_body_offset=utf16_len(front),
+        body=body,
+        hash=hash,
+    )
+
+
+def utf16_len(text):
+    """JS中的字符串长度(UTF-16码元数)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def postings(index, term):
+    """按文档下标展开倒排记录: {doc: (tf, offset, fields)}"""
+    flat = index["terms"].get(term, [])
+    return {flat[i]: tuple(flat[i + 1 : i + 4]) for i in range(0, len(flat), 4)}
+
+
+class TokenizeTest(unittest.TestCase):
+    """分词规则(须与查看器中的tokenize()一致)"""
+
+    def test_identifier_parts(self):
+        terms = [t for t, _ in tokenize("Call mod_pwm_init now")]
+        self.assertEqual(terms, ["call", "mod_pwm_init", "mod", "pwm", "init", "now"])
+
+    def test_cjk_bigrams(self):
+        self.assertEqual(list(tokenize("电机控制")), [("电机", 0), ("机控", 1), ("控制", 2)])
+        self.assertEqual(list(tokenize("a 电")), [("电", 2)])
+
+
+class BuildIndexTest(unittest.TestCase):
+    """倒排索引的词频、首次出现偏移与字段标记"""
+
+    def test_postings(self):
+        front = "---\ntitle: PWM\n---\n"
+        docs = [
+            make_doc("PWM driver", "# PWM\n\npwm init, pwm stop\n", tags=["motor"], front=front),
+            make_doc("Motor", "电机控制\n"),
+        ]
+        index = build_search_index(docs)
+        self.assertEqual(index["n"], 2)
+
+        pwm = postings(index, "pwm")
+        tf, off, fields = pwm[0]
+        self.assertEqual(tf, 3)
+        self.assertEqual(docs[0].content[off : off + 3], "PWM")
+        self.assertEqual(fields, FIELD_TITLE)
+
+        motor = postings(index, "motor")
+        self.assertEqual(motor[0], (0, -1, FIELD_TAGS))
+        self.assertEqual(motor[1], (0, -1, FIELD_TITLE))
+
+        self.assertEqual(postings(index, "控制")[1], (1, 2, 0))
+        self.assertEqual(list(index["terms"]), sorted(index["terms"]))
+
+    def test_offsets_in_utf16_units(self):
+        # frontmatter与正文中的BMP外字符在JS字符串中各占两个码元
+        front = "---\ntitle: 🚀 Launch\n---\n"
+        body = "# Launch 🚀🚀\n\n启动 pwm_init 完成\n"
+        doc = make_doc("Launch", body, front=front)
+        index = build_search_index([doc])
+        content16 = doc.content.encode("utf-16-le")
+        for term, text in (
+            ("launch", "Launch"),
+            ("启动", "启动"),
+            ("pwm_init", "pwm_init"),
+            ("init", "init"),
+        ):
+            off = postings(index, term)[0][1]
+            self.assertEqual(content16[off * 2 : (off + len(text)) * 2].decode("utf-16-le"), text, term)
+
+
+class TermCacheTest(unittest.TestCase):
+    """分词结果按内容哈希复用(监视模式下的连续构建)"""
+
+    def test_cache_reuse(self):
+        a = make_doc("Alpha", "alpha text\n", hash="h1")
+        b = make_doc("Bravo", "bravo text\n", hash="h2")
+        cache = {}
+        first = build_search_index([a, b], cache)
+        self.assertEqual(set(cache), {"h1", "h2"})
+
+        # 命中缓存的文档不再分词: 缓存中的结果直接进入索引
+        cache["h1"]["cached"] = [1, 0, 0]
+        c = make_doc("Charlie", "charlie\n", hash="h3")
+        second = build_search_index([a, c], cache)
+        self.assertIn("cached", second["terms"])
+        self.assertNotIn("bravo", second["terms"])
+        self.assertEqual(set(cache), {"h1", "h3"})
+        self.assertEqual(first["terms"]["alpha"], second["terms"]["alpha"])
+
+
+if __name__ == "__main__":
+    unittest.main()
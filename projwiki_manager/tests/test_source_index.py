@@ -0,0 +1,180 @@
+"""
+source_index 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from source_index import (  # noqa: E402
+    blob_hash,
+    get_source_index,
+    git_source_index,
+    hash_sources,
+    iter_sources,
+    refresh_source_index,
+)
+
+# 早于racy窗口的固定修改时间(秒)
+OLD_MTIME = 1_000_000_000
+
+
+class SourceIndexTest(unittest.TestCase):
+    """按目录修改时间增量刷新源码索引"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel in ("src/mod_pwm.c", "src/mod_pwm.h", "src/hal/gpio.c", "build/gen.c", "README.md"):
+            self.write(rel)
+        self.backdate()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, text="int x;\n"):
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def backdate(self):
+        for d in (self.root, self.root / "src", self.root / "src" / "hal"):
+            os.utime(d, (OLD_MTIME, OLD_MTIME))
+
+    def sources(self, index):
+        return sorted((path, stem) for path, stem, _, _ in iter_sources(index))
+
+    def test_collect(self):
+        index, stats = get_source_index(self.root)
+        self.assertEqual(
+            self.sources(index),
+            [("src/hal/gpio.c", "gpio"), ("src/mod_pwm.c", "mod_pwm"), ("src/mod_pwm.h", "mod_pwm")],
+        )
+        self.assertEqual((stats["listed"], stats["changed"]), (3, 3))
+        self.assertTrue((self.root / ".zed" / ".projwiki" / ".build_cache" / "source_index.json").is_file())
+
+    def test_unchanged_dirs_reused(self):
+        get_source_index(self.root)
+        # .zed目录在首次运行时创建, 根目录的修改时间随之变化
+        self.backdate()
+        get_source_index(self.root)
+        _, stats = get_source_index(self.root)
+        self.assertEqual((stats["listed"], stats["changed"]), (0, 0))
+
+    def test_added_and_removed(self):
+        get_source_index(self.root)
+        self.backdate()
+        get_source_index(self.root)
+        self.write("src/hal/uart.c")
+        (self.root / "src" / "mod_pwm.h").unlink()
+        index, stats = get_source_index(self.root)
+        self.assertEqual(stats["changed"], 2)
+        self.assertIn(("src/hal/uart.c", "uart"), self.sources(index))
+        self.assertNotIn(("src/mod_pwm.h", "mod_pwm"), self.sources(index))
+
+    def test_recent_dir_relisted(self):
+        # 目录修改时间处于racy窗口内: 即使与记录一致也重新列举
+        os.utime(self.root / "src", None)
+        get_source_index(self.root)
+        _, stats = get_source_index(self.root)
+        self.assertGreaterEqual(stats["listed"], 1)
+
+
+class HashSourcesTest(unittest.TestCase):
+    """源文件内容哈希: 与git blob ID一致, 未变化的文件复用缓存"""
+
+    def test_blob_hash(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.c"
+            path.write_bytes(b"hello\n")
+            # git hash-object 的结果
+            self.assertEqual(blob_hash(path), "ce013625030ba8dba906f756967f9e9ca394464a")
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for name in ("a.c", "b.h"):
+                (root / name).write_text(name, encoding="utf-8")
+                os.utime(root / name, (OLD_MTIME, OLD_MTIME))
+            index, _ = get_source_index(root, persist=False)
+            hashes, hashed = hash_sources(root, index, ["a.c", "b.h", "gone.c"], jobs=2)
+            self.assertEqual((sorted(hashes), hashed), (["a.c", "b.h"], 2))
+            self.assertEqual(hash_sources(root, index, ["a.c", "b.h"])[1], 0)
+
+            (root / "a.c").write_text("changed", encoding="utf-8")
+            os.utime(root / "a.c", (OLD_MTIME + 60, OLD_MTIME + 60))
+            refresh_source_index(root, index)
+            new, hashed = hash_sources(root, index, ["a.c", "b.h"])
+            self.assertEqual(hashed, 1)
+            self.assertNotEqual(new["a.c"], hashes["a.c"])
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class GitSourceIndexTest(unittest.TestCase):
+    """由本地git仓库的索引获取源文件列表与内容哈希"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel in ("src/a.c", "src/b.h", "src/gone.c", "build/gen.c"):
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(rel + "\n", encoding="utf-8")
+        (self.root / ".gitignore").write_text("*.tmp.c\n", encoding="utf-8")
+        self.git("init", "-q")
+        self.git("add", "-A")
+        self.git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", "-C", str(self.root), *args], check=True, stdout=subprocess.DEVNULL)
+
+    def test_worktree_state(self):
+        (self.root / "src" / "a.c").write_text("changed\n", encoding="utf-8")
+        (self.root / "src" / "gone.c").unlink()
+        (self.root / "src" / "new.c").write_text("new\n", encoding="utf-8")
+        (self.root / "src" / "x.tmp.c").write_text("ignored\n", encoding="utf-8")
+
+        index = git_source_index(self.root)
+        self.assertEqual(sorted(index["files"]), ["src/a.c", "src/b.h", "src/new.c"])
+        hashes, hashed = hash_sources(self.root, index, sorted(index["files"]))
+        # 只有已修改与未跟踪的文件从磁盘计算
+        self.assertEqual(hashed, 2)
+        for rel, digest in hashes.items():
+            self.assertEqual(digest, blob_hash(self.root / rel), rel)
+
+        # 子目录作为根目录时路径相对于该目录
+        sub = git_source_index(self.root / "src", with_hashes=False)
+        self.assertEqual(sorted(sub["files"]), ["a.c", "b.h", "gone.c", "new.c"])
+
+    def test_worktree_hash_filtered(self):
+        # git模式下工作区文件的哈希与git add一致(经过换行符转换), 不是原始内容的哈希
+        self.git("config", "core.autocrlf", "true")
+        (self.root / "src" / "crlf.c").write_bytes(b"int x;\r\n")
+        index = git_source_index(self.root)
+        hashes, _ = hash_sources(self.root, index, ["src/crlf.c"])
+        (self.root / "lf.c").write_bytes(b"int x;\n")
+        self.assertEqual(hashes["src/crlf.c"], blob_hash(self.root / "lf.c"))
+        self.assertNotEqual(hashes["src/crlf.c"], blob_hash(self.root / "src" / "crlf.c"))
+
+    def test_fallback(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(git_source_index(tmp))
+            index, stats = get_source_index(tmp, persist=False, use_git=True)
+        self.assertFalse(stats["git"])
+        self.assertEqual(index["files"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+viewer_template 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import json
+import re
+import shutil
+import subprocess
+import unittest
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+TEMPLATE = (PKG_DIR / "scripts" / "viewer_template.html").read_text(encoding="utf-8")
+
+
+def template_function(name):
+    """取出模板中某个函数的源码(函数体以与function同缩进的右花括号结束)"""
+    m = re.search(r"^( *)function\*? %s\(.*?^\1\}$" % name, TEMPLATE, re.M | re.S)
+    return m.group(0)
+
+
+# 单文件模式下的查看器搜索状态, 浏览器对象只保留用到的部分
+SEARCH_HARNESS = """
+const window = globalThis;
+const CONFIG = { searchIndex: '' };
+const SEARCH_LIMIT = 100, SEARCH_BATCH = 20;
+let SEARCH_INDEX = { n: 1, terms: {} };
+let searchIndexLoad = null, searchReady = null, localIndex = null;
+let searchWorker = null, searchSeq = 0, searchQuery = '';
+let searchIndexVersion = 0;
+const log = { scripts: 0, posted: [] };
+const panel = { innerHTML: '', classList: { add() {} } };
+const document = {
+  getElementById: () => panel,
+  createElement: () => { log.scripts++; return {}; },
+  head: { appendChild() {} },
+};
+const URL = { createObjectURL: () => 'blob:' };
+class Blob {}
+class Worker {
+  constructor() { Worker.last = this; }
+  postMessage(m) { log.posted.push(m.type); }
+  terminate() {}
+}
+console.warn = () => {};
+const versionQuery = () => '';
+const decodePayload = p => Promise.resolve(p);
+const prepareIndex = raw => raw;
+const tokenize = () => {}, lookupTerm = () => {}, rankDocs = () => {}, searchWorkerMain = () => {};
+const runSearchJob = () => {};
+const showSearchResults = () => {};
+const tick = () => new Promise(r => setTimeout(r, 0));
+%s
+(async () => {
+  searchWorker = createSearchWorker();
+  const w = Worker.last;
+  startSearch('pwm');
+  await tick();
+  // Worker已持有索引, 页面释放内联副本后Worker崩溃
+  w.onmessage({ data: { type: 'ready' } });
+  w.onerror({ preventDefault() {} });
+  await tick();
+  log.released = SEARCH_INDEX === null;
+  log.panel = panel.innerHTML;
+  process.stdout.write(JSON.stringify(log));
+})();
+"""
+
+
+class SearchWorkerTest(unittest.TestCase):
+    """搜索Worker由模板中的函数源码拼接而成, 列出的函数必须都存在于模板中"""
+
+    def test_worker_functions_defined(self):
+        m = re.search(r"const src = \[([^\]]+)\]\s*\.map\(f => f\.toString\(\)\)", TEMPLATE)
+        self.assertIsNotNone(m)
+        names = [n.strip() for n in m.group(1).split(",")]
+        self.assertIn("searchWorkerMain", names)
+        for name in names:
+            self.assertRegex(TEMPLATE, r"\bfunction\*? %s\(" % name)
+
+    @unittest.skipUnless(shutil.which("node"), "node is not installed")
+    def test_crash_after_ready(self):
+        # 单文件模式下Worker就绪后崩溃: 不能把页面本身当作search_index.js加载, 在结果面板报告错误
+        names = (
+            "loadSearchIndex",
+            "ensureSearchIndex",
+            "createSearchWorker",
+            "dropSearchWorker",
+            "startSearch",
+            "onSearchBatch",
+            "showSearchError",
+        )
+        script = SEARCH_HARNESS % "\n".join(template_function(n) for n in names)
+        out = subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True).stdout
+        log = json.loads(out)
+        self.assertEqual(log["posted"], ["index", "query"])
+        self.assertTrue(log["released"])
+        self.assertEqual(log["scripts"], 0)
+        self.assertIn("搜索不可用", log["panel"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+wiki_db 回归测试
+
+运行: python -m pytest -q projwiki_manager/tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR / "scripts"))
+
+from build_wiki import scan_wiki  # noqa: E402
+from wiki_db import export_sqlite, open_db  # noqa: E402
+from wiki_query import match_expr, query_docs  # noqa: E402
+
+QUERY_DOCS = {
+    "modules/mod_pwm.md": (
+        "---\ntitle: PWM驱动\ntags: [驱动, 定时器]\nstatus: draft\n---\n"
+        "# PWM驱动\n\n调用 mod_pwm_init 配置电机输出\n"
+    ),
+    "modules/mod_adc.md": (
+        "---\ntitle: ADC采样\ntags: [驱动]\nstatus: approved\n---\n"
+        "# ADC采样\n\n采样结果用于电机电流保护\n"
+    ),
+    "index.md": "# 首页\n\n项目概览\n",
+}
+
+
+class ExportListMetaTest(unittest.TestCase):
+    """export_sqlite对数组形式元数据的处理"""
+
+    def test_list_meta_export(self):
+        # 不经过WikiDoc, 直接传入列表值, 验证导出本身的容错
+        body = "# 接口文档\n\n正文内容\n"
+        doc = SimpleNamespace(
+            path="api/list_meta.md",
+            title=["API名称"],
+            category=["api"],
+            date=["2024-01-01"],
+            author=["Yarrow", "Cai"],
+            status=["draft"],
+            tags=["层级"],
+            hash="h1",
+            mtime=0.0,
+            body=body,
+            meta={"module": ["demo"]},
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "wiki.db"
+            stats = export_sqlite([doc], db_path)
+            self.assertEqual(stats["added"], 1)
+            conn = open_db(db_path, readonly=True)
+            try:
+                row = conn.execute(
+                    "SELECT title, category, module, status, author, date FROM docs"
+                ).fetchone()
+            finally:
+                conn.close()
+        self.assertEqual(row, ("API名称", "api", "demo", "draft", "Yarrow, Cai", "2024-01-01"))
+
+
+class QueryTest(unittest.TestCase):
+    """FTS5全文检索与条件过滤, 以及按内容哈希的增量导出"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wiki_dir = Path(self.tmp.name) / "wiki"
+        for rel, text in QUERY_DOCS.items():
+            p = self.wiki_dir / rel
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(text, encoding="utf-8")
+        self.db_path = Path(self.tmp.name) / "wiki.db"
+        self.stats = export_sqlite(scan_wiki(self.wiki_dir), self.db_path)
+        self.conn = open_db(self.db_path, readonly=True)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def paths(self, *args, **kwargs):
+        return [r["path"] for r in query_docs(self.conn, *args, **kwargs)]
+
+    def test_match_expr(self):
+        self.assertEqual(match_expr("PWM 电机"), '"pwm"* AND "电机"*')
+        self.assertIsNone(match_expr("!?"))
+
+    def test_full_text(self):
+        self.assertEqual(self.stats["added"], 3)
+        self.assertEqual(set(self.paths("电机")), {"modules/mod_pwm.md", "modules/mod_adc.md"})
+        # 标识符拆分与前缀匹配
+        self.assertEqual(self.paths("mod_pwm_in"), ["modules/mod_pwm.md"])
+        # 标题命中的文档排在前面
+        self.assertEqual(self.paths("采样")[0], "modules/mod_adc.md")
+        self.assertEqual(self.paths("!?"), [])
+
+    def test_filters(self):
+        self.assertEqual(self.paths(tags=["驱动"]), ["modules/mod_adc.md", "modules/mod_pwm.md"])
+        self.assertEqual(self.paths(tags=["定时器"]), ["modules/mod_pwm.md"])
+        self.assertEqual(self.paths("电机", status="approved"), ["modules/mod_adc.md"])
+        self.assertEqual(self.paths(module="mod_pwm"), ["modules/mod_pwm.md"])
+
+    def test_incremental_export(self):
+        (self.wiki_dir / "index.md").unlink()
+        (self.wiki_dir / "modules" / "mod_adc.md").write_text("# ADC采样\n\n改为电压保护\n", encoding="utf-8")
+        stats = export_sqlite(scan_wiki(self.wiki_dir), self.db_path)
+        self.assertEqual((stats["unchanged"], stats["updated"], stats["removed"]), (1, 1, 1))
+        self.assertEqual(self.paths("电机"), ["modules/mod_pwm.md"])
+        self.assertEqual(self.paths("电压"), ["modules/mod_adc.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()